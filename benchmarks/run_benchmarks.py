@@ -0,0 +1,250 @@
+"""
+Benchmark suite: micro-benchmarks of the page processing steps and end-to-end create_dataset runs
+on a synthetic corpus, with results stored as JSON for comparison between versions.
+
+Usage (from the repository root):
+
+    python -m benchmarks.run_benchmarks --preset small --workers 1 2 4
+    python -m benchmarks.run_benchmarks --compare benchmarks/results/old.json benchmarks/results/new.json
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import tempfile
+import time
+from dataclasses import replace
+from datetime import datetime, timezone
+from pathlib import Path
+from random import Random
+from typing import Callable, Dict, List
+
+import cv2
+import fitz  # PyMuPDF
+import numpy as np
+import PIL
+
+from benchmarks.synthetic_corpus import CORPUS_PRESETS, generate_corpus, render_scan
+from docs2dataset import DataHandler
+from docs2dataset.data_managers import FilePathManager, ImageManager
+from docs2dataset.utils.file_info import FileInfo
+
+RESULTS_DIR = Path(__file__).parent / "results"
+
+
+def time_call(func: Callable[[], object], repeat: int) -> Dict[str, float]:
+    """
+    Run func once to warm up, then repeat times.
+
+    Returns:
+        Dict[str, float]: Minimum, median and mean duration in milliseconds.
+    """
+    func()
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        durations.append((time.perf_counter() - start) * 1000)
+    return {
+        "min_ms": round(min(durations), 3),
+        "median_ms": round(statistics.median(durations), 3),
+        "mean_ms": round(statistics.mean(durations), 3),
+        "repeat": repeat
+    }
+
+
+def micro_benchmarks(corpus_path: Path, work_path: Path, repeat: int) -> Dict[str, dict]:
+    """Time the individual page processing steps on documents of the corpus."""
+    image_manager = ImageManager(
+        image_processor=None,
+        save_processed_img=True,
+        output_path=work_path / "images",
+        target_pages=None,
+        dpi=300,
+        logging_level=logging.WARNING,
+        megapixel=3,
+        size_threshold_mb=5
+    )
+
+    def first(pattern: str) -> FileInfo:
+        return FileInfo(file_path=next(iter(sorted(corpus_path.rglob(pattern)))), class_name="bench")
+
+    documents = {
+        "pdf_text": first("*.pdf"),
+        "tiff": first("*.tif"),
+        "jpeg": first("*.jpg"),
+        "png": first("*.png"),
+    }
+    scanned_pdfs = [
+        file_info for file_info in (FileInfo(file_path=path, class_name="bench") for path in corpus_path.rglob("*.pdf"))
+        if not image_manager.extract_text_layer(file_info, 0)
+    ]
+
+    results = {
+        "load_page.pdf_text": time_call(lambda: image_manager.load_page(documents["pdf_text"], 0), repeat),
+        "load_page.tiff_frame": time_call(lambda: image_manager.load_page(documents["tiff"], 1), repeat),
+        "load_page.jpeg": time_call(lambda: image_manager.load_page(documents["jpeg"], 0), repeat),
+        "load_page.png": time_call(lambda: image_manager.load_page(documents["png"], 0), repeat),
+        "extract_text_layer": time_call(lambda: image_manager.extract_text_layer(documents["pdf_text"], 0), repeat),
+        "get_page_numbers.tiff": time_call(lambda: image_manager.get_page_numbers(documents["tiff"]), repeat),
+    }
+    if scanned_pdfs:
+        results["load_page.pdf_scanned"] = time_call(lambda: image_manager.load_page(scanned_pdfs[0], 0), repeat)
+
+    scan_12mp = render_scan((3000, 4000), Random(0))
+    results["resize_image_if_needed.12mp"] = time_call(lambda: image_manager._resize_image_if_needed(scan_12mp), repeat)
+
+    scan_3mp = image_manager._resize_image_if_needed(scan_12mp)
+    image_path = work_path / "images" / "bench.jpg"
+    results["save_image.3mp"] = time_call(lambda: image_manager.save_image(scan_3mp, image_path), repeat)
+
+    for smart_shuffle in (False, True):
+        file_path_manager = FilePathManager(
+            input_path=corpus_path,
+            max_docs_per_class=10,
+            batch_size_per_worker=10,
+            smart_shuffle=smart_shuffle,
+            seed=0,
+            logging_level=logging.WARNING
+        )
+        name = "file_batches.smart_shuffle" if smart_shuffle else "file_batches"
+        results[name] = time_call(lambda: sum(len(batch) for batch in file_path_manager.file_batches()), repeat)
+
+    return results
+
+
+def end_to_end_benchmarks(
+        corpus_path: Path,
+        work_path: Path,
+        worker_counts: List[int],
+        do_ocr: bool,
+        save_processed_img: bool
+) -> Dict[str, dict]:
+    """Run create_dataset on the whole corpus once per worker count."""
+    results = {}
+    for num_workers in worker_counts:
+        output_path = work_path / f"dataset_{num_workers}"
+        handler = DataHandler(
+            input_path=str(corpus_path),
+            output_path=str(output_path),
+            max_docs_per_class=None,
+            num_workers=num_workers,
+            do_ocr=do_ocr,
+            save_processed_img=save_processed_img,
+            logging_level="WARNING",
+            resume=False,
+            seed=0
+        )
+        start = time.perf_counter()
+        handler.create_dataset(return_dataset=False)
+        elapsed = time.perf_counter() - start
+
+        with open(handler.output_path / "metrics.json", encoding="utf-8") as f:
+            run_metrics = json.load(f)
+        results[f"create_dataset.workers_{num_workers}"] = {
+            "elapsed_sec": round(elapsed, 3),
+            "pages": run_metrics["pages"],
+            "pages_per_sec": round(run_metrics["pages"] / elapsed, 3),
+            "stages": run_metrics["stages"]
+        }
+        shutil.rmtree(output_path, ignore_errors=True)
+    return results
+
+
+def environment() -> dict:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=Path(__file__).parent, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "git_commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+        "opencv": cv2.__version__,
+        "pymupdf": fitz.VersionBind,
+        "pillow": PIL.__version__,
+    }
+
+
+def compare(old_path: Path, new_path: Path) -> None:
+    """Print the relative change of every benchmark present in both result files."""
+    with open(old_path, encoding="utf-8") as f:
+        old = json.load(f)
+    with open(new_path, encoding="utf-8") as f:
+        new = json.load(f)
+
+    rows = []
+    for name, new_result in {**new["micro"], **new["end_to_end"]}.items():
+        old_result = {**old["micro"], **old["end_to_end"]}.get(name)
+        if old_result is None:
+            continue
+        key = "median_ms" if "median_ms" in new_result else "elapsed_sec"
+        change = (new_result[key] - old_result[key]) / old_result[key] * 100 if old_result[key] else 0.0
+        rows.append(f"{name:40s} {old_result[key]:>12.3f} {new_result[key]:>12.3f} {change:>+8.1f}%  ({key})")
+
+    print(f"{'benchmark':40s} {'old':>12s} {'new':>12s} {'change':>9s}")
+    print("\n".join(rows))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run the docs2dataset benchmark suite.")
+    parser.add_argument("--preset", choices=sorted(CORPUS_PRESETS), default="small", help="Synthetic corpus size.")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the synthetic corpus.")
+    parser.add_argument("--corpus-dir", type=Path, help="Reuse or create the corpus here instead of a temp dir.")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4], help="Worker counts to run end-to-end.")
+    parser.add_argument("--repeat", type=int, default=5, help="Repetitions of each micro-benchmark.")
+    parser.add_argument("--ocr", action="store_true", help="Run OCR in the end-to-end benchmarks.")
+    parser.add_argument("--no-save-images", action="store_true", help="Don't save processed images end-to-end.")
+    parser.add_argument("--skip-micro", action="store_true")
+    parser.add_argument("--skip-end-to-end", action="store_true")
+    parser.add_argument("--output", type=Path, help="Result file, benchmarks/results/<timestamp>.json by default.")
+    parser.add_argument("--compare", type=Path, nargs=2, metavar=("OLD", "NEW"), help="Compare two result files.")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    with tempfile.TemporaryDirectory(prefix="docs2dataset_bench_") as tmp_dir:
+        work_path = Path(tmp_dir)
+        corpus_path = args.corpus_dir or work_path / "corpus"
+        spec = replace(CORPUS_PRESETS[args.preset], seed=args.seed)
+        if not (corpus_path / "corpus.json").exists():
+            print(f"Generating the '{args.preset}' corpus in {corpus_path}...")
+            generate_corpus(corpus_path, spec)
+        with open(corpus_path / "corpus.json", encoding="utf-8") as f:
+            corpus = json.load(f)
+
+        results = {"environment": environment(), "corpus": corpus, "micro": {}, "end_to_end": {}}
+        if not args.skip_micro:
+            print("Running micro-benchmarks...")
+            results["micro"] = micro_benchmarks(corpus_path, work_path, args.repeat)
+        if not args.skip_end_to_end:
+            print(f"Running create_dataset with {args.workers} worker(s)...")
+            results["end_to_end"] = end_to_end_benchmarks(
+                corpus_path, work_path, args.workers, args.ocr, not args.no_save_images
+            )
+
+    output_path = args.output or RESULTS_DIR / f"{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=4)
+
+    for name, result in {**results["micro"], **results["end_to_end"]}.items():
+        summary = f"{result['median_ms']:.1f} ms" if "median_ms" in result else \
+            f"{result['elapsed_sec']:.2f} s, {result['pages_per_sec']:.1f} pages/s"
+        print(f"{name:40s} {summary}")
+    print(f"Results saved to {output_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+"""
+Offline generator of a synthetic document corpus for benchmarks.
+
+The corpus mimics the input layout of DataHandler: input_path/<class>/[<subdir>/...]<document>,
+with documents of every supported kind:
+
+- pdf_text:    multi-page PDFs with an embedded text layer
+- pdf_scanned: multi-page PDFs made of page scans, without a text layer
+- tiff:        multi-frame TIFF scans
+- jpeg, png:   large single-page scans
+
+Pages show random words from a fixed vocabulary, so OCR has real work to do. The same spec and seed
+always produce the same corpus.
+"""
+import argparse
+import json
+from dataclasses import asdict, dataclass, field, replace
+from pathlib import Path
+from random import Random
+from typing import Dict, List, Tuple
+
+import cv2
+import fitz  # PyMuPDF
+import numpy as np
+from PIL import Image
+
+DOCUMENT_KINDS = ("pdf_text", "pdf_scanned", "tiff", "jpeg", "png")
+_VOCABULARY = (
+    "invoice contract payment account amount balance customer delivery document agreement service total "
+    "number date address company report period transfer bank order receipt signature page section clause "
+    "quantity price value tax currency statement reference party terms conditions schedule annex"
+).split()
+
+
+@dataclass
+class CorpusSpec:
+    """
+    Attributes:
+        classes (int): Number of class directories.
+        subdirs_per_class (int): Number of subdirectories per class (used by smart_shuffle).
+        docs_per_subdir (int): Documents in each subdirectory.
+        root_docs_per_class (int): Documents directly in each class directory.
+        pdf_pages (int): Pages of each PDF.
+        tiff_frames (int): Frames of each TIFF.
+        scan_size (Tuple[int, int]): Width and height of scanned pages in pixels (A4 at 300 dpi by default).
+        kinds (Tuple[str, ...]): Document kinds to cycle through, see DOCUMENT_KINDS.
+        seed (int): Seed of the page contents.
+    """
+    classes: int = 2
+    subdirs_per_class: int = 2
+    docs_per_subdir: int = 5
+    root_docs_per_class: int = 5
+    pdf_pages: int = 4
+    tiff_frames: int = 3
+    scan_size: Tuple[int, int] = (2480, 3508)
+    kinds: Tuple[str, ...] = field(default=DOCUMENT_KINDS)
+    seed: int = 0
+
+
+# Presets used by the benchmark runner
+CORPUS_PRESETS: Dict[str, CorpusSpec] = {
+    "tiny": CorpusSpec(classes=2, subdirs_per_class=1, docs_per_subdir=2, root_docs_per_class=3,
+                       pdf_pages=2, tiff_frames=2, scan_size=(1240, 1754)),
+    "small": CorpusSpec(),
+    "medium": CorpusSpec(classes=4, subdirs_per_class=3, docs_per_subdir=10, root_docs_per_class=10, pdf_pages=8),
+}
+
+
+def generate_corpus(root: Path, spec: CorpusSpec) -> dict:
+    """
+    Write a synthetic corpus.
+
+    Args:
+        root (Path): Output directory, used as DataHandler input_path.
+        spec (CorpusSpec): Corpus layout and sizes.
+
+    Returns:
+        dict: The spec and the number of documents and pages per kind, also saved to root/corpus.json.
+    """
+    root = Path(root)
+    rng = Random(spec.seed)
+    counts = {kind: {"documents": 0, "pages": 0} for kind in spec.kinds}
+
+    for class_index in range(spec.classes):
+        class_dir = root / f"class_{class_index}"
+        doc_dirs = [class_dir] * spec.root_docs_per_class
+        for subdir_index in range(spec.subdirs_per_class):
+            doc_dirs += [class_dir / f"subdir_{subdir_index}"] * spec.docs_per_subdir
+
+        for doc_index, doc_dir in enumerate(doc_dirs):
+            kind = spec.kinds[doc_index % len(spec.kinds)]
+            doc_dir.mkdir(parents=True, exist_ok=True)
+            pages = _write_document(doc_dir / f"doc_{doc_index:04d}", kind, spec, rng)
+            counts[kind]["documents"] += 1
+            counts[kind]["pages"] += pages
+
+    summary = {"spec": asdict(spec), "counts": counts}
+    with open(root / "corpus.json", "w", encoding="utf-8") as f:
+        json.dump(summary, f, indent=4)
+    return summary
+
+
+def render_scan(size: Tuple[int, int], rng: Random, title: str = "") -> np.ndarray:
+    """
+    Render a grayscale-looking BGR page scan with lines of random words and a little noise.
+
+    Args:
+        size (Tuple[int, int]): Width and height in pixels.
+        rng (Random): Source of the words.
+        title (str): Text of the first line.
+
+    Returns:
+        np.ndarray: The page as a BGR uint8 array.
+    """
+    width, height = size
+    page = np.full((height, width, 3), 250, dtype=np.uint8)
+    scale = width / 1600
+    line_height = int(60 * scale)
+    thickness = max(1, int(2 * scale))
+
+    lines = [title] + [_random_line(rng) for _ in range(height // line_height)]
+    for i, line in enumerate(lines[:-2]):
+        cv2.putText(page, line, (int(80 * scale), (i + 2) * line_height), cv2.FONT_HERSHEY_SIMPLEX,
+                    scale, (20, 20, 20), thickness, cv2.LINE_AA)
+
+    noise = np.random.default_rng(rng.randrange(2 ** 32)).integers(0, 12, size=page.shape[:2], dtype=np.uint8)
+    page -= noise[:, :, None]
+    return page
+
+
+def _random_line(rng: Random) -> str:
+    return " ".join(rng.choice(_VOCABULARY) for _ in range(rng.randint(4, 9)))
+
+
+def _write_document(stem: Path, kind: str, spec: CorpusSpec, rng: Random) -> int:
+    """Write one document of the given kind, returning its number of pages."""
+    if kind == "pdf_text":
+        doc = fitz.open()
+        for page_num in range(spec.pdf_pages):
+            page = doc.new_page()
+            text = "\n".join([f"{stem.name} page {page_num}"] + [_random_line(rng) for _ in range(40)])
+            page.insert_text((50, 60), text, fontsize=10)
+        doc.save(stem.with_suffix(".pdf"))
+        return spec.pdf_pages
+
+    if kind == "pdf_scanned":
+        doc = fitz.open()
+        for page_num in range(spec.pdf_pages):
+            scan = render_scan(spec.scan_size, rng, f"{stem.name} page {page_num}")
+            success, buffer = cv2.imencode(".jpg", scan, [cv2.IMWRITE_JPEG_QUALITY, 80])
+            page = doc.new_page(width=595, height=842)
+            page.insert_image(page.rect, stream=buffer.tobytes())
+        doc.save(stem.with_suffix(".pdf"))
+        return spec.pdf_pages
+
+    if kind == "tiff":
+        frames: List[Image.Image] = [
+            Image.fromarray(cv2.cvtColor(render_scan(spec.scan_size, rng, f"{stem.name} frame {i}"),
+                                         cv2.COLOR_BGR2RGB))
+            for i in range(spec.tiff_frames)
+        ]
+        frames[0].save(stem.with_suffix(".tif"), save_all=True, append_images=frames[1:], compression="tiff_lzw")
+        return spec.tiff_frames
+
+    if kind in ("jpeg", "png"):
+        scan = render_scan(spec.scan_size, rng, stem.name)
+        cv2.imwrite(str(stem.with_suffix(".jpg" if kind == "jpeg" else ".png")), scan)
+        return 1
+
+    raise ValueError(f"Unknown document kind {kind!r}, expected one of {DOCUMENT_KINDS}.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic document corpus.")
+    parser.add_argument("root", type=Path, help="Output directory.")
+    parser.add_argument("--preset", choices=sorted(CORPUS_PRESETS), default="small")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    corpus_spec = replace(CORPUS_PRESETS[args.preset], seed=args.seed)
+    print(json.dumps(generate_corpus(args.root, corpus_spec)["counts"], indent=4))
@@ -0,0 +1,3 @@
+from .sqlite_cache import SQLiteCache
+from .ocr_cache import OCRCache
+from .image_cache import ProcessedImageCache
@@ -0,0 +1,77 @@
+import hashlib
+import io
+import json
+import logging
+import zlib
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from docs2dataset.cache.sqlite_cache import SQLiteCache
+from docs2dataset.utils.file_utils import file_content_hash
+
+# Value prefixes: PNG for 8-bit gray, BGR and BGRA images, zlib-compressed .npy for other arrays
+_PNG = b"P"
+_NPY_ZLIB = b"Z"
+
+
+class ProcessedImageCache:
+    """
+    Content-addressed cache of preprocessed page images, shared across dataset runs, so runs that only
+    change OCR settings skip decoding and preprocessing.
+
+    Images are stored losslessly compressed in a size-bounded SQLiteCache. The key covers the file content,
+    page, render parameters and the image processor configuration.
+    """
+
+    def __init__(self, cache_dir: Path, max_size_mb: int, logging_level: int = logging.INFO):
+        self.store = SQLiteCache(Path(cache_dir) / "image_cache.sqlite", max_size_mb, logging_level)
+
+    @staticmethod
+    def make_key(file_path: Path, page_num: int, render_params: dict, processor_fingerprint: str) -> str:
+        """
+        Args:
+            file_path (Path): Source document, its content hash is part of the key.
+            page_num (int): Page index.
+            render_params (dict): Parameters that change the rendered image (dpi, megapixel, ...).
+            processor_fingerprint (str): Canonical description of the image processor configuration.
+
+        Returns:
+            str: Hex digest identifying the processed image.
+        """
+        key_data = {
+            "file": file_content_hash(file_path),
+            "page": page_num,
+            "render": render_params,
+            "processor": processor_fingerprint,
+        }
+        return hashlib.sha256(json.dumps(key_data, sort_keys=True).encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> np.ndarray | None:
+        value = self.store.get(key)
+        return decode_array(value) if value is not None else None
+
+    def put(self, key: str, image: np.ndarray) -> None:
+        self.store.put(key, encode_array(image))
+
+
+def encode_array(image: np.ndarray) -> bytes:
+    """Losslessly compress an image, as PNG if possible (which compresses scans far better than zlib alone)."""
+    if image.dtype == np.uint8 and (image.ndim == 2 or (image.ndim == 3 and image.shape[2] in (3, 4))):
+        success, buffer = cv2.imencode(".png", image, [cv2.IMWRITE_PNG_COMPRESSION, 1])
+        if success:
+            return _PNG + buffer.tobytes()
+
+    buffer = io.BytesIO()
+    np.save(buffer, image, allow_pickle=False)
+    return _NPY_ZLIB + zlib.compress(buffer.getvalue(), 1)
+
+
+def decode_array(value: bytes) -> np.ndarray:
+    if value[:1] == _PNG:
+        image = cv2.imdecode(np.frombuffer(value, dtype=np.uint8, offset=1), cv2.IMREAD_UNCHANGED)
+        if image is None:
+            raise ValueError("Corrupt PNG entry in the image cache.")
+        return image
+    return np.load(io.BytesIO(zlib.decompress(value[1:])), allow_pickle=False)
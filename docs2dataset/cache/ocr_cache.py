@@ -0,0 +1,52 @@
+import hashlib
+import json
+import logging
+from pathlib import Path
+
+from docs2dataset.cache.sqlite_cache import SQLiteCache
+from docs2dataset.ocr.ocr_interface import OCROutput, WordBoxes
+from docs2dataset.utils.file_utils import file_content_hash
+
+
+class OCRCache:
+    """
+    Content-addressed cache of OCR results (words with boxes and confidences), shared across dataset runs.
+
+    The key covers everything that influences the OCR output: file content, page, render parameters,
+    image processor configuration and the OCR engine with its language.
+    """
+
+    def __init__(self, cache_dir: Path, max_size_mb: int, logging_level: int = logging.INFO):
+        self.store = SQLiteCache(Path(cache_dir) / "ocr_cache.sqlite", max_size_mb, logging_level)
+
+    @staticmethod
+    def make_key(file_path: Path, page_num: int, render_params: dict, processor_fingerprint: str,
+                 engine_name: str, ocr_lang: str) -> str:
+        """
+        Args:
+            file_path (Path): Source document, its content hash is part of the key.
+            page_num (int): Page index.
+            render_params (dict): Parameters that change the rendered image (dpi, megapixel, ...).
+            processor_fingerprint (str): Canonical description of the image processor configuration.
+            engine_name (str): OCR engine name.
+            ocr_lang (str): OCR language.
+
+        Returns:
+            str: Hex digest identifying the OCR result.
+        """
+        key_data = {
+            "file": file_content_hash(file_path),
+            "page": page_num,
+            "render": render_params,
+            "processor": processor_fingerprint,
+            "engine": engine_name,
+            "lang": ocr_lang,
+        }
+        return hashlib.sha256(json.dumps(key_data, sort_keys=True).encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> OCROutput | None:
+        value = self.store.get(key)
+        return OCROutput(word_boxes=WordBoxes.from_bytes(value)) if value is not None else None
+
+    def put(self, key: str, ocr_output: OCROutput) -> None:
+        self.store.put(key, ocr_output.word_boxes.to_bytes())
@@ -0,0 +1,120 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from docs2dataset.utils.logging_utils import setup_logger
+
+
+class SQLiteCache:
+    """
+    Size-bounded key-value store kept in a single SQLite file.
+
+    Entries are evicted in least-recently-used order once the total size of the stored values exceeds
+    max_size_mb. Connections are opened lazily per process and thread, so the cache object can be
+    pickled into worker processes and shared between them.
+    """
+
+    # Evict down to this share of max_size_mb, so eviction does not run on every insert
+    _EVICT_TARGET_RATIO = 0.9
+    # Number of inserts in this process between size checks
+    _EVICT_CHECK_INTERVAL = 100
+
+    def __init__(self, cache_path: Path, max_size_mb: int, logging_level: int = logging.INFO):
+        self.cache_path = Path(cache_path)
+        self.max_size_mb = max_size_mb
+        self.logging_level = logging_level
+        self.logger = setup_logger(self.__class__.__name__, logging_level)
+        self._local = threading.local()
+        self._puts_since_check = 0
+
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL, accessed REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)")
+
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        # SQLite connections can't cross process boundaries, each process opens its own
+        del state["_local"]
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self._local = threading.local()
+
+    def get(self, key: str) -> bytes | None:
+        """
+        Args:
+            key (str): Entry key.
+
+        Returns:
+            bytes | None: Stored value or None if the key is not cached.
+        """
+        conn = self._connection()
+        row = conn.execute("SELECT value FROM entries WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+
+        with conn:
+            conn.execute("UPDATE entries SET accessed = ? WHERE key = ?", (time.time(), key))
+        return row[0]
+
+    def put(self, key: str, value: bytes) -> None:
+        """
+        Store a value, evicting the least recently used entries if the cache grew too big.
+
+        Args:
+            key (str): Entry key.
+            value (bytes): Value to store.
+        """
+        conn = self._connection()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO entries (key, value, size, accessed) VALUES (?, ?, ?, ?)",
+                (key, value, len(value), time.time())
+            )
+
+        self._puts_since_check += 1
+        if self._puts_since_check >= self._EVICT_CHECK_INTERVAL:
+            self._puts_since_check = 0
+            self.evict()
+
+    def evict(self) -> None:
+        """Drop least recently used entries until the cache fits into max_size_mb."""
+        max_bytes = self.max_size_mb * 1024 * 1024
+        conn = self._connection()
+        total_size = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total_size <= max_bytes:
+            return
+
+        target_bytes = int(max_bytes * self._EVICT_TARGET_RATIO)
+        with conn:
+            # Keep the most recently used entries whose running total fits into target_bytes
+            deleted = conn.execute(
+                "DELETE FROM entries WHERE key IN ("
+                "SELECT key FROM (SELECT key, SUM(size) OVER (ORDER BY accessed DESC) AS running FROM entries) "
+                "WHERE running > ?)",
+                (target_bytes,)
+            ).rowcount
+        self.logger.info(
+            f"Evicted {deleted} entries from {self.cache_path} "
+            f"({total_size / (1024 * 1024):.1f} MB > {self.max_size_mb} MB limit)"
+        )
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        # A connection inherited by a forked worker must not be used, open a new one
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.cache_path, timeout=60)
+            # WAL lets readers in other worker processes proceed while one of them writes
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
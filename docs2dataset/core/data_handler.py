@@ -1,16 +1,64 @@
+import itertools
 import logging
+import multiprocessing
+import random
+import socket
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from contextlib import ExitStack, contextmanager
 from multiprocessing import Pool
 from pathlib import Path
+from typing import Callable, Generator, Iterable, Iterator, List, Set, Tuple
 
+import numpy as np
 import pandas as pd
 
+from docs2dataset.cache.image_cache import ProcessedImageCache
+from docs2dataset.cache.ocr_cache import OCRCache
+from docs2dataset.core.page_pipeline import PagePipeline, PreparedPage, resolve_page_result, run_inline
+from docs2dataset.data_managers.dataset_writer import DatasetWriter, is_run_complete, read_committed_dataset
+from docs2dataset.data_managers.image_encoders import ImageEncoder, create_image_encoder
 from docs2dataset.data_managers.image_manager import ImageManager
+from docs2dataset.data_managers.image_shards import ImageShardWriter
 from docs2dataset.data_managers.file_path_manager import FilePathManager
-from docs2dataset.ocr.implementations.pytesseract_ocr import PytesseractOCR
+from docs2dataset.distributed.lease_coordinator import LEASES_FILE_NAME, LeaseCoordinator, LeaseTracker
+from docs2dataset.distributed.sharding import (
+    MERGE_LOCK_NAME,
+    SHARDS_DIR_NAME,
+    SOURCE_PATH_COLUMN,
+    merge_shards,
+    shard_of,
+    shard_paths
+)
+from docs2dataset.ocr.engine_factory import create_ocr_engine
+from docs2dataset.ocr.ocr_interface import OCROutput
+from docs2dataset.preprocessing.image_processing_pipeline import processor_fingerprint
 from docs2dataset.utils.file_info import FileInfo
 from docs2dataset.utils.file_utils import create_directory
+from docs2dataset.utils.page_task import PageResult, PageTask
+from docs2dataset.utils.text_quality import text_layer_quality
+from docs2dataset.utils.cpu_utils import bind_to_cores, limit_threads, restored_thread_limits, usable_cpu_count
 from docs2dataset.utils.logging_utils import setup_logger
-from docs2dataset.utils.params_utils import save_run_params
+from docs2dataset.utils.metrics import RunMetrics, stage_metrics
+from docs2dataset.utils.page_filter import NearDuplicateIndex, average_hash, ink_ratio, to_gray_thumbnail
+from docs2dataset.utils.params_utils import collect_run_params, load_run_params, save_run_params
+
+# How pages are processed: in this process, by a pool of threads or by a pool of worker processes.
+# "auto" picks processes if the OCR engine is process-safe, otherwise threads if it is thread-safe
+EXECUTORS = ("auto", "serial", "threads", "processes")
+# OpenMP/OpenCV threads per worker tried by the calibration of num_workers="auto", workers fill the usable CPUs
+CALIBRATION_THREADS_PER_WORKER = (1, 2, 4)
+# Seconds between checks of the lease queue while other nodes finish their files
+LEASE_POLL_INTERVAL_SEC = 10
+RESULT_COLUMNS = ["SourceFilename", "Page", "Text", "Class", "PreprocessedFilename", "TextSource"]
+# Extra column with the page filter outcome ("ok", "blank" or "duplicate"), present if the filter is enabled
+PAGE_STATUS_COLUMN = "PageStatus"
+NEAR_DUPLICATE_ACTIONS = ("skip", "reuse")
+# Memory budget of the OCR results kept per process for near_duplicates="reuse"
+DUPLICATE_INDEX_MAX_MB = 256
+# Processed images are saved as one file per page, or packed into tar shards (see ImageShardWriter)
+IMAGE_OUTPUTS = ("files", "shards")
 
 
 class DataHandler:
@@ -25,19 +73,80 @@ class DataHandler:
         output_path (Path): Path where all processed data and CSV are saved.
         max_docs_per_class (int): Maximum number of documents per class.
         csv_name (str): Name of the CSV file to be created.
-        num_workers (int): Number of parallel processes for OCR.
+        num_workers (int or str): Number of parallel workers (threads or processes, see executor), or "auto":
+            the usable CPUs (CPU affinity and cgroup quota) divided by threads_per_worker. Unless
+            threads_per_worker is given, the first pages then calibrate the split of the CPUs into workers
+            and threads per worker (and the executor, if "auto") by their pages/s, see calibration_pages.
         dpi (int): Resolution for rendering PDF pages.
         save_processed_img (bool): Whether to save processed images.
         target_pages (list[int]): Which pages to extract from multi-page documents. If None, extract all.
         ocr_lang (str): Language for OCR.
-        ocr_engine (str or OCRInterface): The OCR engine. Defaults to "Tesseract".
-        batch_size_per_worker (int): Number of documents each worker processes at a time.
+        ocr_engine (str or OCRInterface): The OCR engine: "Tesseract" (pytesseract, default), "TesseractCAPI"
+            (in-process libtesseract) or an OCRInterface instance.
+        batch_size_per_worker (int): Number of documents listed per batch before being expanded into page tasks.
         logging_level (str): Logging level ("INFO", "DEBUG", etc.).
         do_ocr (bool): Whether to perform OCR or skip it.
         smart_shuffle (bool): If True, distribute documents from subdirectories evenly.
         megapixel (int): Maximum resolution in megapixels to which images are scaled down if they exceed it.
         size_threshold_mb (int): Maximum file size in MB for saved images. If exceeded, compression is applied.
         image_processor (ImageProcessorInterface): Custom image preprocessing pipeline.
+        text_layer_first (bool): If True, use the embedded PDF text layer and only render and OCR
+            pages whose text layer fails the quality check.
+        text_layer_min_quality (float): Minimum text layer quality score (0...1) to skip OCR.
+        ocr_cache_dir (str): Directory of the OCR result cache shared across runs. Disabled if None.
+        ocr_cache_max_size_mb (int): Maximum OCR cache size, least recently used entries are evicted.
+        output_format (str): "csv" or "parquet" (requires pyarrow).
+        write_chunk_size (int): Number of pages buffered before results are appended to the output.
+        resume (bool): If True and output_path holds an unfinished run with the same parameters,
+            continue it instead of creating a new output directory.
+        seed (int): Seed for document sampling. Random if None, the used seed is saved to used_args.json.
+        save_word_boxes (bool): Whether to save OCR word boxes and confidences next to the CSV.
+        pages_per_task (int): Number of pages sent to a worker process at a time.
+        prefetch_pages (int): Number of decoded pages a worker keeps ready ahead of OCR.
+        write_queue_size (int): Number of processed images that may wait to be encoded and written.
+        file_index_path (str): JSON file persisting the input listing, later runs only rescan
+            directories that changed since. Disabled if None.
+        scan_threads (int): Number of threads listing input directories.
+        num_shards (int): Number of nodes sharing the work of a distributed run by hash partitioning the
+            input files. Every node must use the same seed.
+        shard_id (int): Shard processed by this node, 0 <= shard_id < num_shards.
+        lease_work (bool): If True, nodes claim input files from a lease queue in output_path instead of
+            a fixed hash partition, so the work of a node that died is taken over once its leases expire.
+        lease_timeout_sec (int): Time after which files leased by a node that stopped renewing are reclaimed.
+        node_id (str): Name of this node's result shard in output_path/shards. Defaults to the shard id,
+            or the host name with lease_work (set it when running several nodes on one host).
+        progress_interval_sec (float): Seconds between progress log lines (pages/s, ETA).
+        color_mode (str): Working color mode of page images from decoding to OCR and saving: "bgr",
+            "gray" or "binary" (Otsu-thresholded gray). The single-channel modes use a third of the
+            memory per page; OCR engines binarize internally anyway. Image processors must accept it.
+        resampling (str): Quality tier of downscaling raster images to the megapixel budget: "lanczos" (default),
+            "area" or "linear" (fastest). Oversized JPEGs are decoded at a reduced scale in every tier.
+        skip_blank_pages (bool): If True, pages with almost no ink are neither preprocessed nor recognized.
+        blank_max_ink_ratio (float): Maximum share of ink pixels of a blank page.
+        near_duplicates (str): What to do with pages that look like an already recognized page: "skip" them
+            (empty text) or "reuse" the OCR result of the matching page. Disabled if None. Pages are matched
+            within a worker process (shared by its threads), so the first occurrence in each process is recognized.
+        duplicate_max_distance (int): Maximum number of differing bits (of 256) of near-duplicate page hashes.
+        image_cache_dir (str): Directory of the processed page image cache shared across runs. Cached pages
+            skip decoding and preprocessing, e.g. when only OCR settings change. Disabled if None.
+        image_cache_max_size_mb (int): Maximum image cache size, least recently used entries are evicted.
+        image_output (str): How processed images are saved: "files" (one JPEG per page under image_data/<class>)
+            or "shards" (appended to tar shards in image_data/shards with an index.jsonl of offsets,
+            PreprocessedFilename then holds "<shard path>:<offset>:<size>", see read_image_ref).
+        image_shard_size_mb (int): Approximate size of an image shard.
+        image_format (str): Format of saved processed images: "jpeg", "webp" or "jxl" (requires pillow-jxl-plugin).
+        image_encoder (str or ImageEncoder): Encoder backend: "auto" (libjpeg-turbo for JPEG if PyTurboJPEG is
+            installed, otherwise OpenCV), "opencv", "pillow", "turbojpeg" or an ImageEncoder instance.
+        executor (str): How pages are processed with num_workers > 1: "threads" (no process start-up and no
+            pickling of results, for engines that release the GIL or run outside the process), "processes"
+            (pool worker processes), "serial" or "auto" (processes if the OCR engine is process_safe,
+            otherwise threads if it is thread_safe, otherwise serial). The resolved executor is saved.
+        threads_per_worker (int): OpenMP (Tesseract) and OpenCV threads per worker. Left to the libraries if None,
+            which start a thread per CPU in every worker. Defaults to 1 with num_workers="auto".
+        bind_workers (bool): If True, pin each worker process to its own threads_per_worker cores (Linux).
+        calibration_pages (int): Minimum number of pages of the sample every candidate split processes while
+            calibrating num_workers="auto" (at least two tasks per worker). The sample is then processed for the
+            dataset with the fastest split. Disabled if 0.
     """
 
     def __init__(
@@ -58,7 +167,43 @@ class DataHandler:
             smart_shuffle: bool = False,
             megapixel: int = 3,
             size_threshold_mb: int = 5,
-            image_processor=None
+            image_processor=None,
+            text_layer_first: bool = False,
+            text_layer_min_quality: float = 0.6,
+            ocr_cache_dir: str | None = None,
+            ocr_cache_max_size_mb: int = 1024,
+            output_format: str = "csv",
+            write_chunk_size: int = 1000,
+            resume: bool = True,
+            seed: int | None = None,
+            save_word_boxes: bool = False,
+            pages_per_task: int = 8,
+            prefetch_pages: int = 2,
+            write_queue_size: int = 4,
+            file_index_path: str | None = None,
+            scan_threads: int = 8,
+            num_shards: int = 1,
+            shard_id: int = 0,
+            lease_work: bool = False,
+            lease_timeout_sec: int = 600,
+            node_id: str | None = None,
+            progress_interval_sec: float = 10,
+            color_mode: str = "bgr",
+            resampling: str = "lanczos",
+            skip_blank_pages: bool = False,
+            blank_max_ink_ratio: float = 0.001,
+            near_duplicates: str | None = None,
+            duplicate_max_distance: int = 8,
+            image_cache_dir: str | None = None,
+            image_cache_max_size_mb: int = 4096,
+            image_output: str = "files",
+            image_shard_size_mb: int = 1024,
+            image_format: str = "jpeg",
+            image_encoder: str | ImageEncoder = "auto",
+            executor: str = "auto",
+            threads_per_worker: int | None = None,
+            bind_workers: bool = False,
+            calibration_pages: int = 32
     ):
         # Setup logging
         self.logging_level = getattr(logging, logging_level.upper(), logging.INFO)
@@ -66,37 +211,122 @@ class DataHandler:
 
         # Main handler args
         self.input_path = Path(input_path)
-        self.output_path = create_directory(Path(output_path))
         self.max_docs_per_class = max_docs_per_class
         self.csv_name = csv_name
+        self.output_format = output_format
+        self.write_chunk_size = write_chunk_size
+        self.usable_cpus = usable_cpu_count()
+        self.threads_per_worker = threads_per_worker
+        # The split of the CPUs into workers and threads is calibrated unless threads_per_worker is fixed
+        calibrate = num_workers == "auto" and threads_per_worker is None and calibration_pages > 0
+        if num_workers == "auto":
+            self.threads_per_worker = threads_per_worker or 1
+            num_workers = max(self.usable_cpus // self.threads_per_worker, 1)
+        elif not isinstance(num_workers, int) or num_workers < 1:
+            raise ValueError(f"num_workers must be a positive integer or 'auto', got {num_workers!r}.")
         self.num_workers = num_workers
+        self.bind_workers = bind_workers
+        self.calibration_pages = calibration_pages
+        # Results of the calibration of num_workers="auto", saved to used_args.json
+        self.calibration: List[dict] | None = None
         self.do_ocr = do_ocr
+        self.save_word_boxes = save_word_boxes
+        self.text_layer_first = text_layer_first
+        self.text_layer_min_quality = text_layer_min_quality
+        self.resume = resume
+        self.seed = seed
 
         # OCR engine setup
         self.ocr_lang = ocr_lang
-        if ocr_engine == "Tesseract":
-            self.ocr_engine = PytesseractOCR(ocr_lang)
+        if isinstance(ocr_engine, str):
+            self.ocr_engine = create_ocr_engine(ocr_engine, ocr_lang)
         else:
             # Assume an OCRInterface-compatible engine was passed
             self.ocr_engine = ocr_engine
+        self.executor = self._resolve_executor(executor)
+        # Candidate (executor, num_workers, threads_per_worker) settings, tried on the first pages
+        self._calibration_candidates = self._calibration_splits(executor) if calibrate else []
+        # Thread pool of the "threads" executor, one per create_dataset run, so engines that keep a handle
+        # per thread (TesseractCAPIOCR) don't accumulate handles across calibration and lease passes
+        self._thread_pool: ThreadPoolExecutor | None = None
+        # Sized for the largest split, the pool is shared by every pass of the run
+        self._thread_pool_size = max([self.num_workers] + [workers for _, workers, _ in self._calibration_candidates])
 
-        # FilePathManager
         self.batch_size_per_worker = batch_size_per_worker
+        self.pages_per_task = pages_per_task
+        self.prefetch_pages = prefetch_pages
+        self.write_queue_size = write_queue_size
         self.smart_shuffle = smart_shuffle
+        self.save_processed_img = save_processed_img
+        if image_output not in IMAGE_OUTPUTS:
+            raise ValueError(f"Unknown {image_output=}, expected one of {IMAGE_OUTPUTS}.")
+        self.image_output = image_output
+        self.image_shard_size_mb = image_shard_size_mb
+        self.image_format = image_format
+        if isinstance(image_encoder, str):
+            self.image_encoder = create_image_encoder(image_format, image_encoder)
+        else:
+            # Assume an ImageEncoder-compatible encoder was passed
+            self.image_encoder = image_encoder
+        self.size_threshold_mb = size_threshold_mb
+        self.target_pages = target_pages
+        self.megapixel = megapixel
+        self.dpi = dpi
+        self.color_mode = color_mode
+        self.resampling = resampling
+
+        # Pre-OCR page filter
+        if near_duplicates not in (None, *NEAR_DUPLICATE_ACTIONS):
+            raise ValueError(f"Unknown {near_duplicates=}, expected one of {NEAR_DUPLICATE_ACTIONS} or None.")
+        self.skip_blank_pages = skip_blank_pages
+        self.blank_max_ink_ratio = blank_max_ink_ratio
+        self.near_duplicates = near_duplicates
+        self.duplicate_max_distance = duplicate_max_distance
+        self.filter_pages = skip_blank_pages or near_duplicates is not None
+        # Hashes of the recognized pages of this process
+        self._duplicate_index = self._new_duplicate_index()
+        self.ocr_cache_dir = ocr_cache_dir
+        self.ocr_cache_max_size_mb = ocr_cache_max_size_mb
+        self.file_index_path = file_index_path
+        self.scan_threads = scan_threads
+        self.progress_interval_sec = progress_interval_sec
+
+        # Distributed runs: every node writes a result shard under the shared output directory
+        self.num_shards = num_shards
+        self.shard_id = shard_id
+        self.lease_work = lease_work
+        self.lease_timeout_sec = lease_timeout_sec
+        self.distributed = num_shards > 1 or lease_work
+        if not 0 <= shard_id < num_shards:
+            raise ValueError(f"shard_id must be in [0, {num_shards}), got {shard_id}.")
+        if num_shards > 1 and lease_work:
+            raise ValueError("Use either num_shards or lease_work to distribute a run, not both.")
+        if num_shards > 1 and seed is None:
+            raise ValueError("Hash partitioned runs need the same explicit seed on every node.")
+        if node_id is None and self.distributed:
+            node_id = socket.gethostname() if lease_work else f"shard-{shard_id:03d}-of-{num_shards:03d}"
+        self.node_id = node_id
+        self.shared_output_path = Path(output_path)
+
+        # Output directory, either a fresh one or an unfinished run with the same parameters
+        node_output_path = self.shared_output_path / SHARDS_DIR_NAME / node_id if self.distributed else None
+        self.output_path = self._resolve_output_path(node_output_path or self.shared_output_path)
+        if self.seed is None:
+            self.seed = random.randrange(2 ** 32)
+
+        # FilePathManager
         self.file_path_manager = FilePathManager(
             input_path=self.input_path,
             max_docs_per_class=self.max_docs_per_class,
             batch_size_per_worker=self.batch_size_per_worker,
             smart_shuffle=self.smart_shuffle,
+            seed=self.seed,
+            file_index_path=Path(file_index_path) if file_index_path is not None else None,
+            scan_threads=self.scan_threads,
             logging_level=self.logging_level
         )
 
         # ImageManager
-        self.save_processed_img = save_processed_img
-        self.size_threshold_mb = size_threshold_mb
-        self.target_pages = target_pages
-        self.megapixel = megapixel
-        self.dpi = dpi
         self.image_manager = ImageManager(
             image_processor=image_processor,
             save_processed_img=self.save_processed_img,
@@ -105,37 +335,136 @@ class DataHandler:
             target_pages=self.target_pages,
             dpi=self.dpi,
             size_threshold_mb=self.size_threshold_mb,
+            color_mode=self.color_mode,
+            resampling=self.resampling,
+            encoder=self.image_encoder,
             logging_level=self.logging_level
         )
 
-    def create_dataset(self) -> pd.DataFrame:
+        # OCR result cache
+        self.ocr_cache = OCRCache(
+            cache_dir=Path(ocr_cache_dir),
+            max_size_mb=ocr_cache_max_size_mb,
+            logging_level=self.logging_level
+        ) if ocr_cache_dir and self.do_ocr else None
+
+        # Processed image cache
+        self.image_cache_dir = image_cache_dir
+        self.image_cache_max_size_mb = image_cache_max_size_mb
+        self.image_cache = ProcessedImageCache(
+            cache_dir=Path(image_cache_dir),
+            max_size_mb=image_cache_max_size_mb,
+            logging_level=self.logging_level
+        ) if image_cache_dir else None
+        # Only needed for cache keys
+        self._processor_fingerprint = processor_fingerprint(image_processor) \
+            if self.ocr_cache is not None or self.image_cache is not None else None
+        if self._processor_fingerprint is None and (self.ocr_cache is not None or self.image_cache is not None):
+            # Cache keys would change on every run, the caches would only fill up
+            self.logger.warning(
+                f"Image processor {type(image_processor).__name__} can't be described by its attributes "
+                f"(__slots__, objects shown by address or summarized arrays), OCR and image caches are disabled. "
+                f"Build it from a config or give its attributes a deterministic __repr__ to enable them."
+            )
+            self.ocr_cache = self.image_cache = None
+
+    def create_dataset(self, return_dataset: bool = True) -> pd.DataFrame | None:
         """
-        Walk through all documents, process each with optional OCR, and produce a single CSV file.
+        Walk through all documents, process each page with optional OCR, and produce a single CSV file.
+
+        Documents are expanded into (file, page) tasks which are streamed to one long-lived worker
+        pool, so a large multi-page document never stalls the remaining workers. Results are appended
+        to the output as they complete, so memory stays flat and an interrupted run can be resumed.
+
+        In a distributed run, this node's results go to its shard in output_path/shards. The node that
+        finishes last merges all shards into the final dataset in output_path, see merge_shards.
+
+        Args:
+            return_dataset (bool): Whether to load the finished dataset back into memory.
 
         Returns:
-            pd.DataFrame: A DataFrame containing all OCR and metadata results.
+            pd.DataFrame | None: A DataFrame containing all OCR and metadata results, if return_dataset is True.
+                In a distributed run, the merged dataset if this node merged it, otherwise this node's shard.
         """
-        results = []
+        # Saved up front, so an interrupted run can be recognized and resumed
+        save_run_params(self)
+        # Stages timed earlier in this process (e.g. by a previous run or a benchmark) are not part of this run
+        stage_metrics.drain()
+        run_metrics = RunMetrics()
+        coordinator = self._join_work_queue() if self.lease_work else None
+
+        with ExitStack() as stack:
+            # The thread limits of the calibrated split apply to this run only
+            stack.enter_context(restored_thread_limits())
+            stack.callback(self._shutdown_thread_pool)
+            lease_tracker = stack.enter_context(
+                LeaseTracker(coordinator, self.input_path, self.logging_level)
+            ) if coordinator is not None else None
+            writer = stack.enter_context(DatasetWriter(
+                output_path=self.output_path,
+                csv_name=self.csv_name,
+                columns=self._result_columns(),
+                output_format=self.output_format,
+                chunk_size=self.write_chunk_size,
+                save_word_boxes=self.save_word_boxes,
+                on_commit=lease_tracker.committed if lease_tracker is not None else None,
+                image_shards=ImageShardWriter(
+                    shards_path=self.output_path / "image_data" / "shards",
+                    shard_size_mb=self.image_shard_size_mb,
+                    logging_level=self.logging_level
+                ) if self.save_processed_img and self.image_output == "shards" else None,
+                # Nodes may mount the shared input at different paths, the merge deduplicates by relative path
+                word_box_source=self._relative_path if self.distributed else None,
+                logging_level=self.logging_level
+            ))
 
-        # For each batch of files, process them (optionally in parallel)
-        for file_batch in self.file_path_manager.file_batches():
-            # Tesseract OCR can conflict if used with multiple processes, but let's attempt anyway
-            if self.num_workers > 1 and getattr(self.ocr_engine, "engine_name", "") == "Tesseract":
-                with Pool(self.num_workers) as pool:
-                    class_results = pool.map(self.process_file, file_batch)
-                results.extend(class_results)
+            if lease_tracker is None:
+                page_tasks = self._page_tasks(completed_units=writer.completed_units, run_metrics=run_metrics)
+                self._write_results(writer, page_tasks, run_metrics)
             else:
-                class_results = [self.process_file(file_info) for file_info in file_batch]
-                results.extend(class_results)
+                # Work until every queued file is done. Files leased by other nodes are waited for,
+                # they are reclaimed here if their node dies
+                while True:
+                    page_tasks = self._page_tasks(
+                        completed_units=writer.completed_units,
+                        file_batches=self._leased_file_batches(lease_tracker),
+                        lease_tracker=lease_tracker,
+                        run_metrics=run_metrics
+                    )
+                    self._write_results(writer, page_tasks, run_metrics)
+                    writer.flush()
+                    if coordinator.all_done():
+                        break
+                    # Takes over filling the queue if its populator stopped before finishing
+                    self._populate_if_elected(coordinator)
+                    progress = coordinator.progress()
+                    self.logger.info(
+                        f"Waiting for other nodes: {progress['done']}/{progress['total']} files done, "
+                        f"{progress['leased']} leased"
+                    )
+                    time.sleep(LEASE_POLL_INTERVAL_SEC)
+            writer.mark_complete()
+
+        run_metrics.add(stage_metrics.drain())
+        self.logger.info(run_metrics.progress_line())
+        metrics_path = run_metrics.save(self.output_path)
+        self.logger.info(f"Run metrics saved to {metrics_path}")
 
-        # Combine all results into a single DataFrame
-        dataset = pd.concat(results, ignore_index=True)
-        dataset.to_csv(self.output_path / self.csv_name, index=False)
+        for name, cache in (("OCR", self.ocr_cache), ("Image", self.image_cache)):
+            if cache is not None:
+                prefix = name.lower()
+                hits, misses = run_metrics.counters[f"{prefix}_cache_hit"], run_metrics.counters[f"{prefix}_cache_miss"]
+                hit_rate = hits / (hits + misses) * 100 if hits + misses else 0.0
+                self.logger.info(f"{name} cache: {hits} hits, {misses} misses ({hit_rate:.1f}% hit rate)")
 
         # Save parameters used to generate this dataset for reproducibility
         save_run_params(self)
         self.logger.info("Dataset creation complete.")
-        return dataset
+
+        if self.distributed and self._merge_if_last(coordinator):
+            return read_committed_dataset(self.shared_output_path, self.csv_name, self.output_format) \
+                if return_dataset else None
+        return writer.read_dataset() if return_dataset else None
 
     def process_file(self, file_info: FileInfo) -> pd.DataFrame:
         """
@@ -148,24 +477,704 @@ class DataHandler:
             pd.DataFrame: DataFrame containing text results (per-page) and metadata.
         """
         ocr_results = []
+        for page_num in self.image_manager.get_page_numbers(file_info):
+            page_result = self.process_page(PageTask(file_info=file_info, page_num=page_num))
+            if page_result.row is not None:
+                ocr_results.append(page_result.row)
+
+        return pd.DataFrame(ocr_results, columns=self._result_columns())
+
+    def process_page(self, page_task: PageTask) -> PageResult:
+        """
+        Process a single page of a file. Extract text if OCR is enabled.
+
+        Args:
+            page_task (PageTask): The file and page to be processed.
+
+        Returns:
+            PageResult: The result row (None if the page could not be read) and event counters.
+        """
+        return resolve_page_result(self.finish_page(self.prepare_page(page_task), in_writer=run_inline))
+
+    def prepare_page(self, page_task: PageTask) -> PreparedPage:
+        """
+        First stage of page processing: take the text from the PDF text layer or the OCR cache if possible,
+        otherwise take the processed page image from the image cache or decode the page.
+
+        Args:
+            page_task (PageTask): The file and page to be processed.
+
+        Returns:
+            PreparedPage: Text found so far and the decoded image, if one is needed.
+        """
+        prepared = PreparedPage(page_task=page_task)
 
-        for processed_image, image_path, page in self.image_manager.process_image(file_info):
-            text = ""
-            if self.do_ocr:
+        prepared.text = self._read_text_layer(page_task) if self.text_layer_first else None
+        if prepared.text is not None:
+            prepared.text_source = "text_layer"
+
+        if prepared.text is None and self.ocr_cache is not None:
+            prepared.cache_key, prepared.ocr_output = self._read_ocr_cache(page_task)
+            prepared.counters["ocr_cache_hit" if prepared.ocr_output is not None else "ocr_cache_miss"] += 1
+
+        if self._needs_ocr(prepared) or self.save_processed_img:
+            file_info, page = page_task.file_info, page_task.page_num
+            if self.image_cache is not None:
+                prepared.image_cache_key, prepared.image = self._read_image_cache(page_task)
+                prepared.preprocessed = prepared.image is not None
+                prepared.counters["image_cache_hit" if prepared.preprocessed else "image_cache_miss"] += 1
+            try:
+                if prepared.image is None:
+                    prepared.image = self.image_manager.load_page(file_info, page)
+            except Exception as e:
+                self.logger.error(f"Image error on file {file_info.file_path}, page {page}: {e}")
+                prepared.failed = True
+
+        if self.filter_pages and prepared.image is not None and self._needs_ocr(prepared):
+            with stage_metrics.timed("page_filter"):
+                self._filter_page(prepared)
+        return prepared
+
+    def _filter_page(self, prepared: PreparedPage) -> None:
+        """Mark a decoded page as blank, or compute its hash for near-duplicate detection."""
+        thumbnail = to_gray_thumbnail(prepared.image)
+        if self.skip_blank_pages and ink_ratio(thumbnail) <= self.blank_max_ink_ratio:
+            prepared.status = "blank"
+            prepared.counters["blank_pages"] += 1
+        elif self.near_duplicates is not None:
+            prepared.page_hash = average_hash(thumbnail)
+
+    def finish_page(self, prepared: PreparedPage, in_writer: Callable[..., Future]) -> PageResult:
+        """
+        Second stage of page processing: preprocess the decoded image, save it and run OCR.
+
+        Args:
+            prepared (PreparedPage): Output of prepare_page.
+            in_writer (Callable[..., Future]): Runs func(*args), possibly asynchronously; used to encode and
+                save processed images and to store them in the image cache.
+
+        Returns:
+            PageResult: The result row (None if the page could not be read) and event counters.
+        """
+        page_task = prepared.page_task
+        file_info = page_task.file_info
+        page = page_task.page_num
+        counters = prepared.counters
+        if prepared.failed:
+            return PageResult(page_task=page_task, row=None, counters=dict(counters))
+
+        text, text_source, ocr_output = prepared.text, prepared.text_source, prepared.ocr_output
+        if prepared.page_hash is not None:
+            self._match_duplicate(prepared)
+            ocr_output = prepared.ocr_output
+
+        image_path, image_data = "", None
+        if prepared.image is not None and prepared.status == "ok":
+            if prepared.preprocessed:
+                processed_image = prepared.image
+            else:
+                try:
+                    processed_image = self.image_manager.preprocess(prepared.image)
+                except Exception as e:
+                    self.logger.error(f"Image error on file {file_info.file_path}, page {page}: {e}")
+                    return PageResult(page_task=page_task, row=None, counters=dict(counters))
+                if prepared.image_cache_key is not None:
+                    in_writer(self._write_image_cache, prepared.image_cache_key, processed_image)
+
+            if self.save_processed_img and self.image_output == "shards":
+                # Appended to a shard by the DatasetWriter, which fills in PreprocessedFilename
+                image_data = in_writer(self.image_manager.encode_image, processed_image)
+            elif self.save_processed_img:
+                # The row waits for the image to be written, and points to no file if saving fails
+                image_path = in_writer(
+                    self._save_image, processed_image, self.image_manager.image_output_path(file_info, page)
+                )
+
+            if self._needs_ocr(prepared):
                 try:
                     self.logger.debug(f"OCR Start -> {file_info.file_path}, page {page}")
-                    text = self.ocr_engine.recognize(image=processed_image)
+                    with stage_metrics.timed("ocr"):
+                        ocr_output = self.ocr_engine.recognize([processed_image])[0]
                     self.logger.debug(f"OCR End -> {file_info.file_path}, page {page}")
                 except Exception as e:
                     self.logger.error(f"OCR error on file {file_info.file_path}: {e}")
-                    text = ""
-
-            ocr_results.append({
-                "SourceFilename": file_info.file_path.name,
-                "Page": page,
-                "Text": text,
-                "Class": file_info.class_name,
-                "PreprocessedFilename": str(image_path) if self.save_processed_img and image_path else ""
+                    text_source = "ocr"
+                else:
+                    if prepared.cache_key is not None:
+                        self._write_ocr_cache(prepared.cache_key, ocr_output)
+                    if prepared.page_hash is not None:
+                        self._index_recognized_page(prepared.page_hash, file_info.file_path, page, ocr_output)
+
+        if ocr_output is not None:
+            text, text_source = ocr_output.text, "ocr"
+
+        row = {
+            "SourceFilename": file_info.file_path.name,
+            "Page": page,
+            "Text": text or "",
+            "Class": file_info.class_name,
+            "PreprocessedFilename": image_path,
+            "TextSource": text_source
+        }
+        if self.filter_pages:
+            row[PAGE_STATUS_COLUMN] = prepared.status
+        return PageResult(
+            page_task=page_task,
+            row=row,
+            counters=dict(counters),
+            word_boxes=ocr_output.word_boxes if ocr_output is not None and self.save_word_boxes else None,
+            image_data=image_data,
+            image_suffix=self.image_encoder.suffix
+        )
+
+    def _save_image(self, image: np.ndarray, image_path: Path) -> str:
+        """Save a processed image, returning its path, or an empty string if it was not saved."""
+        return str(image_path) if self.image_manager.save_image(image, image_path) else ""
+
+    def _index_recognized_page(self, page_hash: int, file_path: Path, page: int, ocr_output: OCROutput) -> None:
+        """Remember a recognized page for near-duplicate matching, with its OCR result only in "reuse" mode."""
+        if self.near_duplicates == "reuse":
+            self._duplicate_index.add(page_hash, (file_path, page, ocr_output), size=ocr_output.word_boxes.nbytes)
+        else:
+            self._duplicate_index.add(page_hash, (file_path, page, None))
+
+    def _match_duplicate(self, prepared: PreparedPage) -> None:
+        """Mark a page as a near-duplicate of a recognized page, taking over its OCR result in "reuse" mode."""
+        match = self._duplicate_index.find(prepared.page_hash)
+        if match is None:
+            return
+        file_path, page, ocr_output = match
+        prepared.status = "duplicate"
+        prepared.counters["duplicate_pages"] += 1
+        if self.near_duplicates == "reuse":
+            prepared.ocr_output = ocr_output
+        self.logger.debug(
+            f"{prepared.page_task.file_info.file_path}, page {prepared.page_task.page_num} "
+            f"is a near-duplicate of {file_path}, page {page}"
+        )
+
+    def process_pages(self, page_tasks: Iterable[PageTask]) -> Generator[PageResult, None, None]:
+        """
+        Process a stream of pages with decoding, OCR and image writing overlapped in a PagePipeline.
+
+        Args:
+            page_tasks (Iterable[PageTask]): The pages to be processed.
+
+        Yields:
+            PageResult: Results in task order.
+        """
+        pipeline = PagePipeline(
+            prepare_page=self.prepare_page,
+            finish_page=self.finish_page,
+            prefetch_pages=self.prefetch_pages,
+            write_queue_size=self.write_queue_size,
+            logging_level=self.logging_level
+        )
+        yield from pipeline.run(page_tasks)
+
+    def _result_columns(self) -> List[str]:
+        columns = RESULT_COLUMNS + [PAGE_STATUS_COLUMN] if self.filter_pages else list(RESULT_COLUMNS)
+        return columns + [SOURCE_PATH_COLUMN] if self.distributed else columns
+
+    def _render_params(self) -> dict:
+        """Parameters that change the page image seen by OCR, part of the OCR cache key."""
+        render_params = {"dpi": self.dpi, "megapixel": self.megapixel}
+        if self.color_mode != "bgr":
+            # Keeps the keys of BGR results, cached before the color mode existed, valid
+            render_params["color_mode"] = self.color_mode
+        if self.resampling != "lanczos":
+            render_params["resampling"] = self.resampling
+        return render_params
+
+    def _needs_ocr(self, prepared: PreparedPage) -> bool:
+        return self.do_ocr and prepared.text is None and prepared.ocr_output is None
+
+    def _read_ocr_cache(self, page_task: PageTask) -> tuple[str | None, OCROutput | None]:
+        """
+        Look up the OCR result of a page before it is decoded.
+
+        Returns:
+            tuple[str | None, OCROutput | None]: The cache key (None if it can't be computed) and the cached result.
+        """
+        try:
+            cache_key = self.ocr_cache.make_key(
+                file_path=page_task.file_info.file_path,
+                page_num=page_task.page_num,
+                render_params=self._render_params(),
+                processor_fingerprint=self._processor_fingerprint,
+                engine_name=getattr(self.ocr_engine, "engine_name", str(self.ocr_engine)),
+                ocr_lang=self.ocr_lang
+            )
+            with stage_metrics.timed("ocr_cache"):
+                return cache_key, self.ocr_cache.get(cache_key)
+        except Exception as e:
+            self.logger.warning(f"OCR cache error on file {page_task.file_info.file_path}: {e}")
+            return None, None
+
+    def _read_image_cache(self, page_task: PageTask) -> tuple[str | None, np.ndarray | None]:
+        """
+        Look up the processed image of a page before it is decoded.
+
+        Returns:
+            tuple[str | None, np.ndarray | None]: The cache key (None if it can't be computed) and the cached image.
+        """
+        try:
+            cache_key = self.image_cache.make_key(
+                file_path=page_task.file_info.file_path,
+                page_num=page_task.page_num,
+                render_params=self._render_params(),
+                processor_fingerprint=self._processor_fingerprint
+            )
+            with stage_metrics.timed("image_cache"):
+                return cache_key, self.image_cache.get(cache_key)
+        except Exception as e:
+            self.logger.warning(f"Image cache error on file {page_task.file_info.file_path}: {e}")
+            return None, None
+
+    def _write_image_cache(self, cache_key: str, image: np.ndarray) -> None:
+        try:
+            with stage_metrics.timed("image_cache_write"):
+                self.image_cache.put(cache_key, image)
+        except Exception as e:
+            self.logger.warning(f"Image cache write error: {e}")
+
+    def _write_ocr_cache(self, cache_key: str, ocr_output: OCROutput) -> None:
+        try:
+            self.ocr_cache.put(cache_key, ocr_output)
+        except Exception as e:
+            self.logger.warning(f"OCR cache write error: {e}")
+
+    def _read_text_layer(self, page_task: PageTask) -> str | None:
+        """
+        Return the PDF text layer of a page if it passes the quality check, otherwise None.
+        """
+        try:
+            with stage_metrics.timed("text_layer"):
+                text = self.image_manager.extract_text_layer(page_task.file_info, page_task.page_num)
+        except Exception as e:
+            self.logger.warning(f"Text layer error on file {page_task.file_info.file_path}: {e}")
+            return None
+
+        if text is None:
+            return None
+
+        quality = text_layer_quality(text)
+        self.logger.debug(
+            f"Text layer quality {quality:.2f} -> {page_task.file_info.file_path}, page {page_task.page_num}"
+        )
+        return text if quality >= self.text_layer_min_quality else None
+
+    def _resolve_executor(self, executor: str) -> str:
+        """Pick the executor for "auto" and check that the OCR engine supports the requested one."""
+        if executor not in EXECUTORS:
+            raise ValueError(f"Unknown {executor=}, expected one of {EXECUTORS}.")
+        parallel_executors = self._parallel_executors()
+        process_safe, thread_safe = "processes" in parallel_executors, "threads" in parallel_executors
+        if executor == "auto":
+            if self.num_workers <= 1:
+                executor = "serial"
+            elif parallel_executors:
+                executor = parallel_executors[0]
+            else:
+                executor = "serial"
+                self.logger.warning(
+                    f"OCR engine {self.ocr_engine.__class__.__name__} is neither thread- nor process-safe, "
+                    f"processing pages serially despite num_workers={self.num_workers}."
+                )
+        elif executor == "processes" and not process_safe:
+            raise ValueError(f"OCR engine {self.ocr_engine.__class__.__name__} can't be used in worker processes.")
+        elif executor == "threads" and not thread_safe:
+            raise ValueError(f"OCR engine {self.ocr_engine.__class__.__name__} can't be shared by threads.")
+        self.logger.debug(f"Executor: {executor}, {self.num_workers} workers")
+        return executor
+
+    def _parallel_executors(self) -> Tuple[str, ...]:
+        """Parallel executors supported by the OCR engine, in order of preference."""
+        # Without OCR only built-in stages run, which are safe in threads and processes
+        process_safe = not self.do_ocr or getattr(self.ocr_engine, "process_safe", False)
+        thread_safe = not self.do_ocr or getattr(self.ocr_engine, "thread_safe", False)
+        return tuple(name for name, safe in (("processes", process_safe), ("threads", thread_safe)) if safe)
+
+    def _calibration_splits(self, executor: str) -> List[Tuple[str, int, int]]:
+        """Candidate (executor, num_workers, threads_per_worker) settings for num_workers="auto"."""
+        executors = self._parallel_executors() if executor == "auto" else (self.executor,)
+        candidates = [
+            (name, self.usable_cpus // threads, threads)
+            for threads in CALIBRATION_THREADS_PER_WORKER if self.usable_cpus // threads > 1
+            for name in executors if name != "serial"
+        ]
+        return candidates if len(candidates) > 1 else []
+
+    def _run_page_tasks(self, page_tasks: Iterable[PageTask]) -> Generator[PageResult, None, None]:
+        """
+        Process page tasks, in parallel when possible, yielding results in completion order.
+        The first pages calibrate num_workers="auto", see _calibrate.
+        """
+        page_tasks = iter(page_tasks)
+        if self._calibration_candidates:
+            yield from self._calibrate(page_tasks)
+        yield from self._execute(page_tasks)
+
+    def _calibrate(self, page_tasks: Iterator[PageTask]) -> Generator[PageResult, None, None]:
+        """
+        Process the same sample of pages with each candidate split of the CPUs, discarding the results,
+        then process the sample for the dataset and continue with the split that reached the highest pages/s.
+        """
+        candidates, self._calibration_candidates = self._calibration_candidates, []
+        num_pages = max(
+            max(self.calibration_pages, 2 * num_workers * self.pages_per_task) for _, num_workers, _ in candidates
+        )
+        sample = list(itertools.islice(page_tasks, num_pages))
+        if not sample:
+            return
+
+        self.calibration = []
+        for executor, num_workers, threads_per_worker in candidates:
+            self.executor, self.num_workers, self.threads_per_worker = executor, num_workers, threads_per_worker
+            with self._calibration_trial():
+                pages_per_sec = self._measure_pages_per_sec(sample)
+            self.calibration.append({
+                "executor": executor, "num_workers": num_workers, "threads_per_worker": threads_per_worker,
+                "pages": len(sample), "pages_per_sec": round(pages_per_sec, 3)
             })
+            self.logger.info(
+                f"Calibration: {executor} x {num_workers}, {threads_per_worker} threads each -> "
+                f"{pages_per_sec:.2f} pages/s on {len(sample)} pages"
+            )
+
+        best = max(self.calibration, key=lambda candidate: candidate["pages_per_sec"])
+        self.executor, self.num_workers, self.threads_per_worker = \
+            best["executor"], best["num_workers"], best["threads_per_worker"]
+        self.logger.info(
+            f"Using {self.executor} x {self.num_workers} with {self.threads_per_worker} threads each "
+            f"({self.usable_cpus} usable CPUs)"
+        )
+        yield from self._execute(sample)
+
+    def _measure_pages_per_sec(self, sample: List[PageTask]) -> float:
+        """
+        Pages/s of the current executor on a sample, timed from its first completed group of pages,
+        so the start-up of a worker pool is not counted.
+        """
+        start = time.monotonic()
+        first_done, num_results = None, 0
+        for _ in self._execute(sample):
+            num_results += 1
+            if first_done is None:
+                first_done = time.monotonic()
+        # The pages of the first group are completed together, the pages of the later groups are timed
+        timed_pages = num_results - min(self.pages_per_task, num_results)
+        if first_done is None or timed_pages == 0:
+            return num_results / max(time.monotonic() - start, 1e-6)
+        return timed_pages / max(time.monotonic() - first_done, 1e-6)
+
+    @contextmanager
+    def _calibration_trial(self) -> Iterator[None]:
+        """
+        Give every candidate the same starting point: no OCR or image cache (which an earlier candidate would
+        have filled), an empty near-duplicate index and no stage metrics, for results that are discarded.
+        """
+        saved = self.ocr_cache, self.image_cache, self._duplicate_index
+        self.ocr_cache, self.image_cache, self._duplicate_index = None, None, self._new_duplicate_index()
+        try:
+            with stage_metrics.suspended():
+                yield
+        finally:
+            self.ocr_cache, self.image_cache, self._duplicate_index = saved
+
+    def _new_duplicate_index(self) -> NearDuplicateIndex | None:
+        if self.near_duplicates is None:
+            return None
+        return NearDuplicateIndex(
+            max_distance=self.duplicate_max_distance,
+            max_value_bytes=DUPLICATE_INDEX_MAX_MB * 1024 * 1024 if self.near_duplicates == "reuse" else None
+        )
+
+    def _execute(self, page_tasks: Iterable[PageTask]) -> Generator[PageResult, None, None]:
+        """Process page tasks with the current executor, yielding results in completion order."""
+        in_threads = self.num_workers > 1 and self.executor == "threads"
+        in_processes = self.num_workers > 1 and self.executor == "processes"
+        if self.threads_per_worker is not None and not in_processes:
+            # OpenCV's thread count is per process, the worker threads share it.
+            # Worker processes apply their limits in _init_worker instead
+            num_threads = self.num_workers if in_threads else 1
+            limit_threads(self.threads_per_worker, opencv_threads=num_threads * self.threads_per_worker)
+        if in_threads:
+            yield from self._run_in_threads(page_tasks)
+        elif in_processes:
+            # Pages are sent in small groups, so each worker can overlap decoding and writing within a group.
+            # The handler is sent to each worker once, instead of being pickled into every task
+            page_groups = _batched(page_tasks, self.pages_per_task)
+            # The pool consumes its input eagerly, the window keeps tasks (and leased files) from piling up
+            window = threading.BoundedSemaphore(2 * self.num_workers)
+            stopped = threading.Event()
+
+            def windowed(groups: Iterable[List[PageTask]]) -> Generator[List[PageTask], None, None]:
+                for group in groups:
+                    while not window.acquire(timeout=1):
+                        if stopped.is_set():
+                            return
+                    yield group
+
+            worker_ids = multiprocessing.Value("i", 0)
+            with Pool(self.num_workers, initializer=_init_worker, initargs=(self, worker_ids)) as pool:
+                try:
+                    for page_results in pool.imap_unordered(_process_page_group, windowed(page_groups)):
+                        window.release()
+                        yield from page_results
+                    # Lets workers run their exit handlers (e.g. release shared memory) instead of being terminated
+                    pool.close()
+                    pool.join()
+                finally:
+                    stopped.set()
+        else:
+            yield from self.process_pages(page_tasks)
+
+    def _run_in_threads(self, page_tasks: Iterable[PageTask]) -> Generator[PageResult, None, None]:
+        """
+        Process groups of pages in a thread pool sharing this handler, yielding results in completion order.
+        """
+        if self._thread_pool is None:
+            self._thread_pool = ThreadPoolExecutor(self._thread_pool_size, thread_name_prefix="page-worker")
+        # Groups in flight bound the number of busy threads to num_workers, even in a larger pool
+        max_pending = self.num_workers
+        page_groups = _batched(page_tasks, self.pages_per_task)
+        pending = set()
+        try:
+            for group in page_groups:
+                pending.add(self._thread_pool.submit(lambda pages: list(self.process_pages(pages)), group))
+                while len(pending) >= max_pending:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        yield from future.result()
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield from future.result()
+        finally:
+            for future in pending:
+                future.cancel()
+
+    def _shutdown_thread_pool(self) -> None:
+        if self._thread_pool is not None:
+            self._thread_pool.shutdown(wait=True)
+            self._thread_pool = None
+
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        # Pool worker processes get the handler without the thread pool of this process
+        state["_thread_pool"] = None
+        return state
+
+    def _write_results(self, writer: DatasetWriter, page_tasks: Iterable[PageTask], run_metrics: RunMetrics) -> None:
+        """Write the results of page tasks, aggregating their metrics and logging progress."""
+        # Stage metrics of pages processed in this process are drained here, workers attach theirs to results
+        local_pages = 0
+        next_report = time.monotonic() + self.progress_interval_sec
+        for page_result in self._run_page_tasks(page_tasks):
+            run_metrics.page_done()
+            run_metrics.counters.update(page_result.counters)
+            if page_result.metrics is not None:
+                run_metrics.add(page_result.metrics)
+            local_pages += self.num_workers <= 1 or self.executor != "processes"
+
+            if self.distributed and page_result.row is not None:
+                page_result.row[SOURCE_PATH_COLUMN] = self._relative_path(page_result.page_task.file_info.file_path)
+            writer.write(page_result)
+
+            if time.monotonic() >= next_report:
+                run_metrics.add(stage_metrics.drain(pages=local_pages))
+                local_pages = 0
+                self.logger.info(run_metrics.progress_line())
+                next_report = time.monotonic() + self.progress_interval_sec
+
+        run_metrics.add(stage_metrics.drain(pages=local_pages))
+
+    def _page_tasks(
+            self,
+            completed_units: Set[Tuple[str, int]],
+            file_batches: Iterable[List[FileInfo]] | None = None,
+            lease_tracker: LeaseTracker | None = None,
+            run_metrics: RunMetrics | None = None
+    ) -> Generator[PageTask, None, None]:
+        """
+        Expand file batches into per-page tasks.
+
+        Args:
+            completed_units (Set[Tuple[str, int]]): Units already completed by a resumed run, these are skipped.
+            file_batches (Iterable[List[FileInfo]]): Files to process, FilePathManager batches by default.
+            lease_tracker (LeaseTracker): Tracker of the leased files, told how many pages each file has.
+            run_metrics (RunMetrics): Run metrics, told how many pages are queued for the progress ETA.
+
+        Yields:
+            PageTask: One task per page that should be processed.
+        """
+        if file_batches is None:
+            file_batches = self.file_path_manager.file_batches()
+
+        for file_batch in file_batches:
+            for file_info in file_batch:
+                if self.num_shards > 1 and \
+                        shard_of(self._relative_path(file_info.file_path), self.num_shards) != self.shard_id:
+                    continue
+
+                try:
+                    with stage_metrics.timed("page_count"):
+                        page_numbers = self.image_manager.get_page_numbers(file_info)
+                except Exception as e:
+                    self.logger.error(f"Failed to read pages of file {file_info.file_path}: {e}")
+                    page_numbers = []
+
+                page_tasks = [PageTask(file_info=file_info, page_num=page_num) for page_num in page_numbers]
+                page_tasks = [task for task in page_tasks if DatasetWriter.unit_key(task) not in completed_units]
+                if lease_tracker is not None:
+                    lease_tracker.expect(file_info.file_path, len(page_tasks))
+                if run_metrics is not None:
+                    run_metrics.pages_queued += len(page_tasks)
+                yield from page_tasks
+
+        if run_metrics is not None:
+            run_metrics.queueing_done = True
+
+    def _join_work_queue(self) -> LeaseCoordinator:
+        """
+        Open the lease queue of a distributed run, filling it with the sampled input files if this node
+        is the first one to start.
+        """
+        coordinator = LeaseCoordinator(
+            db_path=self.shared_output_path / LEASES_FILE_NAME,
+            node_id=self.node_id,
+            lease_timeout_sec=self.lease_timeout_sec,
+            logging_level=self.logging_level
+        )
+        coordinator.release_own()
+        self._populate_if_elected(coordinator)
+        # Files are sampled with the populator's seed, record that one
+        self.seed = coordinator.seed()
+        return coordinator
+
+    def _populate_if_elected(self, coordinator: LeaseCoordinator) -> None:
+        """Fill the lease queue if this node is elected populator, e.g. after the populator died."""
+        if coordinator.try_become_populator(self.seed):
+            # Sampling uses the seed of the first populator, in case this node restarted with another one
+            self.file_path_manager.seed = coordinator.seed()
+            coordinator.populate(
+                (self._relative_path(file_info.file_path), file_info.class_name)
+                for file_batch in self.file_path_manager.file_batches()
+                for file_info in file_batch
+            )
+
+    def _leased_file_batches(self, lease_tracker: LeaseTracker) -> Generator[List[FileInfo], None, None]:
+        """Claim files batch by batch, as tasks are consumed, until none is claimable."""
+        while True:
+            claimed = lease_tracker.claim(self.batch_size_per_worker)
+            if not claimed:
+                return
+            yield [FileInfo(file_path=file_path, class_name=class_name) for file_path, class_name in claimed]
+
+    def _merge_if_last(self, coordinator: LeaseCoordinator | None) -> bool:
+        """
+        Merge the shards of a distributed run if all of its work is done. Only one node merges.
+
+        Returns:
+            bool: True if this node merged the shards.
+        """
+        if coordinator is not None:
+            finished = coordinator.all_done()
+        else:
+            completed_shards = set()
+            for shard_path in shard_paths(self.shared_output_path):
+                shard_params = load_run_params(shard_path) or {}
+                if shard_params.get("num_shards") == self.num_shards and is_run_complete(shard_path):
+                    completed_shards.add(shard_params.get("shard_id"))
+            finished = completed_shards == set(range(self.num_shards))
+
+        if not finished:
+            self.logger.info("Other nodes are still working, they will merge the shards.")
+            return False
+
+        try:
+            open(self.shared_output_path / MERGE_LOCK_NAME, "x").close()
+        except FileExistsError:
+            self.logger.info("Shards are merged by another node.")
+            return False
+
+        try:
+            merge_shards(self.shared_output_path, self.csv_name, self.output_format, self.logging_level)
+        except BaseException:
+            # Lets a later run of any node retry the merge
+            (self.shared_output_path / MERGE_LOCK_NAME).unlink(missing_ok=True)
+            raise
+        return True
+
+    def _relative_path(self, file_path: Path) -> str:
+        return file_path.relative_to(self.input_path).as_posix()
+
+    def _resolve_output_path(self, output_path: Path) -> Path:
+        """
+        Find an unfinished run with matching parameters among output_path, output_path_1, ...
+        to resume, otherwise create a new output directory.
+        """
+        if self.resume:
+            run_params = self._resumable_params(collect_run_params(self))
+            candidate, index = output_path, 0
+            while candidate.exists():
+                saved_params = load_run_params(candidate)
+                if saved_params is not None and not is_run_complete(candidate) \
+                        and self._resumable_params(saved_params) == run_params:
+                    self.logger.info(f"Resuming unfinished run in {candidate}")
+                    self.seed = saved_params["seed"]
+                    return candidate
+                index += 1
+                candidate = output_path.parent / f"{output_path.name}_{index}"
+
+        return create_directory(output_path)
+
+    def _resumable_params(self, params: dict) -> dict:
+        """Drop parameters that may differ between an interrupted run and its resumption."""
+        ignored = {
+            "output_path", "logging_level", "num_workers", "batch_size_per_worker", "write_chunk_size",
+            "pages_per_task", "prefetch_pages", "write_queue_size", "file_index_path", "scan_threads",
+            "lease_timeout_sec", "progress_interval_sec", "executor", "threads_per_worker", "bind_workers",
+            "calibration_pages", "calibration", "usable_cpus"
+        }
+        if self.seed is None:
+            # Sampling is reproduced from the seed saved by the interrupted run
+            ignored.add("seed")
+        return {key: value for key, value in params.items() if key not in ignored}
+
+
+# Handler instance owned by a pool worker process, set once by the pool initializer
+_worker_handler: DataHandler | None = None
+
+
+def _init_worker(handler: DataHandler, worker_ids) -> None:
+    global _worker_handler
+    _worker_handler = handler
+    if handler.threads_per_worker is not None:
+        limit_threads(handler.threads_per_worker)
+    if handler.bind_workers:
+        with worker_ids.get_lock():
+            worker_index = worker_ids.value
+            worker_ids.value += 1
+        cores = bind_to_cores(worker_index, handler.threads_per_worker or 1)
+        handler.logger.debug(f"Worker {worker_index} bound to cores {cores}")
+
+
+def _process_page_group(page_tasks: List[PageTask]) -> List[PageResult]:
+    page_results = list(_worker_handler.process_pages(page_tasks))
+    # Drained after the group, so the image writes of its last pages are included
+    if page_results:
+        page_results[-1].metrics = stage_metrics.drain(pages=len(page_results))
+    return page_results
+
 
-        return pd.DataFrame(ocr_results)
+def _batched(items: Iterable, size: int) -> Generator[list, None, None]:
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
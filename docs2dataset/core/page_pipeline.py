@@ -0,0 +1,166 @@
+import logging
+import queue
+import threading
+from collections import Counter, deque
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Generator, Iterable
+
+import numpy as np
+
+from docs2dataset.ocr.ocr_interface import OCROutput
+from docs2dataset.utils.logging_utils import setup_logger
+from docs2dataset.utils.page_task import PageResult, PageTask
+
+# Marks the end of the stream in the stage queues
+_DONE = object()
+
+
+@dataclass
+class PreparedPage:
+    """State of a page after the decode stage, before preprocessing and OCR."""
+    page_task: PageTask
+    counters: Counter = field(default_factory=Counter)
+    text: str | None = None
+    text_source: str = "none"
+    cache_key: str | None = None
+    ocr_output: OCROutput | None = None
+    image: np.ndarray | None = None  # Decoded page, None if no image is needed or decoding failed
+    preprocessed: bool = False  # Whether image is already preprocessed (taken from the image cache)
+    image_cache_key: str | None = None
+    failed: bool = False
+    status: str = "ok"  # "blank" if the page filter found no ink, "duplicate" is set in the OCR stage
+    page_hash: int | None = None  # Perceptual hash for near-duplicate detection
+
+
+class PagePipeline:
+    """
+    Runs page tasks through three stages connected by bounded queues:
+
+    1. A prefetch thread reads and decodes upcoming pages (prepare_page).
+    2. The calling thread preprocesses pages and runs OCR (finish_page).
+    3. A writer thread runs the work finish_page hands off to it, e.g. encoding and writing processed images.
+
+    Disk I/O and codec work therefore overlap with the CPU-bound OCR, while at most
+    prefetch_pages + write_queue_size + 1 pages are held in memory.
+
+    Work handed to the writer returns a Future. A result whose image_data or row values are such Futures is
+    held back (with the results after it) until the writer has produced the values, so a row is never
+    committed before the image it points to is written.
+    """
+
+    def __init__(
+            self,
+            prepare_page: Callable[[PageTask], PreparedPage],
+            finish_page: Callable[[PreparedPage, Callable[..., None]], PageResult],
+            prefetch_pages: int = 2,
+            write_queue_size: int = 4,
+            logging_level: int = logging.INFO
+    ):
+        self.prepare_page = prepare_page
+        self.finish_page = finish_page
+        self.prefetch_pages = prefetch_pages
+        self.write_queue_size = write_queue_size
+        self.logger = setup_logger(self.__class__.__name__, logging_level)
+
+    def run(self, page_tasks: Iterable[PageTask]) -> Generator[PageResult, None, None]:
+        """
+        Process page tasks, yielding results in task order. All images are written when the generator finishes.
+        """
+        stop = threading.Event()
+        prepared_queue = queue.Queue(maxsize=max(1, self.prefetch_pages))
+        write_queue = queue.Queue(maxsize=max(1, self.write_queue_size))
+
+        prefetcher = threading.Thread(
+            target=self._prefetch, args=(page_tasks, prepared_queue, stop), name="page-prefetch", daemon=True
+        )
+        writer = threading.Thread(target=self._write, args=(write_queue,), name="page-writer", daemon=True)
+        prefetcher.start()
+        writer.start()
+
+        def in_writer(func: Callable[..., Any], *args) -> Future:
+            future = Future()
+            write_queue.put((func, args, future))
+            return future
+
+        pending = deque()
+        try:
+            while True:
+                prepared = prepared_queue.get()
+                if prepared is _DONE:
+                    break
+                if isinstance(prepared, BaseException):
+                    raise prepared
+                pending.append(self.finish_page(prepared, in_writer))
+                while pending and not _is_pending(pending[0]):
+                    yield resolve_page_result(pending.popleft())
+            while pending:
+                yield resolve_page_result(pending.popleft())
+        finally:
+            stop.set()
+            # Unblock the prefetcher if it waits on a full queue
+            while prefetcher.is_alive():
+                try:
+                    prepared_queue.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+            write_queue.put(_DONE)
+            writer.join()
+
+    def _prefetch(self, page_tasks: Iterable[PageTask], prepared_queue: queue.Queue, stop: threading.Event) -> None:
+        try:
+            for page_task in page_tasks:
+                if stop.is_set():
+                    return
+                prepared_queue.put(self.prepare_page(page_task))
+        except BaseException as e:
+            # Surface errors of the task source (e.g. directory scanning) in the calling thread
+            prepared_queue.put(e)
+            return
+        prepared_queue.put(_DONE)
+
+    def _write(self, write_queue: queue.Queue) -> None:
+        while True:
+            item = write_queue.get()
+            if item is _DONE:
+                return
+            func, args, future = item
+            future.set_result(run_logged(func, args, self.logger))
+
+
+def run_logged(func: Callable[..., Any], args: tuple, logger: logging.Logger) -> Any:
+    """Run func(*args), logging a failure and returning None instead of raising."""
+    try:
+        return func(*args)
+    except Exception as e:
+        paths = [str(arg) for arg in args if isinstance(arg, Path)]
+        logger.error(f"{getattr(func, '__name__', func)} failed {paths}: {e}")
+        return None
+
+
+def run_inline(func: Callable[..., Any], *args) -> Future:
+    """in_writer of synchronous page processing, runs func right away with the same error handling."""
+    future = Future()
+    future.set_result(run_logged(func, args, logging.getLogger(PagePipeline.__name__)))
+    return future
+
+
+def resolve_page_result(page_result: PageResult) -> PageResult:
+    """
+    Wait for the values the writer still produces for a result. A row value the writer failed to produce
+    (None) becomes an empty string.
+    """
+    if isinstance(page_result.image_data, Future):
+        page_result.image_data = page_result.image_data.result()
+    if page_result.row is not None:
+        for column, value in page_result.row.items():
+            if isinstance(value, Future):
+                value = value.result()
+                page_result.row[column] = "" if value is None else value
+    return page_result
+
+
+def _is_pending(page_result: PageResult) -> bool:
+    values = [page_result.image_data, *(page_result.row.values() if page_result.row is not None else ())]
+    return any(isinstance(value, Future) and not value.done() for value in values)
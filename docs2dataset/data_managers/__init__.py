@@ -1,2 +1,6 @@
+from .file_index import FileIndex
 from .file_path_manager import FilePathManager
 from .image_manager import ImageManager
+from .dataset_writer import DatasetWriter
+from .image_shards import ImageShardWriter, read_image_ref, read_shard_index
+from .image_encoders import BoundedEncoder, ImageEncoder, create_image_encoder
@@ -0,0 +1,368 @@
+import io
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Callable, Generator, List, Set, Tuple
+
+import numpy as np
+import pandas as pd
+
+from docs2dataset.data_managers.image_shards import ImageShardWriter
+from docs2dataset.ocr.ocr_interface import WordBoxes
+from docs2dataset.utils.logging_utils import setup_logger
+from docs2dataset.utils.page_task import PageResult, PageTask
+
+MANIFEST_NAME = "manifest.jsonl"
+WORD_BOXES_DIR_NAME = "word_boxes"
+
+
+class DatasetWriter:
+    """
+    Appends result rows to the output dataset as they arrive, in chunks of chunk_size rows.
+
+    Every flushed chunk is committed to a manifest of completed (file, page) units together with the size of
+    the output at that point. A run interrupted between two commits can therefore be resumed: output written
+    after the last commit is discarded and only the units missing from the manifest are processed again.
+
+    Supported output formats are "csv" (a single appended file) and "parquet" (a directory with one part
+    file per chunk, requires pyarrow). OCR word boxes are optionally saved as one columnar .npz part per chunk
+    in the word_boxes directory, see read_word_boxes.
+
+    With an ImageShardWriter, the encoded images of page results (PageResult.image_data) are appended to
+    tar shards and their references are stored in the image_ref_column of the rows. Shard positions are
+    committed with the rows, see ImageShardWriter.
+    """
+
+    def __init__(
+            self,
+            output_path: Path,
+            csv_name: str,
+            columns: List[str],
+            output_format: str = "csv",
+            chunk_size: int = 1000,
+            save_word_boxes: bool = False,
+            on_commit: Callable[[List[Tuple[str, int]]], None] | None = None,
+            image_shards: ImageShardWriter | None = None,
+            image_ref_column: str = "PreprocessedFilename",
+            word_box_source: Callable[[Path], str] | None = None,
+            logging_level: int = logging.INFO
+    ):
+        if output_format not in ("csv", "parquet"):
+            raise ValueError(f"Unsupported {output_format=}, expected 'csv' or 'parquet'.")
+
+        self.logger = setup_logger(self.__class__.__name__, logging_level)
+        self.output_path = Path(output_path)
+        self.columns = columns
+        self.output_format = output_format
+        self.chunk_size = chunk_size
+        self.save_word_boxes = save_word_boxes
+        self.on_commit = on_commit
+        self.image_shards = image_shards
+        self.image_ref_column = image_ref_column
+        # Word boxes are keyed by the absolute source path, or by this path (e.g. relative to a shared input)
+        self.word_box_source = word_box_source
+        self.csv_path = self.output_path / csv_name
+        self.parquet_path = self.csv_path.with_suffix(".parquet")
+        self.manifest_path = self.output_path / MANIFEST_NAME
+        self.word_boxes_path = self.output_path / WORD_BOXES_DIR_NAME
+
+        # Units committed by a previous run, skipped on resume. Units committed by this run are not added, so
+        # memory doesn't grow with the corpus: within a run each file is listed once, or leased until marked done
+        self.completed_units: Set[Tuple[str, int]] = set()
+        self._csv_bytes = 0
+        self._parquet_parts = 0
+        self._box_parts = 0
+        self._image_shards_state: dict | None = None
+        self._rows: List[dict] = []
+        self._word_boxes: List[Tuple[str, int, WordBoxes]] = []
+        self._units: List[Tuple[str, int]] = []
+        self._manifest = None
+
+    def __enter__(self) -> "DatasetWriter":
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+    @staticmethod
+    def unit_key(page_task: PageTask) -> Tuple[str, int]:
+        return page_task.file_info.file_path.as_posix(), page_task.page_num
+
+    def open(self) -> None:
+        """Load the manifest of a previous run, roll back uncommitted output and start appending."""
+        self._load_manifest()
+        self._rollback_uncommitted()
+        if self.image_shards is not None:
+            self.image_shards.open(self._image_shards_state)
+        self._manifest = open(self.manifest_path, "a", encoding="utf-8")
+
+        if self.completed_units:
+            self.logger.info(f"Resuming run, {len(self.completed_units)} pages are already completed.")
+
+    def write(self, page_result: PageResult) -> None:
+        """
+        Buffer a page result. Pages without a row (e.g. unreadable images) are committed as completed as well,
+        so they are not retried on resume.
+        """
+        unit_key = self.unit_key(page_result.page_task)
+        if page_result.row is not None:
+            if self.image_shards is not None and page_result.image_data is not None:
+                page_result.row[self.image_ref_column] = self.image_shards.append(
+                    page_result.image_data, page_result.image_suffix, *unit_key
+                )
+            self._rows.append(page_result.row)
+        if self.save_word_boxes and page_result.word_boxes is not None:
+            source = unit_key[0] if self.word_box_source is None else \
+                self.word_box_source(page_result.page_task.file_info.file_path)
+            self._word_boxes.append((source, unit_key[1], page_result.word_boxes))
+        self._units.append(unit_key)
+
+        if len(self._units) >= self.chunk_size:
+            self.flush()
+
+    def flush(self) -> None:
+        """Write the buffered rows and commit them to the manifest."""
+        if not self._units:
+            return
+
+        if self._rows:
+            chunk = pd.DataFrame(self._rows, columns=self.columns)
+            if self.output_format == "csv":
+                self._append_csv(chunk)
+            else:
+                self._append_parquet(chunk)
+        if self._word_boxes:
+            self._append_word_boxes()
+        if self.image_shards is not None:
+            self.image_shards.sync()
+
+        self._commit({"units": self._units})
+        self.logger.debug(f"Committed {len(self._units)} page(s) to the manifest.")
+        units = self._units
+        self._rows, self._units, self._word_boxes = [], [], []
+        if self.on_commit is not None:
+            self.on_commit(units)
+
+    def mark_complete(self) -> None:
+        """Flush remaining rows and mark the run as finished, so it is not resumed again."""
+        self.flush()
+        self._commit({"complete": True})
+
+    def close(self) -> None:
+        if self._manifest is not None:
+            self.flush()
+            self._manifest.close()
+            self._manifest = None
+        if self.image_shards is not None:
+            self.image_shards.close()
+
+    def read_dataset(self) -> pd.DataFrame:
+        """Load the written dataset back into memory."""
+        if self.output_format == "parquet":
+            if not self.parquet_path.exists():
+                return pd.DataFrame(columns=self.columns)
+            return pd.read_parquet(self.parquet_path)
+
+        if not self.csv_path.exists():
+            return pd.DataFrame(columns=self.columns)
+        return pd.read_csv(self.csv_path, keep_default_na=False)
+
+    def _append_csv(self, chunk: pd.DataFrame) -> None:
+        with open(self.csv_path, "a", encoding="utf-8", newline="") as f:
+            chunk.to_csv(f, index=False, header=self._csv_bytes == 0)
+            f.flush()
+            os.fsync(f.fileno())
+            self._csv_bytes = f.tell()
+
+    def _append_parquet(self, chunk: pd.DataFrame) -> None:
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError as e:
+            raise ImportError("Parquet output requires pyarrow, install it with `pip install pyarrow`.") from e
+
+        self.parquet_path.mkdir(exist_ok=True)
+        part_path = self.parquet_path / f"part-{self._parquet_parts:05d}.parquet"
+        tmp_path = part_path.with_suffix(".tmp")
+        chunk.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, part_path)
+        self._parquet_parts += 1
+
+    def _append_word_boxes(self) -> None:
+        """Write the buffered word boxes as one columnar part, pages are delimited by word_offsets."""
+        self.word_boxes_path.mkdir(exist_ok=True)
+        write_word_boxes_part(self.word_boxes_path / f"part-{self._box_parts:05d}.npz", self._word_boxes)
+        self._box_parts += 1
+
+    def _commit(self, record: dict) -> None:
+        record = {
+            **record,
+            "csv_bytes": self._csv_bytes,
+            "parquet_parts": self._parquet_parts,
+            "box_parts": self._box_parts
+        }
+        if self.image_shards is not None:
+            record["image_shards"] = self.image_shards.state()
+        self._manifest.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._manifest.flush()
+        os.fsync(self._manifest.fileno())
+
+    def _load_manifest(self) -> None:
+        records, committed_bytes = _read_manifest(self.manifest_path)
+        for record in records:
+            self.completed_units.update((path, page) for path, page in record.get("units", []))
+            self._csv_bytes = record["csv_bytes"]
+            self._parquet_parts = record["parquet_parts"]
+            self._box_parts = record.get("box_parts", 0)
+            self._image_shards_state = record.get("image_shards")
+
+        if self.manifest_path.exists() and self.manifest_path.stat().st_size > committed_bytes:
+            self.logger.warning(f"Discarding a partially written record at the end of {self.manifest_path}")
+            with open(self.manifest_path, "r+b") as f:
+                f.truncate(committed_bytes)
+
+    def _rollback_uncommitted(self) -> None:
+        """Drop output that was written after the last manifest commit (e.g. by a crashed run)."""
+        if self.csv_path.exists() and self.csv_path.stat().st_size > self._csv_bytes:
+            self.logger.warning(f"Discarding uncommitted rows at the end of {self.csv_path}")
+            with open(self.csv_path, "r+b") as f:
+                f.truncate(self._csv_bytes)
+
+        self._rollback_parts(self.parquet_path, ".parquet", self._parquet_parts)
+        self._rollback_parts(self.word_boxes_path, ".npz", self._box_parts)
+
+    def _rollback_parts(self, parts_path: Path, suffix: str, committed_parts: int) -> None:
+        if not parts_path.exists():
+            return
+
+        for part_path in parts_path.iterdir():
+            part_index = part_path.stem.split("-")[-1]
+            if part_path.suffix != suffix or not part_index.isdigit() or int(part_index) >= committed_parts:
+                self.logger.warning(f"Discarding uncommitted output part {part_path}")
+                part_path.unlink()
+
+
+def write_word_boxes_part(part_path: Path, entries: List[Tuple[str, int, WordBoxes]]) -> None:
+    """
+    Atomically write the word boxes of several pages as one columnar .npz part,
+    pages are delimited by word_offsets.
+
+    Args:
+        part_path (Path): Path of the part file.
+        entries (List[Tuple[str, int, WordBoxes]]): Source file path, page number and word boxes of each page.
+    """
+    sources, pages, word_boxes = zip(*entries)
+    word_offsets = np.cumsum([0] + [len(boxes) for boxes in word_boxes], dtype=np.int64)
+
+    tmp_path = part_path.with_suffix(".tmp")
+    with open(tmp_path, "wb") as f:
+        np.savez(
+            f,
+            sources=np.array(sources, dtype=str),
+            pages=np.array(pages, dtype=np.int32),
+            word_offsets=word_offsets,
+            words=np.concatenate([boxes.words.astype(str) for boxes in word_boxes]),
+            boxes=np.concatenate([boxes.boxes for boxes in word_boxes]).astype(np.int32),
+            confidences=np.concatenate([boxes.confidences for boxes in word_boxes]).astype(np.float32)
+        )
+    os.replace(tmp_path, part_path)
+
+
+def read_committed_dataset(output_path: Path, csv_name: str, output_format: str = "csv") -> pd.DataFrame | None:
+    """
+    Read the rows of a run committed to its manifest, ignoring rows that are still being written.
+
+    Args:
+        output_path (Path): Output directory of a run.
+        csv_name (str): Name of the CSV file (its .parquet counterpart for the parquet format).
+        output_format (str): "csv" or "parquet".
+
+    Returns:
+        pd.DataFrame | None: Committed rows, None if nothing was committed yet.
+    """
+    records = read_manifest(Path(output_path) / MANIFEST_NAME)
+    if not records:
+        return None
+
+    last_record = records[-1]
+    csv_path = Path(output_path) / csv_name
+    if output_format == "parquet":
+        parquet_path = csv_path.with_suffix(".parquet")
+        parts = [
+            pd.read_parquet(parquet_path / f"part-{i:05d}.parquet") for i in range(last_record["parquet_parts"])
+        ]
+        return pd.concat(parts, ignore_index=True) if parts else None
+
+    if last_record["csv_bytes"] == 0:
+        return None
+    with open(csv_path, "rb") as f:
+        data = f.read(last_record["csv_bytes"])
+    return pd.read_csv(io.BytesIO(data), keep_default_na=False)
+
+
+def read_word_boxes(output_path: Path) -> Generator[Tuple[str, int, WordBoxes], None, None]:
+    """
+    Read the word boxes saved by DatasetWriter.
+
+    Args:
+        output_path (Path): Output directory of a run.
+
+    Yields:
+        Tuple[str, int, WordBoxes]: Source file path, page number and the page's word boxes.
+    """
+    parts_path = Path(output_path) / WORD_BOXES_DIR_NAME
+    if not parts_path.exists():
+        return
+
+    for part_path in sorted(parts_path.glob("part-*.npz")):
+        yield from read_word_boxes_part(part_path)
+
+
+def read_word_boxes_part(part_path: Path) -> Generator[Tuple[str, int, WordBoxes], None, None]:
+    """
+    Read one part written by write_word_boxes_part.
+
+    Yields:
+        Tuple[str, int, WordBoxes]: Source file path, page number and the page's word boxes.
+    """
+    with np.load(part_path, allow_pickle=False) as part:
+        offsets = part["word_offsets"]
+        words, boxes, confidences = part["words"], part["boxes"], part["confidences"]
+        for i, (source, page) in enumerate(zip(part["sources"], part["pages"])):
+            start, end = offsets[i], offsets[i + 1]
+            yield str(source), int(page), WordBoxes(
+                words=words[start:end], boxes=boxes[start:end], confidences=confidences[start:end]
+            )
+
+
+def read_manifest(manifest_path: Path) -> List[dict]:
+    """
+    Read committed manifest records. A partially written last line (crash during commit) is ignored.
+    """
+    return _read_manifest(manifest_path)[0]
+
+
+def _read_manifest(manifest_path: Path) -> Tuple[List[dict], int]:
+    """
+    Returns:
+        Tuple[List[dict], int]: Committed records and the size in bytes of the committed part of the manifest.
+    """
+    if not manifest_path.exists():
+        return [], 0
+
+    records, committed_bytes = [], 0
+    with open(manifest_path, "rb") as f:
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                break
+            committed_bytes += len(line)
+    return records, committed_bytes
+
+
+def is_run_complete(output_path: Path) -> bool:
+    return any(record.get("complete") for record in read_manifest(Path(output_path) / MANIFEST_NAME))
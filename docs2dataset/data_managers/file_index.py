@@ -0,0 +1,223 @@
+import json
+import logging
+import os
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterator, List, Tuple
+
+from docs2dataset.utils.file_utils import is_image_file
+from docs2dataset.utils.logging_utils import setup_logger
+from docs2dataset.utils.metrics import stage_metrics
+
+INDEX_VERSION = 1
+ROOT_SUBDIR = "root"
+
+
+class FileIndex:
+    """
+    Lists the image files of every class directory under input_path.
+
+    Directories are read with os.scandir on a thread pool while files are consumed, reusing the file type reported by
+    the directory entry instead of stat-ing every path. When index_path is set, the listing
+    (paths, sizes, modification times and per-class / per-subdir counts) is persisted there and
+    later runs only rescan directories whose modification time changed. A directory's mtime
+    changes when entries are added, removed or renamed, not when a file is rewritten in place,
+    so sizes and mtimes of modified files are refreshed only together with their directory.
+    """
+
+    def __init__(
+        self,
+        input_path: Path,
+        index_path: Path | None = None,
+        num_threads: int = 8,
+        logging_level: int = logging.INFO
+    ):
+        self.input_path = Path(input_path)
+        self.index_path = Path(index_path) if index_path is not None else None
+        self.num_threads = max(1, num_threads)
+        self.logger = setup_logger(self.__class__.__name__, logging_level)
+        # Relative directory path -> {"mtime_ns", "files": [[name, size, mtime_ns]], "dirs": [names]}
+        # Kept only when the index is persisted
+        self._dirs: Dict[str, dict] = {}
+        self._counts: Dict[str, dict] = {}
+        self._previous: Dict[str, dict] | None = None
+        self._stats = {"scanned": 0, "reused": 0}
+
+    def __getstate__(self):
+        # Workers never list directories, don't ship the listing to them
+        state = self.__dict__.copy()
+        state["_dirs"] = {}
+        state["_previous"] = None
+        return state
+
+    def class_names(self) -> List[str]:
+        """
+        Returns:
+            List[str]: Sorted names of the class directories under input_path.
+        """
+        with os.scandir(self.input_path) as entries:
+            return sorted(entry.name for entry in entries if entry.is_dir())
+
+    def iter_class_files(self, class_name: str) -> Iterator[Tuple[Path, str]]:
+        """
+        Refresh the listing of a class directory, yielding files while the walk continues.
+
+        Directories are scanned ahead on the thread pool but visited depth-first in name order,
+        so the same tree always yields the same sequence.
+
+        Args:
+            class_name (str): Name of the class directory.
+
+        Yields:
+            Tuple[Path, str]: (file path, subdir) pairs, where subdir is the name of the top-level
+            subdirectory containing the file or "root" for files directly in the class directory.
+        """
+        if self._previous is None:
+            self._previous = self._load()
+
+        class_counts = self._counts[class_name] = {"count": 0, "subdirs": {}}
+        executor = ThreadPoolExecutor(self.num_threads)
+        futures: Dict[str, Future] = {}
+
+        def scan(rel_dir: str) -> dict:
+            record = self._refresh_dir(rel_dir)
+            # Children are queued before the parent completes, so their futures exist once it is visited
+            for name in record["dirs"]:
+                child = f"{rel_dir}/{name}"
+                futures[child] = executor.submit(scan, child)
+            return record
+
+        try:
+            futures[class_name] = executor.submit(scan, class_name)
+            stack = [class_name]
+            while stack:
+                rel_dir = stack.pop()
+                record = futures.pop(rel_dir).result()
+                if self.index_path is not None:
+                    self._dirs[rel_dir] = record
+                stack.extend(f"{rel_dir}/{name}" for name in reversed(record["dirs"]))
+
+                parts = rel_dir.split("/")
+                subdir = parts[1] if len(parts) > 1 else ROOT_SUBDIR
+                class_counts["count"] += len(record["files"])
+                class_counts["subdirs"][subdir] = class_counts["subdirs"].get(subdir, 0) + len(record["files"])
+
+                base = self.input_path.joinpath(*parts)
+                for name, _, _ in record["files"]:
+                    yield base / name, subdir
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def indexed_subdir_counts(self, class_name: str) -> Dict[str, int] | None:
+        """
+        Number of files per subdir of a class in the index loaded from index_path, without listing the class.
+        The counts are those of the previous run, new subdirs are missing.
+
+        Args:
+            class_name (str): Name of the class directory.
+
+        Returns:
+            Dict[str, int] | None: Number of files per subdir, see iter_class_files. None if the class is not indexed.
+        """
+        if self._previous is None:
+            self._previous = self._load()
+        class_dirs = {
+            rel_dir: record for rel_dir, record in self._previous.items() if rel_dir.split("/")[0] == class_name
+        }
+        if not class_dirs:
+            return None
+        return self._count_files(class_dirs)[class_name]["subdirs"]
+
+    def counts(self) -> Dict[str, dict]:
+        """
+        Returns:
+            Dict[str, dict]: Per class listed so far, the total number of files and the number per subdir.
+        """
+        return self._counts
+
+    @staticmethod
+    def _count_files(dirs: Dict[str, dict]) -> Dict[str, dict]:
+        counts = {}
+        for rel_dir, record in dirs.items():
+            parts = rel_dir.split("/")
+            class_counts = counts.setdefault(parts[0], {"count": 0, "subdirs": {}})
+            subdir = parts[1] if len(parts) > 1 else ROOT_SUBDIR
+            class_counts["count"] += len(record["files"])
+            class_counts["subdirs"][subdir] = class_counts["subdirs"].get(subdir, 0) + len(record["files"])
+        return counts
+
+    def save(self) -> None:
+        """
+        Persist the listed directories to index_path, if set. Classes that were not listed in
+        this run are kept from the previous index.
+        """
+        self.logger.info(
+            f"Directories scanned: {self._stats['scanned']}, reused from index: {self._stats['reused']}"
+        )
+        if self.index_path is None:
+            return
+
+        listed = set(self._counts)
+        dirs = {
+            rel_dir: record
+            for rel_dir, record in (self._previous or {}).items()
+            if rel_dir.split("/")[0] not in listed
+        }
+        dirs.update(self._dirs)
+
+        data = {
+            "version": INDEX_VERSION,
+            "input_path": str(self.input_path.resolve()),
+            "counts": self._count_files(dirs),
+            "dirs": dirs,
+        }
+
+        self.index_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.index_path.with_name(self.index_path.name + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, self.index_path)
+        self.logger.info(f"File index saved to {self.index_path}")
+
+    def _load(self) -> Dict[str, dict]:
+        if self.index_path is None or not self.index_path.exists():
+            return {}
+        try:
+            with open(self.index_path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            self.logger.warning(f"Ignoring unreadable file index {self.index_path}: {e}")
+            return {}
+        if data.get("version") != INDEX_VERSION or data.get("input_path") != str(self.input_path.resolve()):
+            self.logger.info(f"File index {self.index_path} belongs to another input, rebuilding it")
+            return {}
+        return data["dirs"]
+
+    def _refresh_dir(self, rel_dir: str) -> dict:
+        with stage_metrics.timed("scan"):
+            return self._scan_dir(rel_dir)
+
+    def _scan_dir(self, rel_dir: str) -> dict:
+        path = self.input_path.joinpath(*rel_dir.split("/"))
+        mtime_ns = os.stat(path).st_mtime_ns
+
+        previous = self._previous.get(rel_dir)
+        if previous is not None and previous["mtime_ns"] == mtime_ns:
+            self._stats["reused"] += 1
+            return previous
+
+        self._stats["scanned"] += 1
+        files, dirs = [], []
+        with os.scandir(path) as entries:
+            for entry in entries:
+                # Symlinked directories are not followed, like Path.rglob
+                if entry.is_dir(follow_symlinks=False):
+                    dirs.append(entry.name)
+                elif entry.is_file() and is_image_file(Path(entry.name)):
+                    if self.index_path is not None:
+                        stat = entry.stat()
+                        files.append([entry.name, stat.st_size, stat.st_mtime_ns])
+                    else:
+                        files.append([entry.name, -1, -1])
+
+        return {"mtime_ns": mtime_ns, "files": sorted(files), "dirs": sorted(dirs)}
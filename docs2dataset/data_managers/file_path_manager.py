@@ -1,18 +1,20 @@
 import logging
-from math import ceil
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from random import shuffle
+from random import Random
 from typing import Generator, List
 
+from docs2dataset.data_managers.file_index import FileIndex
 from docs2dataset.utils.file_info import FileInfo
-from docs2dataset.utils.file_utils import is_image_file
 from docs2dataset.utils.logging_utils import setup_logger
+from docs2dataset.utils.sampling import reservoir_sample, stratified_sample
 
 
 class FilePathManager:
     """
     Scans directories under a root input_path, grouping files by class (directory name).
     Provides an iterator of batches of files for parallel processing.
+    Directory listing is delegated to FileIndex, optionally persisted to file_index_path.
     """
 
     def __init__(
@@ -21,13 +23,23 @@ class FilePathManager:
         max_docs_per_class: int,
         batch_size_per_worker: int,
         smart_shuffle: bool,
+        seed: int | None = None,
+        file_index_path: Path | None = None,
+        scan_threads: int = 8,
         logging_level: int = logging.INFO
     ):
         self.input_path = Path(input_path)
         self.max_docs_per_class = max_docs_per_class
         self.batch_size_per_worker = batch_size_per_worker
         self.smart_shuffle = smart_shuffle
+        self.seed = seed
         self.logger = setup_logger(self.__class__.__name__, logging_level)
+        self.file_index = FileIndex(
+            input_path=self.input_path,
+            index_path=file_index_path,
+            num_threads=scan_threads,
+            logging_level=logging_level
+        )
 
     def file_batches(self) -> Generator[List[FileInfo], None, None]:
         """
@@ -35,76 +47,56 @@ class FilePathManager:
             Generator[List[FileInfo], None, None]: Batches of FileInfo objects to process.
         """
         self.logger.info("Generating file batches...")
+        class_names = self.file_index.class_names()
 
-        for class_dir in self.input_path.iterdir():
-            if class_dir.is_dir():
-                all_files = [
-                    FileInfo(file_path=f, class_name=class_dir.name)
-                    for f in class_dir.rglob("*")
-                    if f.is_file() and is_image_file(f)
-                ]
-
-                self.logger.info(f"Found {len(all_files)} files in class directory '{class_dir.name}'")
-
-                # Decide how to limit/shuffle
-                if self.smart_shuffle and self.max_docs_per_class:
-                    all_files = self._smart_shuffle_files(class_dir)
-                elif self.max_docs_per_class is not None and self.max_docs_per_class > 0:
-                    shuffle(all_files)
-                    all_files = all_files[: self.max_docs_per_class]
-                else:
-                    shuffle(all_files)
+        # The next class is listed and sampled in the background while batches of the current one are consumed
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            next_files = executor.submit(self._select_files, class_names[0]) if class_names else None
+            for i, class_name in enumerate(class_names):
+                selected = next_files.result()
+                if i + 1 < len(class_names):
+                    next_files = executor.submit(self._select_files, class_names[i + 1])
 
                 # Yield in slices
-                for i in range(0, len(all_files), self.batch_size_per_worker):
-                    batch = all_files[i : i + self.batch_size_per_worker]
-                    self.logger.debug(f"Yielding a batch of {len(batch)} file(s) for class '{class_dir.name}'")
+                for start in range(0, len(selected), self.batch_size_per_worker):
+                    batch = selected[start : start + self.batch_size_per_worker]
+                    self.logger.debug(f"Yielding a batch of {len(batch)} file(s) for class '{class_name}'")
                     yield batch
 
-    def _smart_shuffle_files(self, class_dir: Path) -> List[FileInfo]:
+        self.file_index.save()
+
+    def _select_files(self, class_name: str) -> List[FileInfo]:
         """
-        Distributes picks from root + subdirectories so each subdirectory is
-        proportionally sampled until max_docs_per_class is reached.
+        Pick the files of a class. With max_docs_per_class set, the listing is streamed through a
+        reservoir sampler, so memory stays proportional to the cap rather than to the class size.
+        With smart_shuffle, each subdirectory is sampled to its share of the cap, allocated from the
+        counts of the file index of a previous run if there is one (see stratified_sample).
 
         Args:
-            class_dir (Path): Directory for a specific "class."
+            class_name (str): Name of the class directory.
 
         Returns:
-            List[FileInfo]: Shuffled set of file info objects, up to max_docs_per_class.
+            List[FileInfo]: Selected files in random order.
         """
-        self.logger.info("Performing smart shuffle...")
-        subdir_dict = {"root": []}
-        base_path = Path(class_dir)
-
-        # Collect files under root and subdirs
-        for item in base_path.iterdir():
-            if item.is_file() and is_image_file(item):
-                subdir_dict["root"].append(FileInfo(file_path=item.resolve(), class_name=class_dir.name))
-            elif item.is_dir():
-                subdir_dict[item.name] = []
-                for file in item.rglob("*"):
-                    if file.is_file() and is_image_file(file):
-                        subdir_dict[item.name].append(FileInfo(file_path=file.resolve(), class_name=class_dir.name))
-
-        final_batch = []
-        docs_needed = self.max_docs_per_class
-
-        while docs_needed > 0 and subdir_dict:
-            num_take_each = ceil(docs_needed / len(subdir_dict))
-            # For each subdir, take up to num_take_each
-            for subdir in list(subdir_dict.keys()):
-                available_files = subdir_dict[subdir]
-                to_take = min(num_take_each, len(available_files))
-                final_batch.extend(available_files[:to_take])
-                subdir_dict[subdir] = available_files[to_take:]
-
-                if not subdir_dict[subdir]:
-                    del subdir_dict[subdir]
-
-            docs_needed = self.max_docs_per_class - len(final_batch)
-
-            if len(final_batch) >= self.max_docs_per_class:
-                break
-
-        shuffle(final_batch)
-        return final_batch[: self.max_docs_per_class]
+        # Each class has its own generator, so the selection doesn't depend on the listing order of
+        # other classes and the same seed reproduces it (needed to resume a run)
+        rng = Random(f"{self.seed}:{class_name}")
+
+        if self.smart_shuffle and self.max_docs_per_class:
+            self.logger.info("Performing smart shuffle...")
+            subdir_counts = self.file_index.indexed_subdir_counts(class_name)
+            selected = stratified_sample(
+                self.file_index.iter_class_files(class_name), self.max_docs_per_class, rng, counts=subdir_counts
+            )
+        elif self.max_docs_per_class is not None and self.max_docs_per_class > 0:
+            class_files = self.file_index.iter_class_files(class_name)
+            selected = reservoir_sample((file_path for file_path, _ in class_files), self.max_docs_per_class, rng)
+        else:
+            selected = [file_path for file_path, _ in self.file_index.iter_class_files(class_name)]
+            rng.shuffle(selected)
+
+        self.logger.info(
+            f"Found {self.file_index.counts()[class_name]['count']} files in class directory '{class_name}', "
+            f"selected {len(selected)}"
+        )
+        return [FileInfo(file_path=file_path, class_name=class_name) for file_path in selected]
@@ -0,0 +1,251 @@
+import io
+import logging
+import math
+import threading
+from abc import ABC, abstractmethod
+from typing import Tuple
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from docs2dataset.utils.logging_utils import setup_logger
+from docs2dataset.utils.metrics import stage_metrics
+
+# Output formats of processed images and the backends that can encode them ("auto" picks the first available)
+IMAGE_FORMATS = {
+    "jpeg": ("turbojpeg", "opencv", "pillow"),
+    "webp": ("opencv", "pillow"),
+    "jxl": ("pillow",),
+}
+# Lowest quality the size-bounded search goes down to
+MIN_QUALITY = 40
+# Encodes after the first one while searching for a quality that fits the size limit
+MAX_SEARCH_ENCODES = 2
+# Searched results within this share of the size limit are not refined further
+SIZE_TOLERANCE = 0.85
+
+
+class ImageEncoder(ABC):
+    """Encodes processed page images (BGR or grayscale uint8) at a given quality."""
+
+    image_format: str = "jpeg"
+    suffix: str = ".jpg"
+    default_quality: int = 95
+
+    @abstractmethod
+    def encode(self, image_np: np.ndarray, quality: int) -> bytes:
+        """
+        Raises:
+            ValueError: If the image can't be encoded.
+        """
+        pass
+
+
+class OpenCVEncoder(ImageEncoder):
+    """cv2.imencode, JPEG or WebP."""
+
+    _QUALITY_FLAGS = {"jpeg": cv2.IMWRITE_JPEG_QUALITY, "webp": cv2.IMWRITE_WEBP_QUALITY}
+
+    def __init__(self, image_format: str = "jpeg"):
+        if image_format not in self._QUALITY_FLAGS:
+            raise ValueError(f"OpenCVEncoder can't encode {image_format=}.")
+        self.image_format = image_format
+        self.suffix = ".jpg" if image_format == "jpeg" else ".webp"
+        self.default_quality = 95 if image_format == "jpeg" else 90
+
+    def encode(self, image_np: np.ndarray, quality: int) -> bytes:
+        success, buffer = cv2.imencode(self.suffix, image_np, [self._QUALITY_FLAGS[self.image_format], quality])
+        if not success:
+            raise ValueError(f"OpenCV failed to encode the image as {self.image_format}.")
+        return buffer.tobytes()
+
+
+class PillowEncoder(ImageEncoder):
+    """Pillow, JPEG, WebP or JPEG XL (requires pillow-jxl-plugin unless Pillow supports it natively)."""
+
+    _FORMATS = {"jpeg": ("JPEG", ".jpg", 95), "webp": ("WEBP", ".webp", 90), "jxl": ("JXL", ".jxl", 90)}
+
+    def __init__(self, image_format: str = "jpeg"):
+        if image_format not in self._FORMATS:
+            raise ValueError(f"PillowEncoder can't encode {image_format=}.")
+        if image_format == "jxl" and "JXL" not in Image.SAVE:
+            try:
+                import pillow_jxl  # noqa: F401  (registers the JXL plugin)
+            except ImportError as e:
+                raise ImportError(
+                    "JPEG XL output requires pillow-jxl-plugin, install it with `pip install docs2dataset[jxl]`."
+                ) from e
+        self.image_format = image_format
+        self._pil_format, self.suffix, self.default_quality = self._FORMATS[image_format]
+
+    def encode(self, image_np: np.ndarray, quality: int) -> bytes:
+        if image_np.ndim == 3:
+            image_np = cv2.cvtColor(image_np, cv2.COLOR_BGR2RGB)
+        buffer = io.BytesIO()
+        Image.fromarray(image_np).save(buffer, format=self._pil_format, quality=quality)
+        return buffer.getvalue()
+
+
+class TurboJPEGEncoder(ImageEncoder):
+    """libjpeg-turbo through PyTurboJPEG, encodes BGR directly and grayscale without chroma planes."""
+
+    def __init__(self):
+        try:
+            import turbojpeg as tj
+        except ImportError as e:
+            raise ImportError(
+                "The turbojpeg encoder requires PyTurboJPEG, install it with `pip install docs2dataset[turbojpeg]`."
+            ) from e
+        # PyTurboJPEG installs without the native library, which is only found when a handle is created
+        try:
+            encoder = tj.TurboJPEG()
+        except (RuntimeError, OSError) as e:
+            raise ImportError(f"The turbojpeg encoder can't load libturbojpeg: {e}") from e
+        # Library handles are kept per thread, and created anew after the encoder is sent to a worker process
+        self._local = threading.local()
+        self._local.encoder = encoder
+
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        del state["_local"]
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self._local = threading.local()
+
+    def encode(self, image_np: np.ndarray, quality: int) -> bytes:
+        import turbojpeg as tj
+        encoder = getattr(self._local, "encoder", None)
+        if encoder is None:
+            encoder = self._local.encoder = tj.TurboJPEG()
+        if image_np.ndim == 2:
+            return encoder.encode(
+                image_np[:, :, np.newaxis], quality=quality, pixel_format=tj.TJPF_GRAY, jpeg_subsample=tj.TJSAMP_GRAY
+            )
+        return encoder.encode(image_np, quality=quality, pixel_format=tj.TJPF_BGR)
+
+
+_BACKENDS = {"opencv": OpenCVEncoder, "pillow": PillowEncoder}
+
+
+def create_image_encoder(image_format: str = "jpeg", backend: str = "auto") -> ImageEncoder:
+    """
+    Create a built-in image encoder.
+
+    Args:
+        image_format (str): "jpeg", "webp" or "jxl".
+        backend (str): "opencv", "pillow", "turbojpeg" or "auto" (the fastest one available for the format).
+
+    Returns:
+        ImageEncoder: The encoder.
+    """
+    if image_format not in IMAGE_FORMATS:
+        raise ValueError(f"Unknown {image_format=}, expected one of {tuple(IMAGE_FORMATS)}.")
+    if backend == "auto":
+        for candidate in IMAGE_FORMATS[image_format]:
+            try:
+                return create_image_encoder(image_format, candidate)
+            except ImportError:
+                continue
+        raise ImportError(f"No encoder available for {image_format=}.")
+
+    if backend not in IMAGE_FORMATS[image_format]:
+        raise ValueError(f"Encoder {backend=} can't encode {image_format=}, use one of {IMAGE_FORMATS[image_format]}.")
+    if backend == "turbojpeg":
+        return TurboJPEGEncoder()
+    return _BACKENDS[backend](image_format)
+
+
+def jpeg_scale(quality: int) -> float:
+    """Quantization table scale (in percent) libjpeg uses for a quality setting."""
+    quality = min(max(quality, 1), 100)
+    return 5000 / quality if quality < 50 else 200 - 2 * quality
+
+
+def quality_for_scale(scale: float) -> int:
+    """Inverse of jpeg_scale, rounded down to the next lower quality."""
+    quality = 5000 / scale if scale > 100 else (200 - scale) / 2
+    return min(max(math.floor(quality + 1e-9), 1), 100)
+
+
+def estimate_quality(quality: int, size: int, target_size: float, exponent: float) -> int:
+    """
+    Estimate the quality at which an image encoded to size bytes at quality shrinks to target_size.
+
+    Encoded size falls roughly as a power of the quantization scale: size ~ jpeg_scale(quality) ** -exponent.
+    The exponent depends on the content, about 0.4 for clean text pages and 0.6 for noisy scans and photos.
+    """
+    scale = jpeg_scale(quality) * (size / target_size) ** (1 / exponent)
+    return quality_for_scale(scale)
+
+
+def size_exponent(sample_a: Tuple[int, int], sample_b: Tuple[int, int]) -> float:
+    """Exponent of the size model (see estimate_quality) through two (quality, size) samples."""
+    (quality_a, size_a), (quality_b, size_b) = sample_a, sample_b
+    scale_ratio = math.log(jpeg_scale(quality_b) / jpeg_scale(quality_a))
+    if scale_ratio == 0 or size_a <= 0 or size_b <= 0:
+        return 0.4
+    return min(max(-math.log(size_b / size_a) / scale_ratio, 0.05), 2.0)
+
+
+class BoundedEncoder:
+    """
+    Encodes images with an ImageEncoder, lowering the quality if the result exceeds max_bytes.
+
+    Instead of stepping down through fixed qualities, the quality that fits is estimated from the size and
+    bits per pixel of the first encode, then refined from the measured sizes with at most MAX_SEARCH_ENCODES
+    more encodes. Encoder runs are counted in the stage metrics ("encode_runs", "encode_searches").
+    """
+
+    def __init__(self, encoder: ImageEncoder, max_bytes: int, logging_level: int = logging.INFO):
+        self.encoder = encoder
+        self.max_bytes = max_bytes
+        self.logger = setup_logger(self.__class__.__name__, logging_level)
+
+    def encode(self, image_np: np.ndarray) -> bytes:
+        quality = self.encoder.default_quality
+        data = self._encode(image_np, quality)
+        if len(data) <= self.max_bytes:
+            return data
+
+        stage_metrics.count("encode_searches")
+        # Noisy content (many bits per pixel) shrinks faster as the quality drops
+        bits_per_pixel = len(data) * 8 / (image_np.shape[0] * image_np.shape[1])
+        exponent = min(max(0.15 * bits_per_pixel, 0.35), 0.6)
+
+        over = (quality, len(data))  # Lowest quality known to exceed the limit, and its size
+        fits: Tuple[int, bytes] | None = None  # Highest quality known to fit, and its result
+        smallest = data
+        target_size = self.max_bytes * SIZE_TOLERANCE
+        for _ in range(MAX_SEARCH_ENCODES):
+            lower = fits[0] + 1 if fits is not None else MIN_QUALITY
+            upper = over[0] - 1
+            if lower > upper:
+                break
+            # Shrink from the last result over the limit, or grow from a result well below it
+            reference = over if fits is None else (fits[0], len(fits[1]))
+            quality = min(max(estimate_quality(*reference, target_size, exponent), lower), upper)
+            data = self._encode(image_np, quality)
+            smallest = min(smallest, data, key=len)
+            exponent = size_exponent(reference, (quality, len(data)))
+            if len(data) > self.max_bytes:
+                over = (quality, len(data))
+            else:
+                fits = (quality, data)
+                if len(data) >= target_size:
+                    break
+
+        if fits is not None:
+            self.logger.debug(f"Encoded at quality {fits[0]} to fit under {self.max_bytes / 2 ** 20:.1f} MB.")
+            return fits[1]
+        self.logger.warning(
+            f"Could not encode below {self.max_bytes / 2 ** 20:.1f} MB, "
+            f"saving {len(smallest) / 2 ** 20:.1f} MB at the lowest quality tried."
+        )
+        return smallest
+
+    def _encode(self, image_np: np.ndarray, quality: int) -> bytes:
+        stage_metrics.count("encode_runs")
+        return self.encoder.encode(image_np, quality)
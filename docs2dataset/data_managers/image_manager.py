@@ -1,24 +1,71 @@
-import io
 import logging
+import threading
 from pathlib import Path
-from typing import Generator, Tuple
+from typing import Generator, List, Tuple
 
 import cv2
 import fitz  # PyMuPDF
 import numpy as np
 from PIL import Image
 
+from docs2dataset.data_managers.image_encoders import BoundedEncoder, ImageEncoder, create_image_encoder
 from docs2dataset.utils.file_info import FileInfo
 from docs2dataset.utils.logging_utils import setup_logger
+from docs2dataset.utils.metrics import stage_metrics
+from docs2dataset.utils.tiff_reader import map_tiff_frame, open_tiff_frame, tiff_index
 
 # Avoid DecompressionBombError in Pillow
 Image.MAX_IMAGE_PIXELS = None
+# PyMuPDF must not be used from several threads at once, even with separate documents
+_MUPDF_LOCK = threading.Lock()
+
+# Working color modes of page images: 3-channel BGR, 1-channel grayscale or 1-channel black and white (0/255)
+COLOR_MODES = ("bgr", "gray", "binary")
+# Resampling tiers for downscaling to the megapixel budget: interpolation of the final resize and how many times
+# the target size the image is reduced to beforehand by the decoder (JPEG DCT scaling) and box reduction
+RESAMPLING_TIERS = {
+    "lanczos": (cv2.INTER_LANCZOS4, 2),  # Highest quality, slowest
+    "area": (cv2.INTER_AREA, 1),  # Nearly as sharp for downscaling, several times faster
+    "linear": (cv2.INTER_LINEAR, 1),  # Fastest, some aliasing on fine print
+}
+
+
+def convert_color_mode(image_np: np.ndarray, color_mode: str) -> np.ndarray:
+    """
+    Convert an image to a working color mode, a no-op if it is already in that mode.
+
+    Args:
+        image_np (np.ndarray): BGR, BGRA or grayscale uint8 image.
+        color_mode (str): One of COLOR_MODES.
+
+    Returns:
+        np.ndarray: The converted image.
+    """
+    if color_mode == "bgr":
+        if image_np.ndim == 2:
+            return cv2.cvtColor(image_np, cv2.COLOR_GRAY2BGR)
+        return cv2.cvtColor(image_np, cv2.COLOR_BGRA2BGR) if image_np.shape[2] == 4 else image_np
+
+    if image_np.ndim == 3:
+        code = cv2.COLOR_BGRA2GRAY if image_np.shape[2] == 4 else cv2.COLOR_BGR2GRAY
+        image_np = cv2.cvtColor(image_np, code)
+    if color_mode == "binary":
+        # Otsu's threshold, a no-op for an image that is already black and white
+        _, image_np = cv2.threshold(image_np, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    return image_np
 
 
 class ImageManager:
     """
     Handles reading of PDFs, TIFFs, and standard image files.
     Applies optional resizing and external processing (e.g. custom pipeline).
+
+    Pages are kept in one working color mode (see COLOR_MODES) from decoding through processing,
+    OCR and saving. The single-channel modes need a third of the memory of BGR per page.
+
+    Raster images larger than the megapixel budget are not decoded at full size where avoidable: JPEGs are
+    decoded at a reduced DCT scale, and the remaining integer factor is removed with a box filter before the
+    final resize, whose quality/speed trade-off is chosen by the resampling tier (see RESAMPLING_TIERS).
     """
 
     def __init__(
@@ -31,7 +78,14 @@ class ImageManager:
             logging_level: int,
             megapixel: int,
             size_threshold_mb: int,
+            color_mode: str = "bgr",
+            resampling: str = "lanczos",
+            encoder: ImageEncoder | None = None,
     ):
+        if color_mode not in COLOR_MODES:
+            raise ValueError(f"Unknown {color_mode=}, expected one of {COLOR_MODES}.")
+        if resampling not in RESAMPLING_TIERS:
+            raise ValueError(f"Unknown {resampling=}, expected one of {tuple(RESAMPLING_TIERS)}.")
         self.logger = setup_logger(self.__class__.__name__, logging_level)
         self.image_processor = image_processor
         self.save_processed_img = save_processed_img
@@ -40,6 +94,11 @@ class ImageManager:
         self.dpi = dpi
         self.megapixel = megapixel
         self.size_threshold_mb = size_threshold_mb
+        self.color_mode = color_mode
+        self.resampling = resampling
+        self.interpolation, self.reduce_margin = RESAMPLING_TIERS[resampling]
+        self.encoder = encoder if encoder is not None else create_image_encoder()
+        self._bounded_encoder = BoundedEncoder(self.encoder, int(size_threshold_mb * 1024 * 1024), logging_level)
 
     def process_image(self, file_info: FileInfo) -> Generator[Tuple[np.ndarray, Path | None, int], None, None]:
         """
@@ -54,89 +113,240 @@ class ImageManager:
                                               and the page number.
         """
         self.logger.info(f"Processing file: {file_info.file_path}")
+        for page_num in self.get_page_numbers(file_info):
+            yield self.process_page(file_info, page_num)
+
+    def get_page_numbers(self, file_info: FileInfo) -> List[int]:
+        """
+        Resolve which pages of a document should be processed, honoring target_pages.
+
+        Args:
+            file_info (FileInfo): Contains path and class name.
+
+        Returns:
+            List[int]: Sorted, non-negative page indices.
+        """
         file_ext = file_info.file_path.suffix.lower()
 
         if file_ext == ".pdf":
-            yield from self._process_pdf(file_info)
+            with _MUPDF_LOCK, fitz.open(file_info.file_path) as doc:
+                num_pages = len(doc)
         elif file_ext in [".tiff", ".tif"]:
-            yield from self._process_tiff(file_info)
+            try:
+                num_pages = tiff_index(file_info.file_path).num_frames
+            except ValueError:
+                # E.g. a differently encoded image with a .tif extension, let Pillow figure it out
+                with Image.open(file_info.file_path) as tiff:
+                    num_pages = self._count_tiff_frames(tiff)
         else:
-            yield from self._process_single_image(file_info)
+            return [0]
 
-    def _process_single_image(self, file_info: FileInfo) -> Generator[Tuple[np.ndarray, Path | None, int], None, None]:
-        self.logger.debug(f"Opening single image: {file_info.file_path}")
-        with Image.open(file_info.file_path) as pil_img:
-            # Convert to BGR for OpenCV usage
-            image_np = cv2.cvtColor(np.array(pil_img), cv2.COLOR_RGB2BGR)
+        return self._select_pages(num_pages)
+
+    def process_page(self, file_info: FileInfo, page_num: int) -> Tuple[np.ndarray, Path | None, int]:
+        """
+        Decode a single page, then resize, process and optionally save it.
 
-        processed_image = self._resize_image_if_needed(image_np)
+        Args:
+            file_info (FileInfo): Contains path and class name.
+            page_num (int): Non-negative page index as returned by get_page_numbers.
+
+        Returns:
+            (np.ndarray, Optional[Path], int): The processed image, the path where it's saved (or None),
+                                              and the page number.
+        """
+        processed_image = self.preprocess(self.load_page(file_info, page_num))
+
+        image_path = None
+        if self.save_processed_img:
+            image_path = self.image_output_path(file_info, page_num)
+            self.save_image(processed_image, image_path)
+        return processed_image, image_path, page_num
+
+    def load_page(self, file_info: FileInfo, page_num: int) -> np.ndarray:
+        """
+        Decode a single page in the working color mode and downscale it to the megapixel limit.
+        Pages are decoded straight to grayscale in the "gray" and "binary" modes, and binarized after
+        the resize.
+        """
+        image_np = self._resize_image_if_needed(self._load_page(file_info, page_num))
+        if self.color_mode == "binary":
+            with stage_metrics.timed("binarize"):
+                image_np = convert_color_mode(image_np, self.color_mode)
+        return image_np
+
+    def preprocess(self, image_np: np.ndarray) -> np.ndarray:
+        """
+        Apply the external image processor, if any. Its output is converted back to the working color mode,
+        so processors that always return BGR don't undo the savings of a single-channel mode.
+        """
         if self.image_processor:
-            processed_image = self.image_processor.run(processed_image)
+            with stage_metrics.timed("preprocess"):
+                return convert_color_mode(self.image_processor.run(image_np), self.color_mode)
+        return image_np
 
-        image_path = self._save_image(processed_image, file_info, page_num=0) if self.save_processed_img else None
-        yield processed_image, image_path, 0
+    def extract_text_layer(self, file_info: FileInfo, page_num: int) -> str | None:
+        """
+        Extract the embedded text layer of a PDF page without rendering it.
 
-    def _process_pdf(self, file_info: FileInfo) -> Generator[Tuple[np.ndarray, Path | None, int], None, None]:
-        self.logger.debug(f"Opening PDF: {file_info.file_path}")
-        doc = fitz.open(file_info.file_path)
-        num_pages = len(doc)
+        Args:
+            file_info (FileInfo): Contains path and class name.
+            page_num (int): Non-negative page index.
+
+        Returns:
+            str | None: Whitespace-normalized text, or None if the file has no text layer (not a PDF).
+        """
+        if file_info.file_path.suffix.lower() != ".pdf":
+            return None
 
+        with _MUPDF_LOCK, fitz.open(file_info.file_path) as doc:
+            text = doc.load_page(page_num).get_text("text")
+        return " ".join(text.split())
+
+    def _select_pages(self, num_pages: int) -> List[int]:
+        """Convert target_pages (which may contain negative indices) to valid page numbers."""
         pages_to_process = self.target_pages if self.target_pages is not None else range(num_pages)
-        # Convert negative page indices
         valid_pages = set(
             (num_pages + p) if p < 0 else p
             for p in pages_to_process
             if -num_pages <= p < num_pages
         )
+        return sorted(valid_pages)
+
+    def _load_page(self, file_info: FileInfo, page_num: int) -> np.ndarray:
+        file_ext = file_info.file_path.suffix.lower()
+
+        if file_ext == ".pdf":
+            return self._load_pdf_page(file_info, page_num)
+        elif file_ext in [".tiff", ".tif"]:
+            return self._load_tiff_page(file_info, page_num)
+        else:
+            return self._load_single_image(file_info)
+
+    def _load_single_image(self, file_info: FileInfo) -> np.ndarray:
+        self.logger.debug(f"Opening single image: {file_info.file_path}")
+        with stage_metrics.timed("decode"), Image.open(file_info.file_path) as pil_img:
+            draft_size = self._reduced_size(pil_img.size)
+            if self.color_mode != "bgr" or draft_size != pil_img.size:
+                # Lets the JPEG decoder output grayscale and scale down in the DCT domain (by up to 8x),
+                # instead of converting and resizing the full image afterwards
+                pil_img.draft("L" if self.color_mode != "bgr" else None, draft_size)
+            return self._pil_to_array(self._box_reduce(pil_img))
+
+    def _load_pdf_page(self, file_info: FileInfo, page_num: int) -> np.ndarray:
+        self.logger.debug(f"Opening PDF: {file_info.file_path}, page {page_num}")
+        with _MUPDF_LOCK:
+            with stage_metrics.timed("open"):
+                doc = fitz.open(file_info.file_path)
+            with doc, stage_metrics.timed("rasterize"):
+                page = doc.load_page(page_num)
+                colorspace = fitz.csRGB if self.color_mode == "bgr" else fitz.csGRAY
+                pix = page.get_pixmap(matrix=self._pdf_render_matrix(page.rect), colorspace=colorspace, alpha=False)
+                return self._pixmap_to_array(pix)
+
+    def _pdf_render_matrix(self, page_rect: fitz.Rect) -> fitz.Matrix:
+        """
+        Choose the render scale so the page is rasterized at self.dpi, or lower if that would exceed
+        the self.megapixel budget. This makes the later resize step a no-op for PDF pages.
+        """
+        max_pixels = self.megapixel * 1_000_000
+        zoom = self.dpi / 72  # PDF user space is 72 points per inch
+        page_area = page_rect.width * page_rect.height
+
+        if page_area * zoom * zoom > max_pixels:
+            zoom = (max_pixels / page_area) ** 0.5
+            # The pixmap size is rounded outwards, so shrink until it really fits the budget
+            while (page_rect * fitz.Matrix(zoom, zoom)).irect.get_area() > max_pixels:
+                zoom *= 0.999
+
+        return fitz.Matrix(zoom, zoom)
+
+    @staticmethod
+    def _pixmap_to_array(pix: fitz.Pixmap) -> np.ndarray:
+        """
+        Wrap the pixmap samples as an ndarray without an intermediate PNG encode/decode.
+        The single copy happens in the color conversion, so the result does not reference the pixmap.
+        """
+        samples = np.ndarray(
+            shape=(pix.height, pix.width, pix.n),
+            dtype=np.uint8,
+            buffer=pix.samples_mv,
+            strides=(pix.stride, pix.n, 1)
+        )
+        if pix.n == 1:
+            return samples[:, :, 0].copy()
+        return cv2.cvtColor(samples, cv2.COLOR_RGB2BGR)
 
-        for page_num in sorted(valid_pages):
-            page = doc.load_page(page_num)
-            pix = page.get_pixmap(dpi=self.dpi)
-            pil_img = Image.open(io.BytesIO(pix.tobytes()))
-            image_np = cv2.cvtColor(np.array(pil_img), cv2.COLOR_RGB2BGR)
-
-            processed_image = self._resize_image_if_needed(image_np)
-            if self.image_processor:
-                processed_image = self.image_processor.run(processed_image)
-
-            image_path = self._save_image(processed_image, file_info,
-                                          page_num=page_num) if self.save_processed_img else None
-            yield processed_image, image_path, page_num
-
-    def _process_tiff(self, file_info: FileInfo) -> Generator[Tuple[np.ndarray, Path | None, int], None, None]:
-        self.logger.debug(f"Opening TIFF: {file_info.file_path}")
-        with Image.open(file_info.file_path) as tiff:
-            frames = []
-            index = 0
-            # Count frames in the TIFF
-            while True:
-                try:
-                    tiff.seek(index)
-                    frames.append(index)
-                    index += 1
-                except EOFError:
-                    break
-
-            pages_to_process = self.target_pages if self.target_pages is not None else frames
-            # Convert -1, etc.
-            pages_to_process = [
-                (len(frames) + p) if p < 0 else p
-                for p in pages_to_process
-                if -len(frames) <= p < len(frames)
-            ]
-
-            for page_num in sorted(set(pages_to_process)):
+    def _load_tiff_page(self, file_info: FileInfo, page_num: int) -> np.ndarray:
+        """
+        Read a TIFF frame through the file's IFD index: uncompressed frames are memory-mapped, others are
+        decoded by Pillow opened directly at the frame instead of seeking through the frames before it.
+        """
+        self.logger.debug(f"Opening TIFF: {file_info.file_path}, page {page_num}")
+        try:
+            index = tiff_index(file_info.file_path)
+        except ValueError:
+            with stage_metrics.timed("decode"), Image.open(file_info.file_path) as tiff:
                 tiff.seek(page_num)
-                pil_img = tiff.convert("RGB")
-                image_np = cv2.cvtColor(np.array(pil_img), cv2.COLOR_RGB2BGR)
+                return self._pil_to_array(tiff)
+
+        with stage_metrics.timed("decode"):
+            image_np = map_tiff_frame(file_info.file_path, index, page_num)
+            if image_np is not None:
+                return self._mapped_to_array(image_np)
+            with open_tiff_frame(file_info.file_path, index, page_num) as tiff:
+                return self._pil_to_array(self._box_reduce(tiff))
+
+    def _mapped_to_array(self, image_np: np.ndarray) -> np.ndarray:
+        """Copy a memory-mapped grayscale or RGB frame into the working color mode."""
+        if image_np.ndim == 3:
+            return cv2.cvtColor(image_np, cv2.COLOR_RGB2BGR if self.color_mode == "bgr" else cv2.COLOR_RGB2GRAY)
+        if self.color_mode == "bgr":
+            return cv2.cvtColor(image_np, cv2.COLOR_GRAY2BGR)
+        return np.array(image_np)
 
-                processed_image = self._resize_image_if_needed(image_np)
-                if self.image_processor:
-                    processed_image = self.image_processor.run(processed_image)
+    def _reduced_size(self, size: Tuple[int, int]) -> Tuple[int, int]:
+        """
+        Size an image may be reduced to before the final resize: reduce_margin times the size fitting the
+        megapixel budget, or the original size if it is within reach of the budget.
+        """
+        width, height = size
+        ratio = (self.megapixel * 1_000_000 / (width * height)) ** 0.5 * self.reduce_margin
+        if ratio >= 1:
+            return size
+        return max(1, int(width * ratio)), max(1, int(height * ratio))
+
+    def _box_reduce(self, pil_img: Image.Image) -> Image.Image:
+        """Shrink a decoded image by the largest integer factor that keeps it at or above _reduced_size."""
+        target_width, _ = self._reduced_size(pil_img.size)
+        factor = pil_img.width // target_width
+        if factor < 2 or pil_img.mode not in ("L", "RGB", "RGBA"):
+            return pil_img
+        with stage_metrics.timed("reduce"):
+            return pil_img.reduce(factor)
 
-                image_path = self._save_image(processed_image, file_info,
-                                              page_num=page_num) if self.save_processed_img else None
-                yield processed_image, image_path, page_num
+    def _pil_to_array(self, pil_img: Image.Image) -> np.ndarray:
+        """Convert a decoded Pillow image to an ndarray in the working color mode (BGR or grayscale)."""
+        if self.color_mode != "bgr":
+            return np.array(pil_img if pil_img.mode == "L" else pil_img.convert("L"))
+        if pil_img.mode in ("1", "L"):
+            # Bilevel and gray scans: expanding the single channel is far cheaper than Pillow's RGB conversion
+            return cv2.cvtColor(np.asarray(pil_img.convert("L")), cv2.COLOR_GRAY2BGR)
+        # Convert to BGR for OpenCV usage
+        return cv2.cvtColor(np.asarray(pil_img if pil_img.mode == "RGB" else pil_img.convert("RGB")),
+                            cv2.COLOR_RGB2BGR)
+
+    @staticmethod
+    def _count_tiff_frames(tiff: Image.Image) -> int:
+        index = 0
+        # Count frames in the TIFF
+        while True:
+            try:
+                tiff.seek(index)
+                index += 1
+            except EOFError:
+                break
+        return index
 
     def _resize_image_if_needed(self, image_np: np.ndarray) -> np.ndarray:
         """Downscale image to meet the self.megapixel constraint, if necessary."""
@@ -147,50 +357,47 @@ class ImageManager:
         if curr_pixels > max_pixels:
             ratio = (max_pixels / float(curr_pixels)) ** 0.5
             new_size = (int(width * ratio), int(height * ratio))
-            image_np = cv2.resize(image_np, new_size, interpolation=cv2.INTER_LANCZOS4)
+            with stage_metrics.timed("resize"):
+                image_np = cv2.resize(image_np, new_size, interpolation=self.interpolation)
             self.logger.debug(
                 f"Resized from ~{curr_pixels / 1_000_000:.2f} MP to {self.megapixel} MP limit"
             )
         return image_np
 
-    def _save_image(self, image_np: np.ndarray, file_info: FileInfo, page_num: int | None) -> Path:
+    def image_output_path(self, file_info: FileInfo, page_num: int | None) -> Path:
+        """Path under which the processed image of a page is saved."""
+        class_name = file_info.class_name
+        suffix = f"_page{page_num}" if page_num is not None else ""
+        filename = f"{class_name}__{file_info.file_path.stem}{suffix}{self.encoder.suffix}"
+        return self.output_path / class_name / filename
+
+    def save_image(self, image_np: np.ndarray, output_file_path: Path) -> bool:
         """
         Save the processed image to disk with optional compression if it exceeds size_threshold_mb.
-        Returns the path to the saved image.
+
+        Returns:
+            bool: Whether the image was saved, False if it could not be encoded.
         """
-        class_name = file_info.class_name
-        class_output_dir = self.output_path / class_name
-        class_output_dir.mkdir(parents=True, exist_ok=True)
+        output_file_path.parent.mkdir(parents=True, exist_ok=True)
 
-        # Construct filename
-        suffix = f"_page{page_num}" if page_num is not None else ""
-        filename = f"{class_name}__{file_info.file_path.stem}{suffix}.jpg"
-        output_file_path = class_output_dir / filename
-
-        # Encode to JPEG buffer
-        success, buffer = cv2.imencode(".jpg", image_np)
-        if not success:
-            self.logger.error("Failed to encode image to .jpg format.")
-            return output_file_path
-
-        file_size_mb = len(buffer) / (1024 * 1024)
-        if file_size_mb > self.size_threshold_mb:
-            # Attempt progressive compression
-            for quality in range(70, 40, -10):
-                success, buffer_test = cv2.imencode(".jpg", image_np, [cv2.IMWRITE_JPEG_QUALITY, quality])
-                if success and (len(buffer_test) / (1024 * 1024)) <= self.size_threshold_mb:
-                    buffer = buffer_test
-                    self.logger.info(
-                        f"Compressed image to {quality} quality to fit under {self.size_threshold_mb} MB."
-                    )
-                    break
-            else:
-                self.logger.warning(
-                    f"Could not compress below {self.size_threshold_mb} MB even at ~40% quality."
-                )
-
-        with open(output_file_path, "wb") as f:
+        buffer = self.encode_image(image_np)
+        if buffer is None:
+            return False
+
+        with stage_metrics.timed("write"), open(output_file_path, "wb") as f:
             f.write(buffer)
 
         self.logger.debug(f"Saved processed image to {output_file_path}")
-        return output_file_path
+        return True
+
+    def encode_image(self, image_np: np.ndarray) -> bytes | None:
+        """
+        Encode a processed image the way save_image stores it, lowering the quality if the result exceeds
+        size_threshold_mb (see BoundedEncoder). None if encoding failed.
+        """
+        with stage_metrics.timed("encode"):
+            try:
+                return self._bounded_encoder.encode(image_np)
+            except Exception as e:
+                self.logger.error(f"Failed to encode image: {e}")
+                return None
@@ -0,0 +1,180 @@
+import json
+import logging
+import os
+import tarfile
+import time
+from pathlib import Path
+from typing import Generator, Tuple
+
+from docs2dataset.utils.logging_utils import setup_logger
+from docs2dataset.utils.metrics import stage_metrics
+
+SHARD_PREFIX = "images-"
+SHARD_INDEX_NAME = "index.jsonl"
+# Tar files are made of 512 byte blocks and end with two zero blocks
+TAR_BLOCK_SIZE = 512
+TAR_END_OF_ARCHIVE = b"\0" * (2 * TAR_BLOCK_SIZE)
+
+
+class ImageShardWriter:
+    """
+    Appends encoded page images to WebDataset-style tar shards of about shard_size_mb each, instead of
+    writing one small file per page.
+
+    Every image is one tar member named after its sample key ("000000042.jpg"). An index of all
+    members with their shard, data offset and size is kept in index.jsonl next to the shards, and an
+    image is referenced as "<shard path>:<offset>:<size>" (see read_image_ref), so it can be read with
+    one seek or from a memory map of the shard without parsing the tar.
+
+    The writer state (see state) is committed together with the dataset rows, so output appended after
+    the last commit of an interrupted run is discarded on resume.
+    """
+
+    def __init__(self, shards_path: Path, shard_size_mb: int = 1024, logging_level: int = logging.INFO):
+        self.logger = setup_logger(self.__class__.__name__, logging_level)
+        self.shards_path = Path(shards_path)
+        self.shard_size = shard_size_mb * 1024 * 1024
+        self.index_path = self.shards_path / SHARD_INDEX_NAME
+
+        self._shard_num = 0
+        self._shard_bytes = 0
+        self._index_bytes = 0
+        self._samples = 0
+        self._shard = None
+        self._index = None
+
+    def open(self, state: dict | None = None) -> None:
+        """
+        Start appending after the committed state of a previous run (see state), dropping anything written
+        after it. Without a state, existing shards are removed.
+        """
+        state = state or {}
+        self._shard_num = state.get("shard", 0)
+        self._shard_bytes = state.get("shard_bytes", 0)
+        self._index_bytes = state.get("index_bytes", 0)
+        self._samples = state.get("samples", 0)
+
+        self.shards_path.mkdir(parents=True, exist_ok=True)
+        for shard_path in self.shards_path.glob(f"{SHARD_PREFIX}*.tar"):
+            shard_num = shard_path.stem[len(SHARD_PREFIX):]
+            if not shard_num.isdigit() or int(shard_num) > self._shard_num:
+                self.logger.warning(f"Discarding uncommitted image shard {shard_path}")
+                shard_path.unlink()
+        self._truncate(self._shard_path(self._shard_num), self._shard_bytes)
+        self._truncate(self.index_path, self._index_bytes)
+
+        self._shard = open(self._shard_path(self._shard_num), "ab")
+        self._index = open(self.index_path, "ab")
+
+    def append(self, data: bytes, suffix: str, source: str, page: int) -> str:
+        """
+        Append an encoded image as the next sample.
+
+        Args:
+            data (bytes): Encoded image.
+            suffix (str): Extension of the member name, e.g. ".jpg".
+            source (str): Source document of the page, recorded in the index.
+            page (int): Page number, recorded in the index.
+
+        Returns:
+            str: Reference of the image, see read_image_ref.
+        """
+        if self._shard_bytes > 0 and self._shard_bytes + len(data) + TAR_BLOCK_SIZE > self.shard_size:
+            self._next_shard()
+
+        key = f"{self._samples:09d}"
+        info = tarfile.TarInfo(name=key + suffix)
+        info.size = len(data)
+        info.mtime = int(time.time())
+        info.mode = 0o644
+        header = info.tobuf(format=tarfile.USTAR_FORMAT)
+        padding = -len(data) % TAR_BLOCK_SIZE
+
+        offset = self._shard_bytes + len(header)
+        with stage_metrics.timed("shard_write"):
+            self._shard.write(header)
+            self._shard.write(data)
+            self._shard.write(b"\0" * padding)
+        self._shard_bytes = offset + len(data) + padding
+
+        shard_name = self._shard_path(self._shard_num).name
+        entry = {"key": key, "shard": shard_name, "offset": offset, "size": len(data), "source": source, "page": page}
+        line = (json.dumps(entry, ensure_ascii=False) + "\n").encode("utf-8")
+        self._index.write(line)
+        self._index_bytes += len(line)
+        self._samples += 1
+        return f"{self._shard_path(self._shard_num)}:{offset}:{len(data)}"
+
+    def sync(self) -> None:
+        """Make the appended images durable, called before the rows referencing them are committed."""
+        for f in (self._shard, self._index):
+            f.flush()
+            os.fsync(f.fileno())
+
+    def state(self) -> dict:
+        """Position of the writer, to be committed with the rows written so far."""
+        return {
+            "shard": self._shard_num,
+            "shard_bytes": self._shard_bytes,
+            "index_bytes": self._index_bytes,
+            "samples": self._samples
+        }
+
+    def close(self) -> None:
+        """Terminate the current shard as a tar archive. A resumed run truncates the end marker again."""
+        if self._shard is None:
+            return
+        self._shard.write(TAR_END_OF_ARCHIVE)
+        self._shard.close()
+        self._index.close()
+        self._shard = self._index = None
+
+    def _next_shard(self) -> None:
+        self._shard.write(TAR_END_OF_ARCHIVE)
+        self._shard.close()
+        self._shard_num += 1
+        self._shard_bytes = 0
+        self._shard = open(self._shard_path(self._shard_num), "wb")
+        self.logger.debug(f"Started image shard {self._shard_path(self._shard_num)}")
+
+    def _shard_path(self, shard_num: int) -> Path:
+        return self.shards_path / f"{SHARD_PREFIX}{shard_num:05d}.tar"
+
+    def _truncate(self, path: Path, size: int) -> None:
+        if path.exists() and path.stat().st_size > size:
+            self.logger.debug(f"Truncating {path} to the committed {size} bytes")
+            with open(path, "r+b") as f:
+                f.truncate(size)
+
+
+def parse_image_ref(image_ref: str) -> Tuple[Path, int, int]:
+    """
+    Returns:
+        Tuple[Path, int, int]: Shard path, data offset and size of an image reference written by ImageShardWriter.
+    """
+    shard_path, offset, size = image_ref.rsplit(":", 2)
+    return Path(shard_path), int(offset), int(size)
+
+
+def read_image_ref(image_ref: str) -> bytes:
+    """Read the encoded image referenced by a PreprocessedFilename value of a sharded run."""
+    shard_path, offset, size = parse_image_ref(image_ref)
+    with open(shard_path, "rb") as f:
+        f.seek(offset)
+        return f.read(size)
+
+
+def read_shard_index(shards_path: Path) -> Generator[dict, None, None]:
+    """
+    Yields:
+        dict: Index entries of the images in shards_path ("key", "shard", "offset", "size", "source", "page"),
+            in write order.
+    """
+    index_path = Path(shards_path) / SHARD_INDEX_NAME
+    if not index_path.exists():
+        return
+    with open(index_path, "rb") as f:
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            yield json.loads(line)
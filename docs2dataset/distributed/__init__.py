@@ -0,0 +1,2 @@
+from .lease_coordinator import LeaseCoordinator, LeaseTracker
+from .sharding import merge_shards, shard_of
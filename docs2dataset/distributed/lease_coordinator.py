@@ -0,0 +1,313 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+from docs2dataset.utils.logging_utils import setup_logger
+
+LEASES_FILE_NAME = "leases.sqlite"
+
+
+class LeaseCoordinator:
+    """
+    Queue of input files shared by the nodes of a distributed run, kept in a SQLite file in the shared
+    output directory.
+
+    The first node to start lists and samples the input and fills the queue, the other nodes start
+    claiming files as soon as they appear. The populator role is leased as well, so another node takes
+    over filling the queue if the populator dies before it is done. A claimed file is leased to its node for lease_timeout_sec;
+    live nodes renew their leases, so the files of a node that died become claimable again once its
+    leases expire. A file is marked done once its results are committed to the node's output.
+
+    The shared filesystem must support POSIX locks, and the clocks of the nodes should be synchronized
+    to well within lease_timeout_sec. The rollback journal is used instead of WAL, which requires shared
+    memory and therefore does not work across machines.
+    """
+
+    def __init__(
+            self,
+            db_path: Path,
+            node_id: str,
+            lease_timeout_sec: float = 600,
+            logging_level: int = logging.INFO
+    ):
+        self.db_path = Path(db_path)
+        self.node_id = node_id
+        self.lease_timeout_sec = lease_timeout_sec
+        self.logger = setup_logger(self.__class__.__name__, logging_level)
+        self._local = threading.local()
+
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        with self._transaction() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS units ("
+                "id INTEGER PRIMARY KEY, file_path TEXT NOT NULL UNIQUE, class_name TEXT NOT NULL, "
+                "owner TEXT, lease_expires REAL NOT NULL DEFAULT 0, done INTEGER NOT NULL DEFAULT 0)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS units_claimable ON units (done, lease_expires)")
+
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        del state["_local"]
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self._local = threading.local()
+
+    def try_become_populator(self, seed: int) -> bool:
+        """
+        Elect the node that fills the queue. The seed of the first elected node is used for sampling by
+        every node, see seed(). The election is a lease renewed by populate: a populator that died while
+        filling the queue resumes when it is restarted with the same node_id, and any node takes over
+        once its lease expired. Files already queued are skipped by the next populator.
+
+        Args:
+            seed (int): Sampling seed of this node.
+
+        Returns:
+            bool: True if this node must call populate.
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            if conn.execute("SELECT 1 FROM meta WHERE key = 'populated'").fetchone() is not None:
+                return False
+            conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('seed', ?)", (str(seed),))
+            row = conn.execute(
+                "SELECT p.value, COALESCE(e.value, '0') FROM meta p LEFT JOIN meta e ON e.key = 'populator_expires' "
+                "WHERE p.key = 'populator'"
+            ).fetchone()
+            if row is not None and row[0] != self.node_id and float(row[1]) >= now:
+                return False
+            if row is not None and row[0] != self.node_id:
+                self.logger.warning(f"Populator '{row[0]}' stopped renewing its lease, taking over filling the queue.")
+            self._lease_populator(conn, now)
+        return True
+
+    def populate(self, files: Iterable[Tuple[str, str]], chunk_size: int = 1000) -> int:
+        """
+        Add files to the queue, committing in chunks so other nodes can start claiming right away.
+
+        Args:
+            files (Iterable[Tuple[str, str]]): (file path relative to the input directory, class name) pairs.
+            chunk_size (int): Number of files per transaction.
+
+        Returns:
+            int: Number of files added.
+        """
+        added, chunk = 0, []
+        for item in files:
+            chunk.append(item)
+            if len(chunk) >= chunk_size:
+                added += self._insert(chunk, renew_populator=True)
+                chunk = []
+        added += self._insert(chunk, renew_populator=True)
+
+        with self._transaction() as conn:
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('populated', '1')")
+        self.logger.info(f"Queued {added} file(s) for processing.")
+        return added
+
+    def seed(self) -> int | None:
+        return self._meta_int("seed")
+
+    def is_populated(self) -> bool:
+        return self._meta_int("populated") == 1
+
+    def release_own(self) -> None:
+        """Make the unfinished files leased to this node by a previous incarnation claimable again."""
+        with self._transaction() as conn:
+            released = conn.execute(
+                "UPDATE units SET owner = NULL, lease_expires = 0 WHERE owner = ? AND done = 0", (self.node_id,)
+            ).rowcount
+        if released:
+            self.logger.info(f"Released {released} file(s) leased by a previous run of node '{self.node_id}'.")
+
+    def claim(self, count: int) -> List[Tuple[str, str]]:
+        """
+        Lease up to count files that are not done and not leased, or whose lease expired.
+
+        Returns:
+            List[Tuple[str, str]]: Claimed (file path, class name) pairs in queue order.
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            rows = conn.execute(
+                "SELECT id, file_path, class_name, owner FROM units "
+                "WHERE done = 0 AND lease_expires < ? ORDER BY id LIMIT ?",
+                (now, count)
+            ).fetchall()
+            conn.executemany(
+                "UPDATE units SET owner = ?, lease_expires = ? WHERE id = ?",
+                [(self.node_id, now + self.lease_timeout_sec, row[0]) for row in rows]
+            )
+
+        expired = [row[1] for row in rows if row[3] is not None and row[3] != self.node_id]
+        if expired:
+            self.logger.warning(f"Reclaimed {len(expired)} file(s) whose lease expired, e.g. {expired[0]}")
+        return [(row[1], row[2]) for row in rows]
+
+    def renew(self, file_paths: List[str]) -> None:
+        """Extend the leases of files this node is still working on."""
+        with self._transaction() as conn:
+            conn.executemany(
+                "UPDATE units SET lease_expires = ? WHERE file_path = ? AND owner = ? AND done = 0",
+                [(time.time() + self.lease_timeout_sec, file_path, self.node_id) for file_path in file_paths]
+            )
+
+    def complete(self, file_paths: List[str]) -> None:
+        """Mark files as done, their results are committed to this node's output."""
+        with self._transaction() as conn:
+            conn.executemany("UPDATE units SET done = 1 WHERE file_path = ?", [(path,) for path in file_paths])
+
+    def progress(self) -> Dict[str, int]:
+        """
+        Returns:
+            Dict[str, int]: Numbers of "total", "done" and "leased" (unexpired, not done) files.
+        """
+        total, done, leased = self._connection().execute(
+            "SELECT COUNT(*), COALESCE(SUM(done), 0), COALESCE(SUM(done = 0 AND lease_expires >= ?), 0) FROM units",
+            (time.time(),)
+        ).fetchone()
+        return {"total": total, "done": done, "leased": leased}
+
+    def all_done(self) -> bool:
+        progress = self.progress()
+        return self.is_populated() and progress["done"] == progress["total"]
+
+    def _insert(self, chunk: List[Tuple[str, str]], renew_populator: bool = False) -> int:
+        with self._transaction() as conn:
+            if renew_populator:
+                self._lease_populator(conn, time.time())
+            if not chunk:
+                return 0
+            return conn.executemany(
+                "INSERT OR IGNORE INTO units (file_path, class_name) VALUES (?, ?)", chunk
+            ).rowcount
+
+    def _lease_populator(self, conn: sqlite3.Connection, now: float) -> None:
+        conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('populator', ?)", (self.node_id,))
+        conn.execute(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES ('populator_expires', ?)",
+            (str(now + self.lease_timeout_sec),)
+        )
+
+    def _meta_int(self, key: str) -> int | None:
+        row = self._connection().execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return int(row[0]) if row is not None else None
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        # BEGIN IMMEDIATE takes the write lock up front, so two nodes can't e.g. claim the same files
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        # A connection inherited by a forked worker must not be used, open a new one
+        if conn is None or self._local.pid != os.getpid():
+            # Autocommit mode, write transactions are opened explicitly by _transaction
+            conn = sqlite3.connect(self.db_path, timeout=max(60.0, self.lease_timeout_sec), isolation_level=None)
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+
+class LeaseTracker:
+    """
+    Node-side bookkeeping of leased files: claims files from a LeaseCoordinator as page tasks are
+    needed, renews the leases of unfinished files in a background thread and marks a file done
+    once all of its pages are committed by the DatasetWriter.
+    """
+
+    def __init__(self, coordinator: LeaseCoordinator, input_path: Path, logging_level: int = logging.INFO):
+        self.coordinator = coordinator
+        self.input_path = Path(input_path)
+        self.logger = setup_logger(self.__class__.__name__, logging_level)
+        self._lock = threading.Lock()
+        # Relative path of a leased file -> number of its pages not committed yet (None until expanded)
+        self._pending: Dict[str, int | None] = {}
+        self._stop = threading.Event()
+        self._heartbeat = None
+
+    def __enter__(self) -> "LeaseTracker":
+        self._heartbeat = threading.Thread(target=self._renew_leases, name="lease-heartbeat", daemon=True)
+        self._heartbeat.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self._stop.set()
+        self._heartbeat.join()
+
+    def claim(self, count: int) -> List[Tuple[Path, str]]:
+        """
+        Returns:
+            List[Tuple[Path, str]]: Up to count newly leased (file path, class name) pairs.
+        """
+        claimed = self.coordinator.claim(count)
+        with self._lock:
+            for rel_path, _ in claimed:
+                self._pending[rel_path] = None
+        return [(self.input_path / rel_path, class_name) for rel_path, class_name in claimed]
+
+    def expect(self, file_path: Path, num_pages: int) -> None:
+        """
+        Record how many pages of a leased file still have to be committed. A file with no pages left
+        (unreadable, or completed by a resumed run) is marked done right away.
+        """
+        rel_path = self._relative(file_path.as_posix())
+        with self._lock:
+            self._pending[rel_path] = num_pages
+        if num_pages == 0:
+            self._complete([rel_path])
+
+    def committed(self, units: List[Tuple[str, int]]) -> None:
+        """DatasetWriter commit callback: mark files with all pages committed as done."""
+        finished = []
+        with self._lock:
+            for file_path, _ in units:
+                rel_path = self._relative(file_path)
+                remaining = self._pending.get(rel_path)
+                if remaining is None:
+                    continue
+                self._pending[rel_path] = remaining - 1
+                if remaining == 1:
+                    finished.append(rel_path)
+        if finished:
+            self._complete(finished)
+
+    def has_pending(self) -> bool:
+        with self._lock:
+            return bool(self._pending)
+
+    def _complete(self, rel_paths: List[str]) -> None:
+        self.coordinator.complete(rel_paths)
+        with self._lock:
+            for rel_path in rel_paths:
+                self._pending.pop(rel_path, None)
+
+    def _relative(self, file_path: str) -> str:
+        return Path(file_path).relative_to(self.input_path).as_posix()
+
+    def _renew_leases(self) -> None:
+        interval = self.coordinator.lease_timeout_sec / 3
+        while not self._stop.wait(interval):
+            with self._lock:
+                leased = list(self._pending)
+            if not leased:
+                continue
+            try:
+                self.coordinator.renew(leased)
+            except sqlite3.Error as e:
+                self.logger.warning(f"Failed to renew {len(leased)} lease(s): {e}")
@@ -0,0 +1,153 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+from pathlib import Path
+from typing import List, Set, Tuple
+
+from docs2dataset.data_managers.dataset_writer import (
+    MANIFEST_NAME,
+    WORD_BOXES_DIR_NAME,
+    read_committed_dataset,
+    read_manifest,
+    read_word_boxes_part,
+    write_word_boxes_part
+)
+from docs2dataset.utils.logging_utils import setup_logger
+from docs2dataset.utils.params_utils import PARAMS_FILE_NAME, load_run_params
+
+SHARDS_DIR_NAME = "shards"
+# Created by the node that merges the shards, so only one of them does
+MERGE_LOCK_NAME = "merge.lock"
+# Extra column of node outputs identifying the source file, used to drop duplicates on merge
+SOURCE_PATH_COLUMN = "SourcePath"
+# Node-specific parameters that are not part of the merged run parameters
+NODE_PARAMS = ("output_path", "shard_id", "node_id")
+
+
+def shard_of(rel_path: str, num_shards: int) -> int:
+    """
+    Deterministic shard of an input file, independent of the process and the machine.
+
+    Args:
+        rel_path (str): Path of the file relative to the input directory, in posix form.
+        num_shards (int): Number of shards.
+
+    Returns:
+        int: Shard id in [0, num_shards).
+    """
+    digest = hashlib.blake2b(rel_path.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big") % num_shards
+
+
+def shard_paths(output_path: Path) -> List[Path]:
+    """
+    Returns:
+        List[Path]: Output directories of the nodes of a distributed run, in name order.
+    """
+    shards_path = Path(output_path) / SHARDS_DIR_NAME
+    if not shards_path.exists():
+        return []
+    return sorted(path for path in shards_path.iterdir() if (path / MANIFEST_NAME).exists())
+
+
+def merge_shards(
+        output_path: Path,
+        csv_name: str = "data.csv",
+        output_format: str = "csv",
+        logging_level: int = logging.INFO
+) -> Path:
+    """
+    Merge the committed results of all nodes of a distributed run into the final dataset in output_path,
+    next to the shards directory. Pages processed by more than one node (e.g. after a lease expired) are
+    kept once. Merging again replaces the previous merge result.
+
+    Args:
+        output_path (Path): Shared output directory of the run.
+        csv_name (str): Name of the CSV file.
+        output_format (str): "csv" or "parquet".
+        logging_level (int): Logging level.
+
+    Returns:
+        Path: The merged CSV file or parquet directory.
+    """
+    logger = setup_logger("ShardMerge", logging_level)
+    output_path = Path(output_path)
+    shards = shard_paths(output_path)
+    if not shards:
+        raise FileNotFoundError(f"No shards to merge in {output_path / SHARDS_DIR_NAME}")
+
+    csv_path = output_path / csv_name
+    parquet_path = csv_path.with_suffix(".parquet")
+    word_boxes_path = output_path / WORD_BOXES_DIR_NAME
+    _remove(csv_path, parquet_path, word_boxes_path, output_path / MANIFEST_NAME)
+
+    seen_pages: Set[Tuple[str, int]] = set()
+    seen_boxes: Set[Tuple[str, int]] = set()
+    csv_bytes, parquet_parts, box_parts, num_rows = 0, 0, 0, 0
+    for shard_path in shards:
+        chunk = read_committed_dataset(shard_path, csv_name, output_format)
+        if chunk is not None and len(chunk):
+            keys = list(zip(chunk[SOURCE_PATH_COLUMN], chunk["Page"].astype(int)))
+            chunk = chunk[[key not in seen_pages for key in keys]].drop(columns=SOURCE_PATH_COLUMN)
+            seen_pages.update(keys)
+
+        if chunk is not None and len(chunk):
+            if output_format == "parquet":
+                parquet_path.mkdir(exist_ok=True)
+                chunk.to_parquet(parquet_path / f"part-{parquet_parts:05d}.parquet", index=False)
+                parquet_parts += 1
+            else:
+                with open(csv_path, "a", encoding="utf-8", newline="") as f:
+                    chunk.to_csv(f, index=False, header=csv_bytes == 0)
+                    csv_bytes = f.tell()
+            num_rows += len(chunk)
+
+        box_parts = _merge_word_boxes(shard_path, word_boxes_path, box_parts, seen_boxes)
+        logger.info(f"Merged shard {shard_path.name}")
+
+    record = {
+        "complete": True,
+        "shards": [path.name for path in shards],
+        "csv_bytes": csv_bytes,
+        "parquet_parts": parquet_parts,
+        "box_parts": box_parts
+    }
+    with open(output_path / MANIFEST_NAME, "w", encoding="utf-8") as f:
+        f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    run_params = load_run_params(shards[0]) or {}
+    for key in NODE_PARAMS:
+        run_params.pop(key, None)
+    run_params = {"output_path": str(output_path), **run_params, "shards": record["shards"]}
+    with open(output_path / PARAMS_FILE_NAME, "w", encoding="utf-8") as f:
+        json.dump(run_params, f, indent=4, ensure_ascii=False)
+
+    logger.info(f"Merged {num_rows} rows from {len(shards)} shard(s) into {output_path}")
+    return parquet_path if output_format == "parquet" else csv_path
+
+
+def _merge_word_boxes(shard_path: Path, word_boxes_path: Path, box_parts: int, seen: Set[Tuple[str, int]]) -> int:
+    records = read_manifest(shard_path / MANIFEST_NAME)
+    committed_parts = records[-1].get("box_parts", 0) if records else 0
+
+    for i in range(committed_parts):
+        entries = [
+            entry for entry in read_word_boxes_part(shard_path / WORD_BOXES_DIR_NAME / f"part-{i:05d}.npz")
+            if entry[:2] not in seen
+        ]
+        seen.update(entry[:2] for entry in entries)
+        if entries:
+            word_boxes_path.mkdir(exist_ok=True)
+            write_word_boxes_part(word_boxes_path / f"part-{box_parts:05d}.npz", entries)
+            box_parts += 1
+    return box_parts
+
+
+def _remove(*paths: Path) -> None:
+    for path in paths:
+        if path.is_dir():
+            shutil.rmtree(path)
+        elif path.exists():
+            os.remove(path)
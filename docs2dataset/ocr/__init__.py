@@ -1 +1 @@
-from .ocr_interface import OCRInterface
+from .ocr_interface import OCRInterface, OCROutput, WordBoxes, TxtItem, Box
@@ -0,0 +1,21 @@
+from docs2dataset.ocr.ocr_interface import OCRInterface
+
+
+def create_ocr_engine(engine_name: str, lang: str) -> OCRInterface:
+    """
+    Create a built-in OCR engine by name.
+
+    Args:
+        engine_name (str): "Tesseract" (pytesseract) or "TesseractCAPI" (in-process libtesseract).
+        lang (str): Language parameter for the engine.
+
+    Returns:
+        OCRInterface: The OCR engine.
+    """
+    if engine_name == "Tesseract":
+        from docs2dataset.ocr.implementations.pytesseract_ocr import PytesseractOCR
+        return PytesseractOCR(lang)
+    if engine_name == "TesseractCAPI":
+        from docs2dataset.ocr.implementations.tesseract_capi_ocr import TesseractCAPIOCR
+        return TesseractCAPIOCR(lang)
+    raise ValueError(f"Unknown OCR engine {engine_name=}, expected 'Tesseract' or 'TesseractCAPI'.")
@@ -1 +1,3 @@
 from .pytesseract_ocr import PytesseractOCR
+from .tesseract_capi_ocr import TesseractCAPIOCR
+from .ocr_service_client import OCRServiceClient
@@ -0,0 +1,199 @@
+import itertools
+import os
+import queue
+import socket
+import threading
+from multiprocessing.util import Finalize
+from typing import Iterable, List
+
+import numpy as np
+
+from docs2dataset.ocr.ocr_interface import OCRInterface, OCROutput, WordBoxes
+from docs2dataset.ocr.service.protocol import parse_address, recv_message, send_message
+from docs2dataset.utils.shared_memory_ring import SharedImageRing
+
+
+class _PooledConnection:
+    def __init__(self, sock: socket.socket):
+        self.sock = sock
+        # Whether the service attached to the shared memory ring of this process, None until tried
+        self.ring_attached: bool | None = None
+
+
+class OCRServiceClient(OCRInterface):
+    """
+    OCRInterface implementation that sends images to a local OCR service (see OCRServer).
+
+    Connections are pooled per process and reused across calls. All images of one recognize call are
+    pipelined over a single connection before the responses are read, so the service can batch them.
+
+    With shm_slots > 0, each process hands images to the service through a SharedImageRing instead of
+    the socket: an image is copied once into a free slot and the service recognizes it in place. Images
+    that don't fit a slot, or don't find a free one, are sent over the socket as usual, as are all images
+    if the service can't attach to the ring (e.g. it runs on another host). Each process needs
+    shm_slots * shm_slot_mb of shared memory (/dev/shm on Linux).
+    """
+
+    def __init__(self, address: str, pool_size: int = 4, timeout_sec: float = 120, shm_slots: int = 0,
+                 shm_slot_mb: float = 9):
+        """
+        Args:
+            address (str): Service address, "unix:/path/to/socket" or "host:port".
+            pool_size (int): Maximum number of idle connections kept per process.
+            timeout_sec (float): Socket timeout for a single response.
+            shm_slots (int): Number of shared memory slots per process, shared memory is not used if 0.
+            shm_slot_mb (float): Size of a slot, 9 MB fit a 3 megapixel BGR page.
+        """
+        self.address = address
+        self.pool_size = pool_size
+        self.timeout_sec = timeout_sec
+        self.shm_slots = shm_slots
+        self.shm_slot_mb = shm_slot_mb
+        self._engine_name: str | None = None
+        self._init_pool()
+
+    def _init_pool(self) -> None:
+        self._pid = os.getpid()
+        self._pool: "queue.LifoQueue[_PooledConnection]" = queue.LifoQueue()
+        self._request_ids = itertools.count()
+        self._lock = threading.Lock()
+        # Created on first use, so only processes that do OCR allocate shared memory
+        self._ring: SharedImageRing | None = None
+        self._ring_failed = False
+
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        # Sockets and shared memory are not shared between processes, each process builds its own
+        for key in ("_pid", "_pool", "_request_ids", "_lock", "_ring", "_ring_failed"):
+            del state[key]
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self._init_pool()
+
+    def recognize(self, images: Iterable[np.ndarray]) -> List[OCROutput]:
+        """
+        Send all images to the service, then collect the results in input order.
+        """
+        connection = self._acquire()
+        ring, slots = None, []
+        try:
+            ring = self._attached_ring(connection)
+            request_ids = []
+            for image in images:
+                request_id = self._next_request_id()
+                slot_header = ring.try_write(image) if ring is not None else None
+                if slot_header is not None:
+                    slots.append(slot_header["slot"])
+                    send_message(connection.sock, {"type": "recognize", "id": request_id, **slot_header})
+                else:
+                    image = np.ascontiguousarray(image)
+                    send_message(
+                        connection.sock,
+                        {"type": "recognize", "id": request_id, "shape": image.shape, "dtype": image.dtype.str},
+                        memoryview(image).cast("B")
+                    )
+                request_ids.append(request_id)
+
+            outputs = {}
+            for _ in request_ids:
+                header, payload = recv_message(connection.sock)
+                if not header["ok"]:
+                    raise RuntimeError(f"OCR service error: {header.get('error')}")
+                outputs[header["id"]] = OCROutput(word_boxes=WordBoxes.from_bytes(payload))
+        except BaseException:
+            # The connection may hold unread responses, never return it to the pool
+            connection.sock.close()
+            raise
+        finally:
+            for slot in slots:
+                ring.release(slot)
+
+        self._release(connection)
+        return [outputs[request_id] for request_id in request_ids]
+
+    @property
+    def engine_name(self) -> str:
+        """Name of the engine running in the service."""
+        if self._engine_name is None:
+            connection = self._acquire()
+            try:
+                send_message(connection.sock, {"type": "info", "id": self._next_request_id()})
+                header, _ = recv_message(connection.sock)
+            except BaseException:
+                connection.sock.close()
+                raise
+            self._release(connection)
+            self._engine_name = header["engine_name"]
+        return self._engine_name
+
+    @property
+    def thread_safe(self) -> bool:
+        """Connections are pooled under a lock and rebuilt in each process."""
+        return True
+
+    @property
+    def process_safe(self) -> bool:
+        return True
+
+    def close(self) -> None:
+        """Close the pooled connections and remove the shared memory ring of this process."""
+        while True:
+            try:
+                self._pool.get_nowait().sock.close()
+            except queue.Empty:
+                break
+        with self._lock:
+            if self._ring is not None and self._pid == os.getpid():
+                self._ring.close()
+            self._ring = None
+
+    def _next_request_id(self) -> int:
+        with self._lock:
+            return next(self._request_ids)
+
+    def _acquire(self) -> _PooledConnection:
+        if self._pid != os.getpid():
+            # Forked worker: the inherited sockets and ring belong to the parent process
+            self._init_pool()
+        try:
+            return self._pool.get_nowait()
+        except queue.Empty:
+            family, address = parse_address(self.address)
+            sock = socket.socket(family, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout_sec)
+            sock.connect(address)
+            return _PooledConnection(sock)
+
+    def _release(self, connection: _PooledConnection) -> None:
+        if self._pool.qsize() < self.pool_size:
+            self._pool.put(connection)
+        else:
+            connection.sock.close()
+
+    def _attached_ring(self, connection: _PooledConnection) -> SharedImageRing | None:
+        """The ring of this process if the service attached to it over this connection, otherwise None."""
+        ring = self._process_ring()
+        if ring is None or connection.ring_attached is False:
+            return None
+        if connection.ring_attached is None:
+            send_message(connection.sock, {
+                "type": "attach_ring", "id": self._next_request_id(), "name": ring.name,
+                "num_slots": ring.num_slots, "slot_size": ring.slot_size
+            })
+            header, _ = recv_message(connection.sock)
+            connection.ring_attached = header["ok"]
+        return ring if connection.ring_attached else None
+
+    def _process_ring(self) -> SharedImageRing | None:
+        with self._lock:
+            if self._ring is None and self.shm_slots > 0 and not self._ring_failed:
+                try:
+                    self._ring = SharedImageRing(self.shm_slots, int(self.shm_slot_mb * 1024 * 1024))
+                except OSError:
+                    self._ring_failed = True
+                    return None
+                # Runs at exit of the main process and of pool workers that are shut down gracefully
+                Finalize(None, self.close, exitpriority=0)
+            return self._ring
@@ -1,7 +1,9 @@
+from typing import Iterable, List
+
 import pytesseract
 import numpy as np
 
-from docs2dataset.ocr.ocr_interface import OCRInterface
+from docs2dataset.ocr.ocr_interface import OCRInterface, OCROutput, WordBoxes
 
 
 class PytesseractOCR(OCRInterface):
@@ -16,10 +18,13 @@ class PytesseractOCR(OCRInterface):
         """
         self._lang = lang
 
-    def recognize(self, image: np.ndarray) -> str:
+    def recognize(self, images: Iterable[np.ndarray]) -> List[OCROutput]:
         """
-        Perform OCR using pytesseract on a single image.
+        Perform OCR using pytesseract on each image, keeping word boxes and confidences.
         """
+        return [self._recognize_image(image) for image in images]
+
+    def _recognize_image(self, image: np.ndarray) -> OCROutput:
         ocr_data = pytesseract.image_to_data(
             image,
             lang=self._lang,
@@ -27,15 +32,31 @@ class PytesseractOCR(OCRInterface):
             timeout=30
         )
 
-        words = []
-        for i, text_val in enumerate(ocr_data["text"]):
-            conf = float(ocr_data["conf"][i])
-            if conf > 0 and text_val.strip():
-                words.append(text_val.strip())
+        words = np.array([text_val.strip() for text_val in ocr_data["text"]], dtype=str)
+        confidences = np.asarray(ocr_data["conf"], dtype=np.float32)
+        keep = (confidences > 0) & (np.char.str_len(words) > 0)
 
-        return " ".join(words)
+        left = np.asarray(ocr_data["left"], dtype=np.int32)[keep]
+        top = np.asarray(ocr_data["top"], dtype=np.int32)[keep]
+        width = np.asarray(ocr_data["width"], dtype=np.int32)[keep]
+        height = np.asarray(ocr_data["height"], dtype=np.int32)[keep]
+
+        return OCROutput(word_boxes=WordBoxes(
+            words=words[keep],
+            boxes=np.stack([left, top, left + width, top + height], axis=1),
+            confidences=confidences[keep]
+        ))
 
     @property
     def engine_name(self) -> str:
         """Name of the OCR engine."""
         return "Tesseract"
+
+    @property
+    def thread_safe(self) -> bool:
+        """Every call runs its own tesseract process."""
+        return True
+
+    @property
+    def process_safe(self) -> bool:
+        return True
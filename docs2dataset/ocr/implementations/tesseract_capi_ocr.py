@@ -0,0 +1,223 @@
+import atexit
+import ctypes
+import ctypes.util
+import os
+import threading
+from typing import Iterable, List
+
+import cv2
+import numpy as np
+
+from docs2dataset.ocr.ocr_interface import OCRInterface, OCROutput, WordBoxes
+
+# Iterator level of tesseract::PageIteratorLevel
+RIL_WORD = 3
+
+_LIBRARY_NAMES = ["tesseract", "libtesseract.so.5", "libtesseract.so.4", "libtesseract.dylib", "libtesseract-5"]
+_lib = None
+_lib_lock = threading.Lock()
+_live_handles = set()
+
+
+def _load_library() -> ctypes.CDLL:
+    """
+    Load libtesseract once per process and declare the used C API signatures.
+    The library path can be set explicitly with the TESSERACT_LIBRARY environment variable.
+    """
+    global _lib
+    with _lib_lock:
+        if _lib is not None:
+            return _lib
+
+        for name in [os.environ.get("TESSERACT_LIBRARY")] + _LIBRARY_NAMES:
+            path = ctypes.util.find_library(name) if name == "tesseract" else name
+            if not path:
+                continue
+            try:
+                lib = ctypes.CDLL(path)
+                break
+            except OSError:
+                continue
+        else:
+            raise OSError("libtesseract was not found, install Tesseract or use the pytesseract engine.")
+
+        c_int_p = ctypes.POINTER(ctypes.c_int)
+        signatures = {
+            "TessBaseAPICreate": ([], ctypes.c_void_p),
+            "TessBaseAPIInit3": ([ctypes.c_void_p, ctypes.c_char_p, ctypes.c_char_p], ctypes.c_int),
+            "TessBaseAPISetImage": (
+                [ctypes.c_void_p, ctypes.c_void_p, ctypes.c_int, ctypes.c_int, ctypes.c_int, ctypes.c_int], None
+            ),
+            "TessBaseAPISetSourceResolution": ([ctypes.c_void_p, ctypes.c_int], None),
+            "TessBaseAPIRecognize": ([ctypes.c_void_p, ctypes.c_void_p], ctypes.c_int),
+            "TessBaseAPIGetIterator": ([ctypes.c_void_p], ctypes.c_void_p),
+            "TessBaseAPIClear": ([ctypes.c_void_p], None),
+            "TessBaseAPIEnd": ([ctypes.c_void_p], None),
+            "TessBaseAPIDelete": ([ctypes.c_void_p], None),
+            "TessResultIteratorGetPageIterator": ([ctypes.c_void_p], ctypes.c_void_p),
+            "TessResultIteratorGetUTF8Text": ([ctypes.c_void_p, ctypes.c_int], ctypes.c_void_p),
+            "TessResultIteratorConfidence": ([ctypes.c_void_p, ctypes.c_int], ctypes.c_float),
+            "TessResultIteratorNext": ([ctypes.c_void_p, ctypes.c_int], ctypes.c_int),
+            "TessResultIteratorDelete": ([ctypes.c_void_p], None),
+            "TessPageIteratorBoundingBox": ([ctypes.c_void_p, ctypes.c_int, c_int_p, c_int_p, c_int_p, c_int_p],
+                                            ctypes.c_int),
+            "TessDeleteText": ([ctypes.c_void_p], None),
+            "TessMonitorCreate": ([], ctypes.c_void_p),
+            "TessMonitorSetDeadlineMSecs": ([ctypes.c_void_p, ctypes.c_int], None),
+            "TessMonitorDelete": ([ctypes.c_void_p], None),
+        }
+        for func_name, (argtypes, restype) in signatures.items():
+            func = getattr(lib, func_name)
+            func.argtypes = argtypes
+            func.restype = restype
+
+        _lib = lib
+        return _lib
+
+
+def _delete_handle(handle: int) -> None:
+    _lib.TessBaseAPIEnd(handle)
+    _lib.TessBaseAPIDelete(handle)
+    _live_handles.discard(handle)
+
+
+@atexit.register
+def _delete_live_handles() -> None:
+    # Free language models before libtesseract's global caches are torn down at exit
+    for handle in list(_live_handles):
+        _delete_handle(handle)
+
+
+class TesseractCAPIOCR(OCRInterface):
+    """
+    In-process Tesseract implementation of OCRInterface, calling the libtesseract C API through ctypes.
+
+    Unlike PytesseractOCR it does not spawn a tesseract process and write a temporary image per page:
+    each worker (process or thread) keeps one initialized API handle with the language model loaded,
+    and images are passed to it as ndarray buffers.
+    """
+
+    def __init__(self, lang: str = "rus", tessdata_path: str | None = None, dpi: int | None = None,
+                 timeout_sec: int = 30):
+        """
+        Args:
+            lang (str): Language parameter for Tesseract.
+            tessdata_path (str): Directory with traineddata files. Uses Tesseract's default if None.
+            dpi (int): Source resolution reported to Tesseract. Estimated by Tesseract if None.
+            timeout_sec (int): Recognition deadline per image.
+        """
+        self._lang = lang
+        self._tessdata_path = tessdata_path
+        self._dpi = dpi
+        self._timeout_sec = timeout_sec
+        self._local = threading.local()
+
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        # API handles are bound to the process that created them
+        del state["_local"]
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self._local = threading.local()
+
+    def recognize(self, images: Iterable[np.ndarray]) -> List[OCROutput]:
+        """
+        Perform OCR on each image with the handle of the calling thread.
+        """
+        lib = _load_library()
+        handle = self._handle(lib)
+        return [self._recognize_image(lib, handle, image) for image in images]
+
+    def close(self) -> None:
+        """Release the API handle of the calling thread."""
+        handle = getattr(self._local, "handle", None)
+        if handle is not None and self._local.pid == os.getpid():
+            _delete_handle(handle)
+        self._local.handle = None
+
+    def _handle(self, lib: ctypes.CDLL) -> int:
+        handle = getattr(self._local, "handle", None)
+        # A handle inherited by a forked worker is not used, each process initializes its own
+        if handle is None or self._local.pid != os.getpid():
+            handle = lib.TessBaseAPICreate()
+            datapath = self._tessdata_path.encode("utf-8") if self._tessdata_path else None
+            if lib.TessBaseAPIInit3(handle, datapath, self._lang.encode("utf-8")) != 0:
+                lib.TessBaseAPIDelete(handle)
+                raise RuntimeError(f"Could not initialize Tesseract with language '{self._lang}'.")
+            self._local.handle = handle
+            self._local.pid = os.getpid()
+            _live_handles.add(handle)
+        return handle
+
+    def _recognize_image(self, lib: ctypes.CDLL, handle: int, image: np.ndarray) -> OCROutput:
+        if image.ndim == 3:
+            # Tesseract expects RGB byte order
+            image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+        image = np.ascontiguousarray(image, dtype=np.uint8)
+        height, width = image.shape[:2]
+        bytes_per_pixel = 1 if image.ndim == 2 else image.shape[2]
+
+        lib.TessBaseAPISetImage(handle, image.ctypes.data, width, height, bytes_per_pixel, image.strides[0])
+        if self._dpi:
+            lib.TessBaseAPISetSourceResolution(handle, self._dpi)
+
+        monitor = lib.TessMonitorCreate()
+        try:
+            lib.TessMonitorSetDeadlineMSecs(monitor, self._timeout_sec * 1000)
+            if lib.TessBaseAPIRecognize(handle, monitor) != 0:
+                raise RuntimeError("Tesseract recognition failed or timed out.")
+            return OCROutput(word_boxes=self._read_words(lib, handle))
+        finally:
+            lib.TessMonitorDelete(monitor)
+            lib.TessBaseAPIClear(handle)
+
+    @staticmethod
+    def _read_words(lib: ctypes.CDLL, handle: int) -> WordBoxes:
+        result_iter = lib.TessBaseAPIGetIterator(handle)
+        if not result_iter:
+            return WordBoxes.empty()
+
+        words, boxes, confidences = [], [], []
+        coords = [ctypes.c_int() for _ in range(4)]
+        page_iter = lib.TessResultIteratorGetPageIterator(result_iter)
+        try:
+            while True:
+                text_ptr = lib.TessResultIteratorGetUTF8Text(result_iter, RIL_WORD)
+                if text_ptr:
+                    text = ctypes.string_at(text_ptr).decode("utf-8", errors="replace").strip()
+                    lib.TessDeleteText(text_ptr)
+                    conf = lib.TessResultIteratorConfidence(result_iter, RIL_WORD)
+                    if conf > 0 and text and lib.TessPageIteratorBoundingBox(
+                            page_iter, RIL_WORD, *[ctypes.byref(c) for c in coords]):
+                        words.append(text)
+                        boxes.append([c.value for c in coords])
+                        confidences.append(conf)
+
+                if not lib.TessResultIteratorNext(result_iter, RIL_WORD):
+                    break
+        finally:
+            lib.TessResultIteratorDelete(result_iter)
+
+        if not words:
+            return WordBoxes.empty()
+        return WordBoxes(
+            words=np.array(words, dtype=str),
+            boxes=np.array(boxes, dtype=np.int32),
+            confidences=np.array(confidences, dtype=np.float32)
+        )
+
+    @property
+    def engine_name(self) -> str:
+        """Name of the OCR engine."""
+        return "TesseractCAPI"
+
+    @property
+    def thread_safe(self) -> bool:
+        """API handles are kept per thread and created anew in each process."""
+        return True
+
+    @property
+    def process_safe(self) -> bool:
+        return True
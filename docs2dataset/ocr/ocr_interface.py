@@ -1,3 +1,4 @@
+import io
 from abc import ABC, abstractmethod
 from dataclasses import dataclass
 from typing import Iterable, List
@@ -21,11 +22,104 @@ class TxtItem:
 
 
 @dataclass
+class WordBoxes:
+    """
+    Columnar representation of the recognized words of a page.
+    Holds one array per attribute instead of a TxtItem per word, which keeps millions of words cheap.
+    """
+    words: np.ndarray        # (N,) unicode strings
+    boxes: np.ndarray        # (N, 4) int32: x1, y1, x2, y2
+    confidences: np.ndarray  # (N,) float32, MUST be in range 0...100
+
+    def __len__(self) -> int:
+        return len(self.words)
+
+    @property
+    def nbytes(self) -> int:
+        return self.words.nbytes + self.boxes.nbytes + self.confidences.nbytes
+
+    @classmethod
+    def empty(cls) -> 'WordBoxes':
+        return cls(
+            words=np.array([], dtype=str),
+            boxes=np.zeros((0, 4), dtype=np.int32),
+            confidences=np.zeros(0, dtype=np.float32)
+        )
+
+    @classmethod
+    def from_text_items(cls, text_items: List[TxtItem]) -> 'WordBoxes':
+        if not text_items:
+            return cls.empty()
+        return cls(
+            words=np.array([item.text for item in text_items], dtype=str),
+            boxes=np.array(
+                [(item.bbox.x1, item.bbox.y1, item.bbox.x2, item.bbox.y2) for item in text_items], dtype=np.int32
+            ),
+            confidences=np.array([item.confidence for item in text_items], dtype=np.float32)
+        )
+
+    def to_text_items(self) -> List[TxtItem]:
+        return [
+            TxtItem(bbox=Box(*map(int, box)), text=str(word), confidence=float(conf))
+            for word, box, conf in zip(self.words, self.boxes, self.confidences)
+        ]
+
+    def to_bytes(self) -> bytes:
+        buffer = io.BytesIO()
+        np.savez(buffer, words=self.words, boxes=self.boxes, confidences=self.confidences)
+        return buffer.getvalue()
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'WordBoxes':
+        with np.load(io.BytesIO(data), allow_pickle=False) as arrays:
+            return cls(words=arrays["words"], boxes=arrays["boxes"], confidences=arrays["confidences"])
+
+
+@dataclass(init=False)
 class OCROutput:
-    text_items: List[TxtItem]
+    word_boxes: WordBoxes
+
+    def __init__(self, word_boxes: WordBoxes | List[TxtItem] | None = None, text_items: List[TxtItem] | None = None):
+        """
+        Args:
+            word_boxes (WordBoxes): The recognized words. A list of TxtItem is accepted as well.
+            text_items (List[TxtItem]): The recognized words as TxtItems, as OCROutput was built before WordBoxes.
+        """
+        if word_boxes is not None and text_items is not None:
+            raise TypeError("Pass either word_boxes or text_items to OCROutput, not both.")
+        if text_items is not None or isinstance(word_boxes, list):
+            word_boxes = WordBoxes.from_text_items(text_items if text_items is not None else word_boxes)
+        self.word_boxes = word_boxes if word_boxes is not None else WordBoxes.empty()
+
+    @property
+    def text(self) -> str:
+        return " ".join(self.word_boxes.words.tolist())
+
+    @property
+    def text_items(self) -> List[TxtItem]:
+        return self.word_boxes.to_text_items()
+
+    @classmethod
+    def from_text_items(cls, text_items: List[TxtItem]) -> 'OCROutput':
+        return cls(word_boxes=WordBoxes.from_text_items(text_items))
 
 
 class OCRInterface(ABC):
     @abstractmethod
     def recognize(self, images: Iterable[np.ndarray]) -> List[OCROutput]:
         pass
+
+    @property
+    def engine_name(self) -> str:
+        """Name of the OCR engine, part of the OCR cache key."""
+        return self.__class__.__name__
+
+    @property
+    def thread_safe(self) -> bool:
+        """Whether recognize may be called from several threads at once (the "threads" executor)."""
+        return False
+
+    @property
+    def process_safe(self) -> bool:
+        """Whether the engine can be pickled to worker processes and used there (the "processes" executor)."""
+        return False
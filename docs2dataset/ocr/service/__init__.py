@@ -0,0 +1 @@
+from .ocr_server import OCRServer
@@ -0,0 +1,31 @@
+import argparse
+import logging
+from functools import partial
+
+from docs2dataset.ocr.engine_factory import create_ocr_engine
+from docs2dataset.ocr.service.ocr_server import OCRServer
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run a local OCR service for OCRServiceClient.")
+    parser.add_argument("--address", default="unix:/tmp/docs2dataset_ocr.sock",
+                        help="'unix:/path/to/socket' or 'host:port'")
+    parser.add_argument("--engine", default="Tesseract", help="'Tesseract' or 'TesseractCAPI'")
+    parser.add_argument("--lang", default="rus")
+    parser.add_argument("--engines", type=int, default=1, help="Number of warm engine instances")
+    parser.add_argument("--max-batch-size", type=int, default=8)
+    parser.add_argument("--logging-level", default="INFO")
+    args = parser.parse_args()
+
+    server = OCRServer(
+        engine_factory=partial(create_ocr_engine, args.engine, args.lang),
+        address=args.address,
+        num_engines=args.engines,
+        max_batch_size=args.max_batch_size,
+        logging_level=getattr(logging, args.logging_level.upper(), logging.INFO)
+    )
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,248 @@
+import logging
+import os
+import queue
+import socket
+import threading
+from dataclasses import dataclass
+from typing import Callable, List
+
+import numpy as np
+
+from docs2dataset.ocr.ocr_interface import OCRInterface
+from docs2dataset.ocr.service.protocol import (
+    OversizedMessageError,
+    ProtocolError,
+    parse_address,
+    recv_message,
+    send_message
+)
+from docs2dataset.utils.logging_utils import setup_logger
+from docs2dataset.utils.shared_memory_ring import SharedImageRing
+
+# Kinds of image dtypes accepted in requests: unsigned and signed integers, floats
+IMAGE_DTYPE_KINDS = "uif"
+
+
+@dataclass
+class _Request:
+    request_id: int
+    image: np.ndarray | None
+    connection: "_Connection"
+
+
+class _Connection:
+    def __init__(self, sock: socket.socket):
+        self.sock = sock
+        self.send_lock = threading.Lock()
+        # Shared memory ring of the client, images of its requests may be views into it
+        self.ring: SharedImageRing | None = None
+        self._state_lock = threading.Lock()
+        self._pending = 0
+        self._closed = False
+
+    def send(self, header: dict, payload: bytes = b"") -> None:
+        with self.send_lock:
+            send_message(self.sock, header, payload)
+
+    def request_queued(self) -> None:
+        with self._state_lock:
+            self._pending += 1
+
+    def request_done(self) -> None:
+        with self._state_lock:
+            self._pending -= 1
+            if self._closed and self._pending == 0:
+                self._detach_ring()
+
+    def close(self) -> None:
+        self.sock.close()
+        with self._state_lock:
+            self._closed = True
+            # The ring stays attached until the queued requests of the connection are done
+            if self._pending == 0:
+                self._detach_ring()
+
+    def _detach_ring(self) -> None:
+        if self.ring is not None:
+            self.ring.close()
+            self.ring = None
+
+
+class OCRServer:
+    """
+    Long-lived local OCR service holding warm engine instances.
+
+    Clients (see OCRServiceClient) connect over a Unix socket or localhost TCP and may pipeline many requests
+    over one connection. Requests from all connections go to a shared queue. Each engine thread owns one engine
+    instance created by engine_factory and recognizes up to max_batch_size queued images per call.
+
+    A client may attach a SharedImageRing to its connection and then send images as slot references
+    instead of payloads. Those images are recognized in place, without being copied.
+    """
+
+    def __init__(
+            self,
+            engine_factory: Callable[[], OCRInterface],
+            address: str,
+            num_engines: int = 1,
+            max_batch_size: int = 8,
+            max_queued_requests: int = 256,
+            logging_level: int = logging.INFO
+    ):
+        """
+        Args:
+            engine_factory (Callable[[], OCRInterface]): Creates one engine instance per engine thread.
+            address (str): "unix:/path/to/socket" or "host:port".
+            num_engines (int): Number of warm engine instances (threads).
+            max_batch_size (int): Maximum number of images passed to one recognize call.
+            max_queued_requests (int): Maximum number of images waiting for an engine. Connections stop
+                reading requests while the queue is full.
+            logging_level (int): Logging level.
+        """
+        self.logger = setup_logger(self.__class__.__name__, logging_level)
+        self.engine_factory = engine_factory
+        self.address = address
+        self.num_engines = num_engines
+        self.max_batch_size = max_batch_size
+
+        self._requests: "queue.Queue[_Request]" = queue.Queue(maxsize=max_queued_requests)
+        self._stop = threading.Event()
+        self._engine_name = ""
+        self._listener: socket.socket | None = None
+
+    def serve_forever(self) -> None:
+        """Start the engine threads and accept client connections until shutdown is called."""
+        family, sock_address = parse_address(self.address)
+        if family == socket.AF_UNIX and os.path.exists(sock_address):
+            os.unlink(sock_address)
+
+        engines = [self.engine_factory() for _ in range(self.num_engines)]
+        self._engine_name = getattr(engines[0], "engine_name", engines[0].__class__.__name__)
+        for engine in engines:
+            threading.Thread(target=self._engine_loop, args=(engine,), daemon=True).start()
+
+        self._listener = socket.socket(family, socket.SOCK_STREAM)
+        if family == socket.AF_INET:
+            self._listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._listener.bind(sock_address)
+        self._listener.listen()
+        self.logger.info(f"OCR service ({self._engine_name} x{self.num_engines}) listening on {self.address}")
+
+        try:
+            while not self._stop.is_set():
+                try:
+                    client_sock, _ = self._listener.accept()
+                except OSError:
+                    break
+                threading.Thread(target=self._connection_loop, args=(_Connection(client_sock),), daemon=True).start()
+        finally:
+            self._listener.close()
+            if family == socket.AF_UNIX and os.path.exists(sock_address):
+                os.unlink(sock_address)
+
+    def shutdown(self) -> None:
+        self._stop.set()
+        if self._listener is not None:
+            try:
+                self._listener.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            self._listener.close()
+
+    def _connection_loop(self, connection: _Connection) -> None:
+        """Read requests from one client and queue them; responses are sent by the engine threads."""
+        try:
+            while not self._stop.is_set():
+                try:
+                    header, payload = recv_message(connection.sock)
+                except ProtocolError as e:
+                    connection.send({"id": None, "ok": False, "error": str(e)})
+                    continue
+                except OversizedMessageError as e:
+                    # The message was not read, so the stream can't be followed any further
+                    connection.send({"id": None, "ok": False, "error": str(e)})
+                    break
+
+                try:
+                    self._handle_request(connection, header, payload)
+                except (KeyError, TypeError, ValueError) as e:
+                    connection.send({"id": header.get("id"), "ok": False, "error": f"Bad request: {e!r}"})
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            connection.close()
+
+    def _handle_request(self, connection: _Connection, header: dict, payload: bytes) -> None:
+        """
+        Answer or queue one request.
+
+        Raises:
+            KeyError, TypeError, ValueError: If the request is malformed.
+        """
+        request_type = header.get("type")
+        if request_type == "info":
+            connection.send({"id": header["id"], "ok": True, "engine_name": self._engine_name})
+        elif request_type == "attach_ring":
+            self._attach_ring(connection, header)
+        elif request_type == "recognize" and "slot" in header and connection.ring is None:
+            connection.send({"id": header["id"], "ok": False, "error": "No shared memory ring attached."})
+        elif request_type == "recognize":
+            request_id = header["id"]
+            dtype = np.dtype(header["dtype"])
+            if dtype.kind not in IMAGE_DTYPE_KINDS:
+                raise ValueError(f"Unsupported image {dtype=}")
+            shape = tuple(int(size) for size in header["shape"])
+            if "slot" in header:
+                image = connection.ring.view(header["slot"], shape, dtype)
+            else:
+                image = np.frombuffer(payload, dtype=dtype).reshape(shape)
+            connection.request_queued()
+            self._requests.put(_Request(request_id=request_id, image=image, connection=connection))
+        else:
+            connection.send({"id": header.get("id"), "ok": False, "error": f"Unknown request type {request_type!r}"})
+
+    def _attach_ring(self, connection: _Connection, header: dict) -> None:
+        try:
+            ring = SharedImageRing(int(header["num_slots"]), int(header["slot_size"]), name=str(header["name"]))
+        except OSError as e:
+            # E.g. a client on another host, it falls back to sending images over the socket
+            connection.send({"id": header["id"], "ok": False, "error": f"Can't attach shared memory: {e}"})
+            return
+        if connection.ring is not None:
+            connection.ring.close()
+        connection.ring = ring
+        connection.send({"id": header["id"], "ok": True})
+
+    def _engine_loop(self, engine: OCRInterface) -> None:
+        while not self._stop.is_set():
+            batch = self._next_batch()
+            try:
+                outputs = engine.recognize([request.image for request in batch])
+            except Exception as e:
+                self.logger.error(f"OCR error on a batch of {len(batch)} image(s): {e}")
+                for request in batch:
+                    self._respond(request, {"id": request.request_id, "ok": False, "error": str(e)})
+            else:
+                for request, output in zip(batch, outputs):
+                    self._respond(request, {"id": request.request_id, "ok": True}, output.word_boxes.to_bytes())
+
+            for request in batch:
+                # Drop views into the client's ring, so it can be detached once the client is gone
+                request.image = None
+                request.connection.request_done()
+
+    def _next_batch(self) -> List[_Request]:
+        """Block for one request, then take whatever else is already queued up to max_batch_size."""
+        batch = [self._requests.get()]
+        while len(batch) < self.max_batch_size:
+            try:
+                batch.append(self._requests.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _respond(self, request: _Request, header: dict, payload: bytes = b"") -> None:
+        try:
+            request.connection.send(header, payload)
+        except OSError:
+            self.logger.warning(f"Client disconnected before receiving response {request.request_id}")
@@ -0,0 +1,80 @@
+import json
+import socket
+import struct
+from typing import Tuple
+
+# Frame prefix: header length (uint32) and payload length (uint64), network byte order
+_PREFIX = struct.Struct("!IQ")
+# Largest accepted JSON header and payload, a 100 megapixel BGR page is 300 MB
+MAX_HEADER_BYTES = 64 * 1024
+MAX_PAYLOAD_BYTES = 512 * 1024 * 1024
+
+
+class ProtocolError(ValueError):
+    """A message was received in full, but its header is not a JSON object."""
+
+
+class OversizedMessageError(ConnectionError):
+    """A message announced a header or payload above the limits. It was not read, so the stream can't continue."""
+
+
+def parse_address(address: str) -> Tuple[int, str | Tuple[str, int]]:
+    """
+    Parse a service address: "unix:/path/to/socket" or "host:port" for localhost TCP.
+
+    Returns:
+        Tuple[int, str | Tuple[str, int]]: Socket family and the address in the form expected by socket.
+    """
+    if address.startswith("unix:"):
+        return socket.AF_UNIX, address[len("unix:"):]
+
+    host, _, port = address.rpartition(":")
+    if not host or not port.isdigit():
+        raise ValueError(f"Invalid OCR service {address=}, expected 'unix:/path' or 'host:port'.")
+    return socket.AF_INET, (host, int(port))
+
+
+def send_message(sock: socket.socket, header: dict, payload: bytes | memoryview = b"") -> None:
+    header_bytes = json.dumps(header).encode("utf-8")
+    sock.sendall(_PREFIX.pack(len(header_bytes), len(payload)) + header_bytes)
+    if len(payload):
+        sock.sendall(payload)
+
+
+def recv_message(sock: socket.socket, max_header_bytes: int = MAX_HEADER_BYTES,
+                 max_payload_bytes: int = MAX_PAYLOAD_BYTES) -> Tuple[dict, bytes]:
+    """
+    Receive one message.
+
+    Raises:
+        ProtocolError: If the header is not a JSON object. The message was consumed, the next one can be read.
+        OversizedMessageError: If the header or payload exceeds the limits, before anything is allocated.
+        ConnectionError: If the peer closed the connection.
+    """
+    header_size, payload_size = _PREFIX.unpack(_recv_exact(sock, _PREFIX.size))
+    if header_size > max_header_bytes or payload_size > max_payload_bytes:
+        raise OversizedMessageError(
+            f"Message of {header_size} header and {payload_size} payload bytes exceeds the limits "
+            f"({max_header_bytes}, {max_payload_bytes})."
+        )
+    header_bytes = _recv_exact(sock, header_size)
+    payload = _recv_exact(sock, payload_size) if payload_size else b""
+    try:
+        header = json.loads(header_bytes)
+    except ValueError as e:
+        raise ProtocolError(f"Malformed message header: {e}") from e
+    if not isinstance(header, dict):
+        raise ProtocolError(f"Message header must be a JSON object, got {type(header).__name__}.")
+    return header, payload
+
+
+def _recv_exact(sock: socket.socket, size: int) -> bytes:
+    buffer = bytearray(size)
+    view = memoryview(buffer)
+    received = 0
+    while received < size:
+        chunk_size = sock.recv_into(view[received:], size - received)
+        if chunk_size == 0:
+            raise ConnectionError("OCR service connection closed.")
+        received += chunk_size
+    return bytes(buffer)
@@ -1,13 +1,47 @@
-from typing import List
+import json
+import re
+import threading
+from collections import OrderedDict
+from typing import List, Tuple
 
 import numpy as np
 
+from docs2dataset.utils.metrics import stage_metrics
+
 from .image_processor_interface import ImageProcessorInterface
 
+# Number of image shapes (with dtypes) the pipeline keeps scratch buffers for, per thread
+MAX_SCRATCH_SHAPES = 4
+# Reprs that don't identify a value: the default object repr (e.g. "<Foo object at 0x7f...>"), which changes
+# from run to run, and summarized arrays ("[0, 1, 2, ..., 7, 8, 9]"), which hide the elements that differ
+UNSTABLE_REPR_PATTERN = re.compile(r" at 0x[0-9a-fA-F]+|\.\.\.")
+
 
 class ImageProcessingPipeline:
-    def __init__(self, processors: List[ImageProcessorInterface]):
+    """
+    Applies a chain of image processors.
+
+    Adjacent processors that declare they can be fused (see ImageProcessorInterface.fuse) are combined
+    once, when the pipeline is created. Intermediate results are written into two scratch buffers per
+    image shape that are reused across images, so processors implementing process_into don't allocate
+    per image. The final result is always a new array, so callers may keep it.
+    """
+
+    def __init__(self, processors: List[ImageProcessorInterface], config: List[dict] | None = None):
         self._processors = processors
+        self.config = config
+        self._stages = self._fuse(processors)
+        self._local = threading.local()
+
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        # Scratch buffers are per thread and not worth sending to worker processes
+        del state["_local"]
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self._local = threading.local()
 
     @classmethod
     def from_config(cls, config: List[dict]) -> 'ImageProcessingPipeline':
@@ -20,9 +54,93 @@ class ImageProcessingPipeline:
             for processor in config
         ]
 
-        return cls(processors=processors)
+        return cls(processors=processors, config=config)
 
     def run(self, image: np.ndarray) -> np.ndarray:
-        for processor in self._processors:
-            image = processor.process(image=image)
+        last = len(self._stages) - 1
+        for i, processor in enumerate(self._stages):
+            # The last stage gets no scratch buffer, its result leaves the pipeline
+            out = self._scratch(image) if i < last else None
+            with stage_metrics.timed(f"preprocess.{type(processor).__name__}"):
+                image = processor.process_into(image, out)
+        if last > 0 and self._in_scratch(image):
+            # E.g. the last processor returned its input unchanged
+            image = image.copy()
         return image
+
+    def run_batch(self, images: List[np.ndarray]) -> List[np.ndarray]:
+        """
+        Apply the pipeline to several images, stage by stage, so processors can vectorize over the batch
+        (see ImageProcessorInterface.process_batch).
+        """
+        for processor in self._stages:
+            with stage_metrics.timed(f"preprocess.{type(processor).__name__}"):
+                images = processor.process_batch(images)
+        return images
+
+    def fingerprint(self) -> str | None:
+        """
+        Canonical description of the pipeline, stable across runs for the same configuration.
+        None if a processor can't be described, see processor_fingerprint.
+        """
+        if self.config is not None:
+            return json.dumps(self.config, sort_keys=True, default=str)
+        fingerprints = [processor_fingerprint(processor) for processor in self._processors]
+        if None in fingerprints:
+            return None
+        return json.dumps(fingerprints)
+
+    @staticmethod
+    def _fuse(processors: List[ImageProcessorInterface]) -> List[ImageProcessorInterface]:
+        stages: List[ImageProcessorInterface] = []
+        for processor in processors:
+            fused = stages[-1].fuse(processor) if stages else None
+            if fused is not None:
+                stages[-1] = fused
+            else:
+                stages.append(processor)
+        return stages
+
+    def _scratch(self, image: np.ndarray) -> np.ndarray:
+        """A scratch buffer with the shape and dtype of image that is not image itself."""
+        buffers: "OrderedDict[Tuple, List[np.ndarray]] | None" = getattr(self._local, "buffers", None)
+        if buffers is None:
+            buffers = self._local.buffers = OrderedDict()
+
+        key = (image.shape, image.dtype.str)
+        pair = buffers.get(key)
+        if pair is None:
+            pair = buffers[key] = [np.empty_like(image), np.empty_like(image)]
+            if len(buffers) > MAX_SCRATCH_SHAPES:
+                buffers.popitem(last=False)
+        buffers.move_to_end(key)
+        return pair[1] if np.may_share_memory(pair[0], image) else pair[0]
+
+    def _in_scratch(self, image: np.ndarray) -> bool:
+        buffers = getattr(self._local, "buffers", {})
+        return any(np.may_share_memory(image, buffer) for pair in buffers.values() for buffer in pair)
+
+
+def processor_fingerprint(image_processor) -> str | None:
+    """
+    Describe an image processor (or pipeline) so results produced with it can be cached.
+
+    Pipelines built from a config are described by that config. Other processors are described by their
+    class and attributes, which is only stable if the attributes have a deterministic repr.
+
+    Returns:
+        str | None: The description, None if the processor has no attribute dict (__slots__) or an attribute
+        has a repr that doesn't identify it (see UNSTABLE_REPR_PATTERN), so its results can't be cached.
+    """
+    if image_processor is None:
+        return "none"
+    if isinstance(image_processor, ImageProcessingPipeline):
+        return image_processor.fingerprint()
+
+    cls = type(image_processor)
+    if not hasattr(image_processor, "__dict__"):
+        return None
+    attributes = sorted((k, repr(v)) for k, v in vars(image_processor).items())
+    if any(UNSTABLE_REPR_PATTERN.search(value) for _, value in attributes):
+        return None
+    return f"{cls.__module__}.{cls.__qualname__}:{attributes}"
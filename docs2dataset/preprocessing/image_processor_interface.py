@@ -1,5 +1,5 @@
 import abc
-from typing import Dict, Callable
+from typing import Dict, Callable, List
 
 import numpy as np
 
@@ -23,3 +23,38 @@ class ImageProcessorInterface(abc.ABC):
     @abc.abstractmethod
     def process(self, image: np.ndarray) -> np.ndarray:
         raise NotImplementedError('Method should be implemented in child class!')
+
+    def process_into(self, image: np.ndarray, out: np.ndarray | None) -> np.ndarray:
+        """
+        Process an image, writing the result into a preallocated buffer if possible.
+
+        Override to avoid allocating a new array per image, e.g. with the dst/out arguments of OpenCV
+        and NumPy functions. The default calls process.
+
+        Args:
+            image (np.ndarray): Input image, must not be modified.
+            out (np.ndarray | None): Scratch buffer owned by the pipeline, with the shape and dtype of image.
+                May only be used if the result has the same shape and dtype. None if a new array is required.
+
+        Returns:
+            np.ndarray: out holding the result, or a new array.
+        """
+        return self.process(image=image)
+
+    def process_batch(self, images: List[np.ndarray]) -> List[np.ndarray]:
+        """
+        Process several images at once. Override to vectorize over a batch, e.g. np.stack of same-size
+        pages. The default processes the images one by one.
+        """
+        return [self.process(image=image) for image in images]
+
+    def fuse(self, next_processor: 'ImageProcessorInterface') -> 'ImageProcessorInterface | None':
+        """
+        Declare that this processor can be combined with the processor that follows it in a pipeline,
+        e.g. to apply both in one pass over the image.
+
+        Returns:
+            ImageProcessorInterface | None: A processor equivalent to this one followed by next_processor,
+                or None if they can't be fused.
+        """
+        return None
@@ -1,5 +1,11 @@
 from .file_info import FileInfo
-from .file_utils import is_image_file, create_directory
+from .page_task import PageTask, PageResult
+from .file_utils import is_image_file, create_directory, file_content_hash
+from .cpu_utils import bind_to_cores, limit_threads, usable_cpu_count
 from .logging_utils import setup_logger
-from .params_utils import save_run_params
+from .params_utils import collect_run_params, load_run_params, save_run_params
+from .text_quality import text_layer_quality
 
+from .sampling import reservoir_sample, stratified_sample
+from .shared_memory_ring import SharedImageRing
+from .tiff_reader import TiffIndex, map_tiff_frame, open_tiff_frame, tiff_index
@@ -0,0 +1,109 @@
+import math
+import os
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, List
+
+import cv2
+
+CGROUP_ROOT = Path("/sys/fs/cgroup")
+# Environment variables set by limit_threads
+THREAD_LIMIT_VARIABLES = ("OMP_THREAD_LIMIT", "OMP_NUM_THREADS")
+
+
+def usable_cpu_count() -> int:
+    """
+    Number of CPUs this process may actually use: the CPU affinity mask, further limited by a cgroup CPU quota
+    (e.g. docker --cpus or a Kubernetes CPU limit), which os.cpu_count() ignores.
+    """
+    if hasattr(os, "sched_getaffinity"):
+        num_cpus = len(os.sched_getaffinity(0))
+    else:
+        num_cpus = os.cpu_count() or 1
+    quota = cgroup_cpu_quota()
+    if quota is not None:
+        num_cpus = min(num_cpus, math.ceil(quota))
+    return max(num_cpus, 1)
+
+
+def cgroup_cpu_quota() -> float | None:
+    """
+    CPU quota of the cgroup of this process in CPUs (cgroup v2 cpu.max or v1 cpu.cfs_quota_us), None if unlimited.
+    """
+    try:
+        cgroup_lines = Path("/proc/self/cgroup").read_text().splitlines()
+    except OSError:
+        return None
+
+    for line in cgroup_lines:
+        _, controllers, path = line.split(":", 2)
+        path = path.lstrip("/")
+        if controllers == "":
+            # cgroup v2: "<quota> <period>" or "max <period>"
+            for directory in (CGROUP_ROOT / path, CGROUP_ROOT):
+                values = _read_values(directory / "cpu.max")
+                if values is not None:
+                    return None if values[0] == "max" else int(values[0]) / int(values[1])
+        elif "cpu" in controllers.split(","):
+            for mount in ("cpu", "cpu,cpuacct", "cpuacct,cpu"):
+                for directory in (CGROUP_ROOT / mount / path, CGROUP_ROOT / mount):
+                    quota, period = _read_values(directory / "cpu.cfs_quota_us"), \
+                        _read_values(directory / "cpu.cfs_period_us")
+                    if quota is not None and period is not None:
+                        return None if int(quota[0]) <= 0 else int(quota[0]) / int(period[0])
+    return None
+
+
+def limit_threads(num_threads: int, opencv_threads: int | None = None) -> None:
+    """
+    Limit the threads used by OpenMP (Tesseract) and OpenCV in this process and its child processes.
+
+    OMP_THREAD_LIMIT is read by a process when OpenMP starts: it applies to tesseract processes started
+    afterwards (PytesseractOCR), and to libtesseract (TesseractCAPIOCR) if it is loaded afterwards.
+
+    Args:
+        num_threads (int): OpenMP threads.
+        opencv_threads (int | None): OpenCV threads of the whole process, num_threads if None.
+    """
+    for name in THREAD_LIMIT_VARIABLES:
+        os.environ[name] = str(num_threads)
+    cv2.setNumThreads(opencv_threads or num_threads)
+
+
+@contextmanager
+def restored_thread_limits() -> Iterator[None]:
+    """Restore the thread limits of this process (see limit_threads) on exit."""
+    saved_env = {name: os.environ.get(name) for name in THREAD_LIMIT_VARIABLES}
+    saved_opencv_threads = cv2.getNumThreads()
+    try:
+        yield
+    finally:
+        for name, value in saved_env.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+        cv2.setNumThreads(saved_opencv_threads)
+
+
+def bind_to_cores(worker_index: int, num_cores: int) -> List[int] | None:
+    """
+    Pin this process to num_cores of the usable cores, the cores of consecutive workers don't overlap.
+
+    Returns:
+        List[int] | None: The cores, None if CPU affinity is not supported on this platform.
+    """
+    if not hasattr(os, "sched_setaffinity"):
+        return None
+    cores = sorted(os.sched_getaffinity(0))
+    start = worker_index * num_cores % len(cores)
+    worker_cores = [cores[(start + i) % len(cores)] for i in range(min(num_cores, len(cores)))]
+    os.sched_setaffinity(0, worker_cores)
+    return worker_cores
+
+
+def _read_values(path: Path) -> List[str] | None:
+    try:
+        return path.read_text().split()
+    except OSError:
+        return None
@@ -1,3 +1,5 @@
+import hashlib
+from functools import lru_cache
 from pathlib import Path
 
 
@@ -17,3 +19,21 @@ def create_directory(base_path: Path) -> Path:
 
 def is_image_file(file_path: Path) -> bool:
     return file_path.suffix.lower() in [".png", ".jpg", ".jpeg", ".tiff", ".tif", ".bmp", ".gif", ".pdf"]
+
+
+def file_content_hash(file_path: Path) -> str:
+    """
+    Hash the file content. The result is memoized per path, size and modification time,
+    so repeated calls for the pages of one document read the file only once.
+    """
+    stat = file_path.stat()
+    return _file_content_hash(str(file_path), stat.st_size, stat.st_mtime_ns)
+
+
+@lru_cache(maxsize=256)
+def _file_content_hash(file_path: str, size: int, mtime_ns: int) -> str:
+    digest = hashlib.blake2b(digest_size=20)
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
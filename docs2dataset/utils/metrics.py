@@ -0,0 +1,200 @@
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+METRICS_FILE_NAME = "metrics.json"
+
+
+class StageMetrics:
+    """
+    Thread-safe accumulator of stage timings and counters of one process.
+
+    Stages are timed wherever they run (prefetch, OCR or writer thread). The accumulated values are
+    shipped to the main process as deltas attached to page results (see drain) and aggregated there
+    by RunMetrics. A worker process forked with non-empty values starts from scratch.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        self._stages: Dict[str, list] = {}
+        self._counters = Counter()
+        self._suspended = False
+
+    @contextmanager
+    def timed(self, stage: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(stage, time.perf_counter() - start)
+
+    @contextmanager
+    def suspended(self) -> Iterator[None]:
+        """Drop the timings and counters recorded in this process meanwhile (and in processes forked meanwhile)."""
+        self._suspended = True
+        try:
+            yield
+        finally:
+            self._suspended = False
+
+    def add_time(self, stage: str, seconds: float) -> None:
+        if self._suspended:
+            return
+        with self._lock:
+            self._check_pid()
+            totals = self._stages.setdefault(stage, [0, 0.0, 0.0])
+            totals[0] += 1
+            totals[1] += seconds
+            totals[2] = max(totals[2], seconds)
+
+    def count(self, name: str, value: int = 1) -> None:
+        if self._suspended:
+            return
+        with self._lock:
+            self._check_pid()
+            self._counters[name] += value
+
+    def drain(self, pages: int = 0) -> dict:
+        """
+        Args:
+            pages (int): Number of pages this process completed since the last drain.
+
+        Returns:
+            dict: Stage timings and counters accumulated since the last drain, and the current resource
+            usage of this process.
+        """
+        with self._lock:
+            self._check_pid()
+            stages, counters = self._stages, dict(self._counters)
+            self._stages, self._counters = {}, Counter()
+        return {"pid": self._pid, "pages": pages, "stages": stages, "counters": counters, **process_usage()}
+
+    def _check_pid(self) -> None:
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._stages, self._counters = {}, Counter()
+
+
+# Per-process accumulator used by all stages
+stage_metrics = StageMetrics()
+
+
+def process_usage() -> dict:
+    """
+    Returns:
+        dict: Peak resident set size in MB and bytes read by this process (Linux only), None if unknown.
+    """
+    peak_rss_mb = None
+    if resource is not None:
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Kilobytes on Linux, bytes on macOS
+        peak_rss_mb = max_rss / (1024 * 1024) if sys.platform == "darwin" else max_rss / 1024
+
+    read_bytes = None
+    try:
+        with open("/proc/self/io", encoding="ascii") as f:
+            io_stats = dict(line.split(": ") for line in f.read().splitlines())
+        read_bytes = int(io_stats["rchar"])
+    except (OSError, KeyError, ValueError):
+        pass
+
+    return {"peak_rss_mb": peak_rss_mb, "read_bytes": read_bytes}
+
+
+class RunMetrics:
+    """
+    Aggregates the stage metrics of all processes of a run and reports progress.
+    """
+
+    def __init__(self):
+        self.start_time = time.time()
+        self.pages_done = 0
+        self.pages_queued = 0
+        self.queueing_done = False
+        # Page event counters (e.g. OCR cache hits) and counters of the stages
+        self.counters = Counter()
+        self._stages: Dict[str, list] = {}
+        self._workers: Dict[int, dict] = {}
+
+    def page_done(self) -> None:
+        self.pages_done += 1
+
+    def add(self, snapshot: dict) -> None:
+        """
+        Merge a snapshot produced by StageMetrics.drain.
+
+        Args:
+            snapshot (dict): Snapshot to merge.
+        """
+        for stage, (count, total, longest) in snapshot["stages"].items():
+            totals = self._stages.setdefault(stage, [0, 0.0, 0.0])
+            totals[0] += count
+            totals[1] += total
+            totals[2] = max(totals[2], longest)
+        self.counters.update(snapshot["counters"])
+
+        worker = self._workers.setdefault(snapshot["pid"], {"pages": 0, "peak_rss_mb": None, "read_bytes": None})
+        worker["pages"] += snapshot["pages"]
+        for key in ("peak_rss_mb", "read_bytes"):
+            if snapshot.get(key) is not None:
+                worker[key] = max(worker[key] or 0, snapshot[key])
+
+    def progress_line(self) -> str:
+        elapsed = time.time() - self.start_time
+        rate = self.pages_done / elapsed if elapsed > 0 else 0.0
+        line = f"Pages: {self.pages_done} done, {rate:.2f} pages/s"
+
+        remaining = self.pages_queued - self.pages_done
+        if rate > 0 and remaining >= 0:
+            # Pages are queued while documents are listed, until then the ETA is a lower bound
+            eta = _format_duration(remaining / rate)
+            if self.queueing_done:
+                line += f", ETA {eta}"
+            else:
+                line += f", ETA >= {eta} ({self.pages_queued} pages listed so far)"
+        return line
+
+    def to_dict(self) -> dict:
+        elapsed = time.time() - self.start_time
+        return {
+            "elapsed_sec": round(elapsed, 3),
+            "pages": self.pages_done,
+            "pages_per_sec": round(self.pages_done / elapsed, 3) if elapsed > 0 else None,
+            "stages": {
+                stage: {
+                    "count": count,
+                    "total_sec": round(total, 3),
+                    "mean_ms": round(total / count * 1000, 3) if count else None,
+                    "max_ms": round(longest * 1000, 3)
+                }
+                for stage, (count, total, longest) in sorted(self._stages.items())
+            },
+            "counters": dict(sorted(self.counters.items())),
+            "workers": {str(pid): worker for pid, worker in sorted(self._workers.items())}
+        }
+
+    def save(self, output_path: Path) -> Path:
+        """Write the aggregated metrics to metrics.json in output_path."""
+        metrics_path = Path(output_path) / METRICS_FILE_NAME
+        with open(metrics_path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, indent=4)
+        return metrics_path
+
+
+def _format_duration(seconds: float) -> str:
+    seconds = int(seconds)
+    hours, rest = divmod(seconds, 3600)
+    minutes, seconds = divmod(rest, 60)
+    return f"{hours}h{minutes:02d}m{seconds:02d}s" if hours else f"{minutes}m{seconds:02d}s"
@@ -0,0 +1,139 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Set, Tuple
+
+import cv2
+import numpy as np
+
+# Long side of the thumbnail used for the ink statistics
+THUMBNAIL_SIZE = 256
+# A pixel is ink if it is darker than the paper (median brightness) by more than this
+INK_CONTRAST = 48
+
+
+def to_gray_thumbnail(image_np: np.ndarray, size: int = THUMBNAIL_SIZE) -> np.ndarray:
+    """Downscale a BGR or grayscale page so its long side is at most size, as grayscale."""
+    if image_np.ndim == 3:
+        image_np = cv2.cvtColor(image_np, cv2.COLOR_BGRA2GRAY if image_np.shape[2] == 4 else cv2.COLOR_BGR2GRAY)
+    height, width = image_np.shape
+    scale = size / max(height, width)
+    if scale < 1:
+        image_np = cv2.resize(image_np, (max(1, round(width * scale)), max(1, round(height * scale))),
+                              interpolation=cv2.INTER_AREA)
+    return image_np
+
+
+def ink_ratio(thumbnail: np.ndarray) -> float:
+    """
+    Share of ink pixels of a grayscale thumbnail. Measured against the paper brightness rather than
+    a fixed level, so tinted paper and scanner noise don't count as ink.
+
+    Args:
+        thumbnail (np.ndarray): Grayscale page thumbnail, see to_gray_thumbnail.
+
+    Returns:
+        float: Ink pixel share in the range 0...1.
+    """
+    paper = np.median(thumbnail)
+    return float(np.count_nonzero(thumbnail < paper - INK_CONTRAST)) / thumbnail.size
+
+
+def average_hash(thumbnail: np.ndarray, hash_size: int = 16) -> int:
+    """
+    Perceptual hash of a grayscale thumbnail: which cells of a hash_size x hash_size grid are brighter
+    than the median cell, as a hash_size ** 2 bit integer.
+
+    Cells average the ink of several text lines, so the hash follows the page layout and is stable under
+    scanner noise, small shifts and recompression. Gradient-based hashes (dHash) flip many bits on the
+    near-uniform areas of text pages.
+    """
+    small = cv2.resize(thumbnail, (hash_size, hash_size), interpolation=cv2.INTER_AREA)
+    bits = (small > np.median(small)).ravel()
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+class NearDuplicateIndex:
+    """
+    In-memory index of page hashes for finding pages within max_distance differing bits.
+
+    The hash is split into max_distance + 1 bands. Two hashes within max_distance bits agree on at
+    least one band, so only pages sharing a band bucket with the query are compared. The oldest
+    pages are evicted beyond max_entries, or once the sizes given to add exceed max_value_bytes.
+    The index may be shared by threads.
+    """
+
+    def __init__(self, hash_bits: int = 256, max_distance: int = 8, max_entries: int = 100_000,
+                 max_value_bytes: int | None = None):
+        self.max_distance = max_distance
+        self.max_entries = max_entries
+        self.max_value_bytes = max_value_bytes
+        num_bands = max_distance + 1
+        band_bits = -(-hash_bits // num_bands)
+        self._bands = [(i * band_bits, (1 << band_bits) - 1) for i in range(num_bands)]
+        self._entries: "OrderedDict[int, Tuple[int, Any, int]]" = OrderedDict()
+        self._value_bytes = 0
+        self._buckets: Dict[Tuple[int, int], Set[int]] = {}
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def find(self, page_hash: int) -> Any | None:
+        """
+        Returns:
+            Any | None: Value of the closest indexed page within max_distance bits, None if there is none.
+        """
+        with self._lock:
+            candidates = set()
+            for key in self._band_keys(page_hash):
+                candidates.update(self._buckets.get(key, ()))
+            entries = [self._entries[entry_id] for entry_id in candidates]
+
+        best, best_distance = None, self.max_distance + 1
+        for other_hash, value, _ in entries:
+            distance = (page_hash ^ other_hash).bit_count()
+            if distance < best_distance:
+                best, best_distance = value, distance
+        return best
+
+    def add(self, page_hash: int, value: Any, size: int = 0) -> None:
+        """
+        Args:
+            page_hash (int): Hash of the page, see average_hash.
+            value (Any): Value returned by find for this page.
+            size (int): Approximate size of value in bytes, counted against max_value_bytes.
+        """
+        with self._lock:
+            self._add(page_hash, value, size)
+
+    def _add(self, page_hash: int, value: Any, size: int) -> None:
+        entry_id = self._next_id
+        self._next_id += 1
+        self._entries[entry_id] = (page_hash, value, size)
+        self._value_bytes += size
+        for key in self._band_keys(page_hash):
+            self._buckets.setdefault(key, set()).add(entry_id)
+
+        while len(self._entries) > self.max_entries or (
+                self.max_value_bytes is not None and self._value_bytes > self.max_value_bytes
+                and len(self._entries) > 1):
+            old_id, (old_hash, _, old_size) = self._entries.popitem(last=False)
+            self._value_bytes -= old_size
+            for key in self._band_keys(old_hash):
+                bucket = self._buckets[key]
+                bucket.discard(old_id)
+                if not bucket:
+                    del self._buckets[key]
+
+    def _band_keys(self, page_hash: int) -> list:
+        return [(i, (page_hash >> shift) & mask) for i, (shift, mask) in enumerate(self._bands)]
@@ -0,0 +1,24 @@
+from dataclasses import dataclass, field
+from concurrent.futures import Future
+from typing import Dict
+
+from docs2dataset.ocr.ocr_interface import WordBoxes
+from docs2dataset.utils.file_info import FileInfo
+
+
+@dataclass
+class PageTask:
+    file_info: FileInfo
+    page_num: int
+
+
+@dataclass
+class PageResult:
+    page_task: PageTask
+    row: dict | None  # None if the page could not be processed
+    counters: Dict[str, int] = field(default_factory=dict)
+    word_boxes: WordBoxes | None = None  # Set for pages recognized by OCR
+    metrics: dict | None = None  # Stage metrics of a worker process, see StageMetrics.drain
+    # Encoded processed image for image shards, a Future while it is encoded in the page pipeline
+    image_data: bytes | Future | None = None
+    image_suffix: str = ".jpg"
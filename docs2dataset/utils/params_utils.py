@@ -1,38 +1,118 @@
 import json
 import logging
 import os
+from pathlib import Path
 from typing import Any
 
-def save_run_params(obj: Any) -> None:
+PARAMS_FILE_NAME = "used_args.json"
+
+
+def collect_run_params(obj: Any) -> dict:
     """
-    Inspect an object (e.g., DataHandler) and save relevant constructor parameters to JSON.
+    Inspect an object (e.g., DataHandler) and collect relevant constructor parameters.
 
     The object is expected to have attributes that match the parameters we care about:
     e.g., input_path, output_path, csv_name, target_pages, ...
 
     Args:
         obj (Any): The pipeline or handler object with relevant attributes.
+
+    Returns:
+        dict: JSON-serializable parameters.
     """
     # We can decide which attributes to store.
     # For demonstration, let's store all public attributes that are basic types.
-    pipeline_params = {
+    return {
         "input_path": str(getattr(obj, "input_path", "")),
         "output_path": str(getattr(obj, "output_path", "")),
+        "max_docs_per_class": getattr(obj, "max_docs_per_class", None),
         "csv_name": getattr(obj, "csv_name", ""),
+        "output_format": getattr(obj, "output_format", ""),
         "target_pages": getattr(obj, "target_pages", None),
         "dpi": getattr(obj, "dpi", ""),
         "ocr_lang": getattr(obj, "ocr_lang", ""),
         "do_ocr": getattr(obj, "do_ocr", ""),
+        "text_layer_first": getattr(obj, "text_layer_first", ""),
+        "text_layer_min_quality": getattr(obj, "text_layer_min_quality", ""),
         "save_processed_img": getattr(obj, "save_processed_img", ""),
+        "image_output": getattr(obj, "image_output", "files"),
+        "image_shard_size_mb": getattr(obj, "image_shard_size_mb", ""),
+        "image_format": getattr(obj, "image_format", "jpeg"),
+        "image_encoder": type(getattr(obj, "image_encoder", None)).__name__,
+        "save_word_boxes": getattr(obj, "save_word_boxes", ""),
         "megapixel": getattr(obj, "megapixel", ""),
+        "color_mode": getattr(obj, "color_mode", "bgr"),
+        "resampling": getattr(obj, "resampling", "lanczos"),
+        "skip_blank_pages": getattr(obj, "skip_blank_pages", False),
+        "blank_max_ink_ratio": getattr(obj, "blank_max_ink_ratio", ""),
+        "near_duplicates": getattr(obj, "near_duplicates", None),
+        "duplicate_max_distance": getattr(obj, "duplicate_max_distance", ""),
         "size_threshold_mb": getattr(obj, "size_threshold_mb", ""),
         "num_workers": getattr(obj, "num_workers", ""),
+        "executor": getattr(obj, "executor", ""),
+        "threads_per_worker": getattr(obj, "threads_per_worker", None),
+        "bind_workers": getattr(obj, "bind_workers", False),
+        "usable_cpus": getattr(obj, "usable_cpus", None),
+        "calibration_pages": getattr(obj, "calibration_pages", ""),
+        "calibration": getattr(obj, "calibration", None),
         "batch_size_per_worker": getattr(obj, "batch_size_per_worker", ""),
+        "write_chunk_size": getattr(obj, "write_chunk_size", ""),
+        "pages_per_task": getattr(obj, "pages_per_task", ""),
+        "prefetch_pages": getattr(obj, "prefetch_pages", ""),
+        "write_queue_size": getattr(obj, "write_queue_size", ""),
         "smart_shuffle": getattr(obj, "smart_shuffle", ""),
+        "file_index_path": _optional_str(getattr(obj, "file_index_path", None)),
+        "scan_threads": getattr(obj, "scan_threads", ""),
+        "num_shards": getattr(obj, "num_shards", 1),
+        "shard_id": getattr(obj, "shard_id", 0),
+        "lease_work": getattr(obj, "lease_work", False),
+        "lease_timeout_sec": getattr(obj, "lease_timeout_sec", ""),
+        "node_id": getattr(obj, "node_id", None),
+        "progress_interval_sec": getattr(obj, "progress_interval_sec", ""),
+        "seed": getattr(obj, "seed", None),
         "logging_level": getattr(obj, "logging_level", ""),
         "ocr_engine": getattr(obj.ocr_engine, "engine_name", str(obj.ocr_engine)),
+        "ocr_cache_dir": _optional_str(getattr(obj, "ocr_cache_dir", None)),
+        "ocr_cache_max_size_mb": getattr(obj, "ocr_cache_max_size_mb", ""),
+        "image_cache_dir": _optional_str(getattr(obj, "image_cache_dir", None)),
+        "image_cache_max_size_mb": getattr(obj, "image_cache_max_size_mb", ""),
     }
-    params_path = os.path.join(str(obj.output_path), "used_args.json")
+
+
+def save_run_params(obj: Any) -> None:
+    """
+    Save the parameters collected by collect_run_params to used_args.json in the object's output_path.
+
+    Args:
+        obj (Any): The pipeline or handler object with relevant attributes.
+    """
+    pipeline_params = collect_run_params(obj)
+    params_path = os.path.join(str(obj.output_path), PARAMS_FILE_NAME)
+    # Serialized before the file is opened, so a parameter that can't be serialized leaves the previous file intact
+    text = json.dumps(pipeline_params, indent=4, ensure_ascii=False)
     with open(params_path, "w", encoding="utf-8") as f:
-        json.dump(pipeline_params, f, indent=4, ensure_ascii=False)
+        f.write(text)
     logging.info(f"Pipeline parameters saved to {params_path}.")
+
+
+def _optional_str(value: Any) -> str | None:
+    # Paths may be given as str or Path
+    return str(value) if value is not None else None
+
+
+def load_run_params(output_path: Path) -> dict | None:
+    """
+    Load the parameters saved by save_run_params.
+
+    Args:
+        output_path (Path): Output directory of a run.
+
+    Returns:
+        dict | None: Saved parameters or None if the directory has no readable parameters file.
+    """
+    params_path = Path(output_path) / PARAMS_FILE_NAME
+    try:
+        with open(params_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
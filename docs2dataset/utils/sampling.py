@@ -0,0 +1,145 @@
+import math
+from random import Random
+from typing import Dict, Generic, Hashable, Iterable, List, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+class ReservoirSampler(Generic[T]):
+    """
+    Uniform sample of at most k items from a stream of unknown length (Li's Algorithm L).
+    Memory is proportional to k and the random generator is only called when an item is kept.
+    """
+
+    def __init__(self, k: int, rng: Random):
+        self.k = k
+        self.rng = rng
+        self.seen = 0
+        self._reservoir: List[T] = []
+        self._w = 1.0
+        self._next = 0
+
+    def add(self, item: T) -> None:
+        """
+        Args:
+            item (T): Next item of the stream.
+        """
+        index = self.seen
+        self.seen += 1
+        if self.k <= 0:
+            return
+
+        if index < self.k:
+            self._reservoir.append(item)
+            if index == self.k - 1:
+                self._w = math.exp(math.log(self._random()) / self.k)
+                self._next = self._skip_from(index)
+        elif index == self._next:
+            self._reservoir[self.rng.randrange(self.k)] = item
+            self._w *= math.exp(math.log(self._random()) / self.k)
+            self._next = self._skip_from(index)
+
+    def sample(self) -> List[T]:
+        """
+        Returns:
+            List[T]: The sampled items in random order.
+        """
+        sample = list(self._reservoir)
+        self.rng.shuffle(sample)
+        return sample
+
+    def _random(self) -> float:
+        # log(0) is undefined, random() may return exactly 0.0
+        return self.rng.random() or 1e-300
+
+    def _skip_from(self, index: int) -> int:
+        return index + int(math.log(self._random()) / math.log1p(-self._w)) + 1 if self._w < 1.0 else index + 1
+
+
+def reservoir_sample(items: Iterable[T], k: int, rng: Random) -> List[T]:
+    """
+    Sample at most k items uniformly from an iterable without materializing it.
+
+    Args:
+        items (Iterable[T]): Items to sample from.
+        k (int): Sample size.
+        rng (Random): Random generator, seeded for reproducible samples.
+
+    Returns:
+        List[T]: Sampled items in random order.
+    """
+    sampler = ReservoirSampler(k, rng)
+    for item in items:
+        sampler.add(item)
+    return sampler.sample()
+
+
+def stratified_sample(
+    items: Iterable[Tuple[T, Hashable]],
+    k: int,
+    rng: Random,
+    counts: Dict[Hashable, int] | None = None
+) -> List[T]:
+    """
+    Sample at most k items spread as evenly as possible across strata: every stratum gets an equal
+    share, and the share of strata with fewer items is redistributed among the larger ones. Items are
+    drawn uniformly within each stratum from a reservoir, in one pass over the items.
+
+    Reservoirs hold up to k items, so memory is proportional to k times the number of strata. With
+    expected counts per stratum (e.g. from a previous listing), the reservoirs of the counted strata
+    only hold their expected share, so memory is proportional to k plus k per uncounted stratum.
+
+    Args:
+        items (Iterable[Tuple[T, Hashable]]): (item, stratum) pairs.
+        k (int): Sample size.
+        rng (Random): Random generator, seeded for reproducible samples.
+        counts (Dict[Hashable, int] | None): Expected number of items per stratum, or None.
+
+    Returns:
+        List[T]: Sampled items in random order.
+    """
+    capacities = allocate_evenly(counts, k) if counts is not None else {}
+    samplers: Dict[Hashable, ReservoirSampler[T]] = {}
+    for item, stratum in items:
+        sampler = samplers.get(stratum)
+        if sampler is None:
+            sampler = samplers[stratum] = ReservoirSampler(capacities.get(stratum, k), rng)
+        sampler.add(item)
+
+    # Shares of the strata as listed, limited to what their reservoirs kept if the counts were off
+    allocation = allocate_evenly({stratum: min(sampler.seen, sampler.k) for stratum, sampler in samplers.items()}, k)
+
+    sample = []
+    for stratum, sampler in samplers.items():
+        sample.extend(sampler.sample()[: allocation[stratum]])
+    rng.shuffle(sample)
+    return sample
+
+
+def allocate_evenly(counts: Dict[Hashable, int], k: int) -> Dict[Hashable, int]:
+    """
+    Split k picks across groups of the given sizes, as evenly as the group sizes allow.
+
+    Args:
+        counts (Dict[Hashable, int]): Number of available items per group.
+        k (int): Number of picks.
+
+    Returns:
+        Dict[Hashable, int]: Number of picks per group, never more than the group size.
+    """
+    allocation = {group: 0 for group in counts}
+    remaining = k
+    open_groups = [group for group, count in counts.items() if count > 0]
+
+    while remaining > 0 and open_groups:
+        share = max(1, remaining // len(open_groups))
+        for group in list(open_groups):
+            take = min(share, counts[group] - allocation[group], remaining)
+            allocation[group] += take
+            remaining -= take
+            if allocation[group] == counts[group]:
+                open_groups.remove(group)
+            if remaining == 0:
+                break
+
+    return allocation
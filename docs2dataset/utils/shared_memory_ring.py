@@ -0,0 +1,97 @@
+import math
+import threading
+from multiprocessing import shared_memory
+from typing import Tuple
+
+import numpy as np
+
+
+class SharedImageRing:
+    """
+    Fixed set of reusable, page-sized slots in one shared memory segment, for handing images to another
+    process on the same host without pickling or socket copies.
+
+    The owner writes an image into a free slot and sends only the small header returned by write
+    (slot, shape, dtype). The peer attaches to the segment by name once and wraps slots as ndarrays
+    without copying. The owner releases a slot once the peer is done with it, e.g. when its response
+    arrives, so the peer may keep the view until then.
+    """
+
+    def __init__(self, num_slots: int, slot_size: int, name: str | None = None):
+        """
+        Create a ring, or attach to the ring of another process if name is given.
+
+        Args:
+            num_slots (int): Number of slots.
+            slot_size (int): Size of a slot in bytes.
+            name (str): Name of an existing segment to attach to.
+        """
+        self.num_slots = num_slots
+        self.slot_size = slot_size
+        self.owner = name is None
+        if self.owner:
+            self._shm = shared_memory.SharedMemory(create=True, size=num_slots * slot_size)
+        else:
+            self._shm = _attach(name)
+            if num_slots < 0 or slot_size < 0 or num_slots * slot_size > self._shm.size:
+                self._shm.close()
+                raise ValueError(
+                    f"{num_slots} slots of {slot_size} bytes don't fit the {self._shm.size} byte segment {name}."
+                )
+        self._lock = threading.Lock()
+        self._free = list(range(num_slots))
+
+    @property
+    def name(self) -> str:
+        return self._shm.name
+
+    def try_write(self, image: np.ndarray) -> dict | None:
+        """
+        Copy an image into a free slot.
+
+        Returns:
+            dict | None: Header identifying the image in the ring ("slot", "shape", "dtype"), or None if
+                all slots are taken or the image does not fit a slot.
+        """
+        if image.nbytes > self.slot_size:
+            return None
+        with self._lock:
+            if not self._free:
+                return None
+            slot = self._free.pop()
+        np.copyto(self.view(slot, image.shape, image.dtype), image, casting="no")
+        return {"slot": slot, "shape": image.shape, "dtype": image.dtype.str}
+
+    def view(self, slot: int, shape: Tuple[int, ...], dtype: np.dtype | str) -> np.ndarray:
+        """
+        Wrap a slot as an ndarray, without copying.
+
+        Raises:
+            ValueError: If the slot doesn't exist or the image doesn't fit into it, e.g. for a corrupt header.
+        """
+        if not isinstance(slot, int) or not 0 <= slot < self.num_slots:
+            raise ValueError(f"Invalid {slot=}, the ring has {self.num_slots} slots.")
+        dtype = np.dtype(dtype)
+        if any(size < 0 for size in shape) or math.prod(shape) * dtype.itemsize > self.slot_size:
+            raise ValueError(f"An image of {shape=} and {dtype=} doesn't fit a slot of {self.slot_size} bytes.")
+        return np.ndarray(shape=shape, dtype=dtype, buffer=self._shm.buf, offset=slot * self.slot_size)
+
+    def release(self, slot: int) -> None:
+        with self._lock:
+            self._free.append(slot)
+
+    def close(self) -> None:
+        """Detach from the segment and, in the owner process, remove it. All views must be dropped first."""
+        self._shm.close()
+        if self.owner:
+            self._shm.unlink()
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python < 3.13 registers the segment with the resource tracker of this process as well, which removes
+        # its name when this process exits. Unregistering would break owners sharing the tracker (same process
+        # tree), and a removed name only keeps new peers from attaching, they fall back to copying
+        return shared_memory.SharedMemory(name=name)
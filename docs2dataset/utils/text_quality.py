@@ -0,0 +1,43 @@
+import re
+
+# Latin and Cyrillic vowels; a token without any of them rarely is a real word
+_VOWELS = set("aeiouyAEIOUYаеёиоуыэюяАЕЁИОУЫЭЮЯ")
+_WORD_PATTERN = re.compile(r"\w+")
+# Numbers, also parts of dates and amounts, optionally with a short unit suffix ("2024г", "10шт")
+_NUMBER_PATTERN = re.compile(r"\d+[^\W\d_]{0,3}")
+
+
+def text_layer_quality(text: str, min_chars: int = 50) -> float:
+    """
+    Score how likely an extracted PDF text layer is usable instead of OCR.
+
+    The score combines the share of printable characters with the share of
+    dictionary-like words (alphabetic tokens of a plausible length that contain a vowel).
+    Numbers are left out of the word share, so invoices and tables don't score lower than prose.
+
+    Args:
+        text (str): Text extracted from the document.
+        min_chars (int): Texts with fewer non-whitespace characters score 0.
+
+    Returns:
+        float: Quality score in the range 0...1.
+    """
+    chars = [c for c in text if not c.isspace()]
+    if len(chars) < min_chars:
+        return 0.0
+
+    printable_ratio = sum(c.isprintable() and c != "�" for c in chars) / len(chars)
+
+    tokens = _WORD_PATTERN.findall(text)
+    if not tokens:
+        return 0.0
+    words = [token for token in tokens if not _NUMBER_PATTERN.fullmatch(token)]
+    if not words:
+        # Only numbers, e.g. a table of figures
+        return printable_ratio
+    word_like = sum(
+        1 for word in words
+        if word.isalpha() and 2 <= len(word) <= 25 and any(c in _VOWELS for c in word)
+    )
+
+    return printable_ratio * (word_like / len(words))
@@ -0,0 +1,253 @@
+import io
+import os
+import struct
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Generator, List, Tuple
+
+import numpy as np
+from PIL import Image
+
+# Parsed TIFF indexes kept per process, keyed by path, size and modification time
+MAX_CACHED_INDEXES = 256
+
+# Tags needed to map uncompressed frames
+_IMAGE_WIDTH = 256
+_IMAGE_LENGTH = 257
+_BITS_PER_SAMPLE = 258
+_COMPRESSION = 259
+_PHOTOMETRIC = 262
+_FILL_ORDER = 266
+_STRIP_OFFSETS = 273
+_SAMPLES_PER_PIXEL = 277
+_ROWS_PER_STRIP = 278
+_STRIP_BYTE_COUNTS = 279
+_PLANAR_CONFIG = 284
+_TILE_WIDTH = 322
+_MAPPED_TAGS = {
+    _IMAGE_WIDTH, _IMAGE_LENGTH, _BITS_PER_SAMPLE, _COMPRESSION, _PHOTOMETRIC, _FILL_ORDER, _STRIP_OFFSETS,
+    _SAMPLES_PER_PIXEL, _ROWS_PER_STRIP, _STRIP_BYTE_COUNTS, _PLANAR_CONFIG, _TILE_WIDTH
+}
+
+# TIFF field type -> struct format of one value
+_FIELD_FORMATS = {1: "B", 3: "H", 4: "I", 6: "b", 8: "h", 9: "i", 13: "I", 16: "Q", 17: "q", 18: "Q"}
+
+
+@dataclass(frozen=True)
+class TiffIndex:
+    """Location of every frame (IFD) of a TIFF file, parsed once from the IFD chain."""
+    byte_order: str  # "<" or ">"
+    bigtiff: bool
+    ifd_offsets: Tuple[int, ...]
+
+    @property
+    def num_frames(self) -> int:
+        return len(self.ifd_offsets)
+
+
+_index_cache: "OrderedDict[Tuple[str, int, int], TiffIndex]" = OrderedDict()
+_index_cache_lock = threading.Lock()
+
+
+def tiff_index(file_path: Path) -> TiffIndex:
+    """
+    Index of a TIFF file, cached per process until the file changes.
+
+    Raises:
+        ValueError: If the file is not a TIFF file.
+    """
+    stat = os.stat(file_path)
+    key = (str(file_path), stat.st_size, stat.st_mtime_ns)
+    with _index_cache_lock:
+        index = _index_cache.get(key)
+        if index is not None:
+            _index_cache.move_to_end(key)
+            return index
+    index = read_tiff_index(file_path)
+    with _index_cache_lock:
+        _index_cache[key] = index
+        if len(_index_cache) > MAX_CACHED_INDEXES:
+            _index_cache.popitem(last=False)
+    return index
+
+
+def read_tiff_index(file_path: Path) -> TiffIndex:
+    """
+    Walk the IFD chain of a TIFF file, reading only the entry count and next pointer of each IFD.
+    Unlike seeking with Pillow, the tags of the frames are not parsed.
+    """
+    with open(file_path, "rb") as f:
+        byte_order, bigtiff, offset = _read_header(f)
+        count_format, entry_size, next_format = ("Q", 20, "Q") if bigtiff else ("H", 12, "I")
+        count_size, next_size = struct.calcsize(count_format), struct.calcsize(next_format)
+
+        offsets: List[int] = []
+        seen = set()
+        while offset and offset not in seen:
+            seen.add(offset)
+            f.seek(offset)
+            data = f.read(count_size)
+            if len(data) < count_size:
+                break
+            (num_entries,) = struct.unpack(byte_order + count_format, data)
+            f.seek(offset + count_size + num_entries * entry_size)
+            data = f.read(next_size)
+            offsets.append(offset)
+            if len(data) < next_size:
+                break
+            (offset,) = struct.unpack(byte_order + next_format, data)
+
+    return TiffIndex(byte_order=byte_order, bigtiff=bigtiff, ifd_offsets=tuple(offsets))
+
+
+def map_tiff_frame(file_path: Path, index: TiffIndex, frame: int) -> np.ndarray | None:
+    """
+    Memory-map an uncompressed frame whose strips are stored back to back, without decoding.
+
+    8-bit grayscale and RGB frames are returned as (read-only) views of the file, 1-bit black and
+    white frames are unpacked to 0/255.
+
+    Returns:
+        np.ndarray | None: Grayscale (H, W) or RGB (H, W, 3) array, None if the frame can't be mapped
+            and has to be decoded, see open_tiff_frame.
+    """
+    with open(file_path, "rb") as f:
+        tags = _read_ifd_tags(f, index, index.ifd_offsets[frame])
+
+    def tag(code: int, default=None):
+        values = tags.get(code)
+        return values[0] if values else default
+
+    width, height = tag(_IMAGE_WIDTH), tag(_IMAGE_LENGTH)
+    samples = tag(_SAMPLES_PER_PIXEL, 1)
+    bits = tag(_BITS_PER_SAMPLE, 1)
+    photometric = tag(_PHOTOMETRIC)
+    if (
+            not width or not height
+            or tag(_COMPRESSION, 1) != 1
+            or _TILE_WIDTH in tags
+            or tag(_PLANAR_CONFIG, 1) != 1
+            or tag(_FILL_ORDER, 1) != 1
+            or any(b != bits for b in tags.get(_BITS_PER_SAMPLE, ()))
+            or (samples, bits, photometric) not in ((1, 8, 1), (1, 8, 0), (3, 8, 2), (1, 1, 1), (1, 1, 0))
+    ):
+        return None
+
+    strip_offsets, byte_counts = tags.get(_STRIP_OFFSETS), tags.get(_STRIP_BYTE_COUNTS)
+    row_bytes = (width * samples * bits + 7) // 8
+    if not strip_offsets or not byte_counts or len(strip_offsets) != len(byte_counts):
+        return None
+    # Strips must be contiguous, so the frame is one block of rows
+    for i in range(1, len(strip_offsets)):
+        if strip_offsets[i] != strip_offsets[i - 1] + byte_counts[i - 1]:
+            return None
+    if sum(byte_counts) < row_bytes * height:
+        return None
+
+    data = np.memmap(file_path, dtype=np.uint8, mode="r", offset=strip_offsets[0], shape=(height, row_bytes))
+    if bits == 1:
+        data = np.unpackbits(data, axis=1, count=width)
+        # WhiteIsZero (0): set bits are black, BlackIsZero (1): set bits are white
+        return (1 - data) * 255 if photometric == 0 else data * 255
+    if photometric == 0:
+        return 255 - data
+    return data.reshape(height, width, samples) if samples == 3 else data
+
+
+@contextmanager
+def open_tiff_frame(file_path: Path, index: TiffIndex, frame: int) -> Generator[Image.Image, None, None]:
+    """
+    Open one frame of a TIFF file with Pillow, without walking the IFDs before it.
+
+    The file is presented to Pillow with a header pointing at the frame's IFD, so the frame is opened as
+    the first one. Strip offsets are absolute, so compressed frames decode as usual (also with libtiff).
+    """
+    raw = open(file_path, "rb", buffering=0)
+    header_size = 16 if index.bigtiff else 8
+    header = bytearray(raw.read(header_size))
+    offset_format = "Q" if index.bigtiff else "I"
+    struct.pack_into(index.byte_order + offset_format, header, header_size - struct.calcsize(offset_format),
+                     index.ifd_offsets[frame])
+    raw.seek(0)
+    with io.BufferedReader(_HeaderPatchedFile(raw, bytes(header))) as f, Image.open(f) as pil_img:
+        yield pil_img
+
+
+class _HeaderPatchedFile(io.RawIOBase):
+    """Raw file whose first bytes read as header instead of the file content."""
+
+    def __init__(self, raw: io.RawIOBase, header: bytes):
+        self._raw = raw
+        self._header = header
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        return self._raw.seek(offset, whence)
+
+    def tell(self) -> int:
+        return self._raw.tell()
+
+    def fileno(self) -> int:
+        # Pillow hands the descriptor to libtiff, which goes to the frame's IFD directly
+        return self._raw.fileno()
+
+    def readinto(self, buffer) -> int:
+        position = self._raw.tell()
+        num_read = self._raw.readinto(buffer)
+        if num_read and position < len(self._header):
+            end = min(num_read, len(self._header) - position)
+            memoryview(buffer)[:end] = self._header[position:position + end]
+        return num_read
+
+    def close(self) -> None:
+        self._raw.close()
+        super().close()
+
+
+def _read_header(f) -> Tuple[str, bool, int]:
+    header = f.read(16)
+    byte_order = {b"II": "<", b"MM": ">"}.get(header[:2])
+    if byte_order is None or len(header) < 8:
+        raise ValueError("Not a TIFF file")
+    (magic,) = struct.unpack(byte_order + "H", header[2:4])
+    if magic == 42:
+        return byte_order, False, struct.unpack(byte_order + "I", header[4:8])[0]
+    if magic == 43 and len(header) == 16:
+        return byte_order, True, struct.unpack(byte_order + "Q", header[8:16])[0]
+    raise ValueError(f"Not a TIFF file (magic number {magic})")
+
+
+def _read_ifd_tags(f, index: TiffIndex, ifd_offset: int) -> Dict[int, Tuple[int, ...]]:
+    """Read the tags of one IFD needed by map_tiff_frame."""
+    order = index.byte_order
+    count_format, entry_format, inline_size = ("Q", "HHQ8s", 8) if index.bigtiff else ("H", "HHI4s", 4)
+
+    f.seek(ifd_offset)
+    count_size = struct.calcsize(count_format)
+    (num_entries,) = struct.unpack(order + count_format, f.read(count_size))
+    entry_size = struct.calcsize(order + entry_format)
+    entries = f.read(num_entries * entry_size)
+
+    tags = {}
+    for i in range(num_entries):
+        code, field_type, count, value = struct.unpack_from(order + entry_format, entries, i * entry_size)
+        value_format = _FIELD_FORMATS.get(field_type)
+        if code not in _MAPPED_TAGS or value_format is None:
+            continue
+        size = count * struct.calcsize(value_format)
+        if size <= inline_size:
+            data = value[:size]
+        else:
+            (data_offset,) = struct.unpack(order + ("Q" if index.bigtiff else "I"), value)
+            f.seek(data_offset)
+            data = f.read(size)
+        tags[code] = struct.unpack(f"{order}{count}{value_format}", data)
+    return tags
@@ -14,4 +14,9 @@ setup(
         'opencv-python',
         'pandas'
     ],
+    extras_require={
+        'parquet': ['pyarrow'],
+        'turbojpeg': ['PyTurboJPEG'],
+        'jxl': ['pillow-jxl-plugin'],
+    },
 )
\ No newline at end of file
@@ -1,21 +1,287 @@
+import json
+import os
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import cv2
+import fitz  # PyMuPDF
+import numpy as np
+
 from docs2dataset.core.data_handler import DataHandler
+from docs2dataset.distributed.sharding import MERGE_LOCK_NAME
+from docs2dataset.core.page_pipeline import run_inline
+from docs2dataset.data_managers.image_encoders import OpenCVEncoder
+from docs2dataset.ocr.ocr_interface import OCRInterface, OCROutput
+from docs2dataset.utils.file_info import FileInfo
 
-import unittest
+
+class UnsafeOCR(OCRInterface):
+    """Custom engine that doesn't declare thread or process safety."""
+
+    def recognize(self, images):
+        return [OCROutput.from_text_items([]) for _ in images]
+
+
+class FailingEncoder(OpenCVEncoder):
+    def encode(self, image_np, quality):
+        raise RuntimeError("Encoder crashed")
+
+
+class ThreadRecordingOCR(UnsafeOCR):
+    """Thread-safe engine remembering the threads it ran on, as engines with per-thread handles would."""
+
+    def __init__(self):
+        self.threads = set()
+
+    @property
+    def thread_safe(self) -> bool:
+        return True
+
+    def recognize(self, images):
+        self.threads.add(threading.current_thread())
+        return super().recognize(images)
+
+
+def make_docs(docs_dir: Path) -> None:
+    """Two classes with a 2-page text PDF, a scanned page and a subdirectory each."""
+    for class_name in ("A", "B"):
+        class_dir = docs_dir / class_name
+        (class_dir / "sub").mkdir(parents=True)
+
+        doc = fitz.open()
+        for page_num in range(2):
+            doc.new_page().insert_text((50, 60), f"{class_name} page {page_num}", fontsize=12)
+        doc.save(class_dir / "text.pdf")
+
+        scan = np.full((800, 600, 3), 255, dtype=np.uint8)
+        cv2.putText(scan, class_name, (50, 100), cv2.FONT_HERSHEY_SIMPLEX, 2, (0, 0, 0), 3)
+        cv2.imwrite(str(class_dir / "scan.png"), scan)
+        cv2.imwrite(str(class_dir / "sub" / "scan.jpg"), scan)
 
 
 class TestDataHandler(unittest.TestCase):
     def test_create_dataset(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            docs_dir = Path(tmp_dir) / "docs"
+            make_docs(docs_dir)
+
+            dataset_creator = DataHandler(
+                input_path=str(docs_dir),
+                output_path=str(Path(tmp_dir) / "dataset"),
+                max_docs_per_class=2000,
+                do_ocr=False,
+                save_processed_img=True,
+                file_index_path=Path(tmp_dir) / "index.json",
+                image_cache_dir=Path(tmp_dir) / "image_cache",
+                logging_level="WARNING",
+                seed=0
+            )
+
+            dataset = dataset_creator.create_dataset()
+
+            self.assertEqual(len(dataset), 8)
+            self.assertEqual(sorted(dataset["Class"].value_counts().items()), [("A", 4), ("B", 4)])
+            self.assertTrue(all(Path(path).exists() for path in dataset["PreprocessedFilename"]))
+            self.assertTrue((Path(tmp_dir) / "dataset" / "metrics.json").exists())
+            # Paths given as Path objects are saved as strings
+            used_args = json.loads((Path(tmp_dir) / "dataset" / "used_args.json").read_text())
+            self.assertEqual(used_args["file_index_path"], str(Path(tmp_dir) / "index.json"))
+            self.assertEqual(used_args["image_cache_dir"], str(Path(tmp_dir) / "image_cache"))
+
+    def test_metrics_only_count_the_run(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            docs_dir = Path(tmp_dir) / "docs"
+            make_docs(docs_dir)
+            dataset_creator = DataHandler(
+                input_path=str(docs_dir),
+                output_path=str(Path(tmp_dir) / "dataset"),
+                max_docs_per_class=2000,
+                do_ocr=False,
+                save_processed_img=True,
+                logging_level="WARNING"
+            )
+            # Decoded outside of the run
+            for _ in range(3):
+                dataset_creator.image_manager.load_page(FileInfo(docs_dir / "A" / "scan.png", "A"), 0)
+
+            dataset_creator.create_dataset()
+
+            metrics = json.loads((Path(tmp_dir) / "dataset" / "metrics.json").read_text())
+            # Two scans and two text pages per class
+            self.assertEqual(metrics["stages"]["decode"]["count"], 4)
+            self.assertEqual(metrics["stages"]["rasterize"]["count"], 4)
+
+    def test_unfingerprintable_processor_disables_caches(self):
+        class Slotted:
+            __slots__ = ()
+
+            def process(self, image):
+                return image
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            docs_dir = Path(tmp_dir) / "docs"
+            make_docs(docs_dir)
+            params = dict(input_path=str(docs_dir), output_path=str(Path(tmp_dir) / "dataset"), max_docs_per_class=10,
+                          do_ocr=False, image_processor=Slotted(), logging_level="CRITICAL")
+
+            self.assertIsNone(DataHandler(**params).image_cache)
+            self.assertIsNone(DataHandler(**params, image_cache_dir=str(Path(tmp_dir) / "cache")).image_cache)
+
+    def test_failed_image_saves_leave_no_path(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            docs_dir = Path(tmp_dir) / "docs"
+            make_docs(docs_dir)
+
+            for executor in ("serial", "threads"):
+                dataset_creator = DataHandler(
+                    input_path=str(docs_dir),
+                    output_path=str(Path(tmp_dir) / executor),
+                    max_docs_per_class=2000,
+                    num_workers=2,
+                    executor=executor,
+                    do_ocr=False,
+                    save_processed_img=True,
+                    image_encoder=FailingEncoder(),
+                    logging_level="CRITICAL",
+                    seed=0
+                )
+                dataset = dataset_creator.create_dataset()
+
+                self.assertEqual(len(dataset), 8)
+                self.assertEqual(dataset["PreprocessedFilename"].fillna("").tolist(), [""] * 8)
+
+        # Synchronous processing follows the error handling of the writer thread
+        self.assertIsNone(run_inline(FailingEncoder().encode, None, 90).result())
+
+    def test_failed_merge_releases_lock(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            docs_dir = Path(tmp_dir) / "docs"
+            make_docs(docs_dir)
+            output_path = Path(tmp_dir) / "dataset"
+            dataset_creator = DataHandler(
+                input_path=str(docs_dir),
+                output_path=str(output_path),
+                max_docs_per_class=2000,
+                do_ocr=False,
+                lease_work=True,
+                node_id="node",
+                logging_level="ERROR",
+                seed=0
+            )
+
+            coordinator = mock.Mock(all_done=mock.Mock(return_value=True))
+            with mock.patch("docs2dataset.core.data_handler.merge_shards", side_effect=OSError("disk full")):
+                with self.assertRaises(OSError):
+                    dataset_creator._merge_if_last(coordinator)
+            self.assertFalse((output_path / MERGE_LOCK_NAME).exists())
+
+            # A later attempt merges
+            with mock.patch("docs2dataset.core.data_handler.merge_shards") as merge_shards:
+                self.assertTrue(dataset_creator._merge_if_last(coordinator))
+            merge_shards.assert_called_once()
+            self.assertTrue((output_path / MERGE_LOCK_NAME).exists())
+
+    def test_executors(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            docs_dir = Path(tmp_dir) / "docs"
+            make_docs(docs_dir)
+
+            def make_handler(name: str, **kwargs) -> DataHandler:
+                return DataHandler(
+                    input_path=str(docs_dir),
+                    output_path=str(Path(tmp_dir) / name),
+                    max_docs_per_class=2000,
+                    num_workers=2,
+                    pages_per_task=1,
+                    logging_level="ERROR",
+                    seed=0,
+                    **kwargs
+                )
+
+            serial = make_handler("serial", do_ocr=False, executor="serial").create_dataset()
+            threaded = make_handler("threads", do_ocr=False, executor="threads").create_dataset()
+            columns = ["SourceFilename", "Page", "Class"]
+            self.assertEqual(
+                sorted(map(tuple, threaded[columns].values.tolist())), sorted(map(tuple, serial[columns].values.tolist()))
+            )
+
+            self.assertEqual(make_handler("auto", ocr_engine=UnsafeOCR()).executor, "serial")
+            with self.assertRaises(ValueError):
+                make_handler("unsafe", ocr_engine=UnsafeOCR(), executor="threads")
+
+    def test_auto_workers_calibration(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            docs_dir = Path(tmp_dir) / "docs"
+            make_docs(docs_dir)
+
+            with mock.patch("docs2dataset.core.data_handler.usable_cpu_count", return_value=2):
+                dataset_creator = DataHandler(
+                    input_path=str(docs_dir),
+                    output_path=str(Path(tmp_dir) / "dataset"),
+                    max_docs_per_class=2000,
+                    num_workers="auto",
+                    do_ocr=False,
+                    pages_per_task=1,
+                    calibration_pages=1,
+                    logging_level="ERROR",
+                    seed=0
+                )
+            execute = DataHandler._execute
+            with mock.patch.object(DataHandler, "_execute", autospec=True, side_effect=execute) as execute_calls:
+                dataset = dataset_creator.create_dataset()
+
+            self.assertEqual(len(dataset), 8)
+            # Both candidates and then the fastest one ran on the same sample, its pages were written once
+            samples = [call.args[1] for call in execute_calls.call_args_list[:3]]
+            self.assertEqual(samples[0], samples[1])
+            self.assertEqual(samples[0], samples[2])
+            self.assertFalse(dataset.duplicated(["Class", "SourceFilename", "Page"]).any())
+            # 2 CPUs: two workers with one thread each, as processes and as threads on 4 pages each
+            used_args = json.loads((Path(tmp_dir) / "dataset" / "used_args.json").read_text())
+            calibration = used_args["calibration"]
+            self.assertEqual([(c["executor"], c["num_workers"], c["pages"]) for c in calibration],
+                             [("processes", 2, 4), ("threads", 2, 4)])
+            best = max(calibration, key=lambda c: c["pages_per_sec"])
+            self.assertEqual((used_args["executor"], used_args["num_workers"]), (best["executor"], 2))
+
 
-        docs_dir = 'path/to/docs'
+    def test_thread_pool_shared_by_calibration(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            docs_dir = Path(tmp_dir) / "docs"
+            make_docs(docs_dir)
+            doc = fitz.open()
+            for page_num in range(10):
+                doc.new_page().insert_text((50, 60), f"long page {page_num}", fontsize=12)
+            doc.save(docs_dir / "A" / "long.pdf")
 
-        dataset_creator = DataHandler(
-            input_path=docs_dir,
-            output_path='big_cv_dataset',
-            max_docs_per_class=2000,
-        )
+            ocr_engine = ThreadRecordingOCR()
+            with mock.patch("docs2dataset.core.data_handler.usable_cpu_count", return_value=4):
+                dataset_creator = DataHandler(
+                    input_path=str(docs_dir),
+                    output_path=str(Path(tmp_dir) / "dataset"),
+                    max_docs_per_class=2000,
+                    num_workers="auto",
+                    ocr_engine=ocr_engine,
+                    pages_per_task=1,
+                    calibration_pages=1,
+                    logging_level="ERROR",
+                    seed=0
+                )
+            opencv_threads, omp_limit = cv2.getNumThreads(), os.environ.get("OMP_THREAD_LIMIT")
+            with mock.patch("docs2dataset.utils.cpu_utils.cv2.setNumThreads", wraps=cv2.setNumThreads) as set_threads:
+                dataset = dataset_creator.create_dataset()
 
-        dataset = dataset_creator.create_dataset()
-        self.assertIsNotNone(dataset)
+            self.assertEqual(len(dataset), 18)
+            # Threads share the process's OpenCV threads: 4 x 1 and 2 x 2 both use 4, the limits are restored after
+            self.assertEqual({call.args[0] for call in set_threads.call_args_list[:-1]}, {4})
+            self.assertEqual((cv2.getNumThreads(), os.environ.get("OMP_THREAD_LIMIT")), (opencv_threads, omp_limit))
+            # 4 x 1 and 2 x 2 threads were calibrated, one pool of 4 threads served both and the rest
+            self.assertEqual(len(dataset_creator.calibration), 2)
+            self.assertLessEqual(len(ocr_engine.threads), 4)
+            self.assertFalse([t for t in threading.enumerate() if t.name.startswith("page-worker")])
 
 
 if __name__ == '__main__':
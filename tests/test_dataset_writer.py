@@ -0,0 +1,54 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from docs2dataset.data_managers.dataset_writer import DatasetWriter, is_run_complete, read_word_boxes
+from docs2dataset.ocr.ocr_interface import WordBoxes
+from docs2dataset.utils.file_info import FileInfo
+from docs2dataset.utils.page_task import PageResult, PageTask
+
+COLUMNS = ["SourceFilename", "Page", "Text"]
+
+
+def make_result(page_num: int) -> PageResult:
+    page_task = PageTask(file_info=FileInfo(file_path=Path("docs/a.pdf"), class_name="A"), page_num=page_num)
+    return PageResult(page_task=page_task, row={"SourceFilename": "a.pdf", "Page": page_num, "Text": "text"})
+
+
+class TestDatasetWriter(unittest.TestCase):
+    def test_resume_discards_uncommitted_rows(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            output_path = Path(tmp_dir)
+            with DatasetWriter(output_path, "data.csv", COLUMNS, chunk_size=2) as writer:
+                for page_num in range(3):
+                    writer.write(make_result(page_num))
+            # Simulate rows appended by a crashed run after the last commit
+            with open(output_path / "data.csv", "a", encoding="utf-8") as f:
+                f.write("a.pdf,9,uncommitted\n")
+
+            with DatasetWriter(output_path, "data.csv", COLUMNS, chunk_size=2) as writer:
+                self.assertEqual(writer.completed_units, {("docs/a.pdf", p) for p in range(3)})
+                writer.write(make_result(3))
+                writer.mark_complete()
+                dataset = writer.read_dataset()
+                # Only the units of the previous run are kept in memory
+                self.assertEqual(len(writer.completed_units), 3)
+
+            self.assertEqual(dataset["Page"].tolist(), [0, 1, 2, 3])
+            self.assertTrue(is_run_complete(output_path))
+
+    def test_word_boxes_keyed_by_source(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            output_path = Path(tmp_dir)
+            with DatasetWriter(output_path, "data.csv", COLUMNS, save_word_boxes=True,
+                               word_box_source=lambda file_path: file_path.name) as writer:
+                result = make_result(0)
+                result.word_boxes = WordBoxes.empty()
+                writer.write(result)
+                writer.mark_complete()
+
+            self.assertEqual([entry[:2] for entry in read_word_boxes(output_path)], [("a.pdf", 0)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+import os
+import tempfile
+import unittest
+from pathlib import Path
+
+from docs2dataset.data_managers.file_index import FileIndex
+
+
+class TestFileIndex(unittest.TestCase):
+    def _make_tree(self, root: Path):
+        (root / "A" / "sub" / "deep").mkdir(parents=True)
+        (root / "B").mkdir()
+        for path in ["A/1.png", "A/notes.txt", "A/sub/2.pdf", "A/sub/deep/3.tif", "B/4.jpg"]:
+            (root / path).write_bytes(b"data")
+
+    def test_lists_image_files_by_subdir(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            root = Path(tmp_dir)
+            self._make_tree(root)
+            index = FileIndex(root)
+
+            self.assertEqual(index.class_names(), ["A", "B"])
+            self.assertEqual(
+                list(index.iter_class_files("A")),
+                [(root / "A/1.png", "root"), (root / "A/sub/2.pdf", "sub"), (root / "A/sub/deep/3.tif", "sub")]
+            )
+            self.assertEqual(index.counts()["A"], {"count": 3, "subdirs": {"root": 1, "sub": 2}})
+
+    def test_incremental_update(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            root = Path(tmp_dir) / "input"
+            root.mkdir()
+            self._make_tree(root)
+            index_path = Path(tmp_dir) / "index.json"
+
+            index = FileIndex(root, index_path=index_path)
+            for class_name in index.class_names():
+                list(index.iter_class_files(class_name))
+            index.save()
+
+            (root / "A/sub/5.png").write_bytes(b"data")
+            # Make the directory change visible regardless of the filesystem timestamp granularity
+            stat = os.stat(root / "A/sub")
+            os.utime(root / "A/sub", ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+            index = FileIndex(root, index_path=index_path)
+            files = [path for path, _ in index.iter_class_files("A")]
+
+            self.assertIn(root / "A/sub/5.png", files)
+            self.assertEqual(index._stats, {"scanned": 1, "reused": 2})
+
+            # The counts of the previous run are available without listing the class
+            self.assertEqual(index.indexed_subdir_counts("A"), {"root": 1, "sub": 2})
+            self.assertIsNone(FileIndex(root).indexed_subdir_counts("A"))
+
+
+if __name__ == '__main__':
+    unittest.main()
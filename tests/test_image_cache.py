@@ -0,0 +1,37 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+
+from docs2dataset.cache.image_cache import ProcessedImageCache, decode_array, encode_array
+
+
+class TestProcessedImageCache(unittest.TestCase):
+    def test_arrays_round_trip_losslessly(self):
+        rng = np.random.default_rng(0)
+        for image in (
+                rng.integers(0, 256, (40, 30), dtype=np.uint8),
+                rng.integers(0, 256, (40, 30, 3), dtype=np.uint8),
+                rng.random((40, 30), dtype=np.float32),
+        ):
+            decoded = decode_array(encode_array(image))
+            self.assertEqual(decoded.dtype, image.dtype)
+            np.testing.assert_array_equal(decoded, image)
+
+    def test_key_covers_processor_config(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            doc_path = Path(tmp_dir) / "doc.pdf"
+            doc_path.write_bytes(b"%PDF-1.4")
+            cache = ProcessedImageCache(Path(tmp_dir) / "cache", max_size_mb=10)
+            render_params = {"dpi": 300, "megapixel": 3}
+            key = cache.make_key(doc_path, 0, render_params, '[{"instance_name": "blur"}]')
+
+            cache.put(key, np.zeros((4, 4), dtype=np.uint8))
+
+            self.assertIsNotNone(cache.get(key))
+            self.assertIsNone(cache.get(cache.make_key(doc_path, 0, render_params, '[{"instance_name": "sharpen"}]')))
+
+
+if __name__ == '__main__':
+    unittest.main()
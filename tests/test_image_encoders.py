@@ -0,0 +1,71 @@
+import sys
+import types
+import unittest
+from unittest import mock
+
+import cv2
+import numpy as np
+
+from docs2dataset.data_managers.image_encoders import (
+    MAX_SEARCH_ENCODES,
+    BoundedEncoder,
+    OpenCVEncoder,
+    create_image_encoder,
+    jpeg_scale,
+    quality_for_scale
+)
+from docs2dataset.utils.metrics import stage_metrics
+
+
+def make_scan() -> np.ndarray:
+    rng = np.random.default_rng(0)
+    scan = np.full((1200, 900, 3), 235, dtype=np.uint8)
+    for y in range(60, 1150, 30):
+        cv2.putText(scan, "Lorem ipsum dolor sit amet 0123", (30, y), cv2.FONT_HERSHEY_SIMPLEX, 0.9, (20, 20, 20), 2)
+    return cv2.add(scan, rng.integers(0, 25, scan.shape, dtype=np.uint8))
+
+
+class TestImageEncoders(unittest.TestCase):
+    def test_quality_scale_round_trip(self):
+        for quality in range(1, 101):
+            self.assertEqual(quality_for_scale(jpeg_scale(quality)), quality)
+
+    def test_bounded_search_fits_with_few_encodes(self):
+        scan = make_scan()
+        for image_format in ("jpeg", "webp"):
+            encoder = create_image_encoder(image_format, "opencv")
+            full_size = len(encoder.encode(scan, encoder.default_quality))
+            for share in (0.8, 0.5, 0.3):
+                max_bytes = int(full_size * share)
+                stage_metrics.drain()
+                data = BoundedEncoder(encoder, max_bytes).encode(scan)
+                counters = stage_metrics.drain()["counters"]
+
+                self.assertLessEqual(len(data), max_bytes, (image_format, share))
+                self.assertLessEqual(counters["encode_runs"], 1 + MAX_SEARCH_ENCODES)
+                self.assertEqual(counters["encode_searches"], 1)
+                self.assertIsNotNone(cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR))
+
+    def test_backends(self):
+        gray = cv2.cvtColor(make_scan(), cv2.COLOR_BGR2GRAY)
+        for backend in ("opencv", "pillow"):
+            encoder = create_image_encoder("jpeg", backend)
+            decoded = cv2.imdecode(np.frombuffer(encoder.encode(gray, 90), dtype=np.uint8), cv2.IMREAD_UNCHANGED)
+            self.assertEqual(decoded.shape, gray.shape)
+        with self.assertRaises(ValueError):
+            create_image_encoder("webp", "turbojpeg")
+
+    def test_auto_skips_turbojpeg_without_native_library(self):
+        def missing_library():
+            raise RuntimeError("Unable to locate turbojpeg library automatically.")
+
+        turbojpeg = types.ModuleType("turbojpeg")
+        turbojpeg.TurboJPEG = missing_library
+        with mock.patch.dict(sys.modules, {"turbojpeg": turbojpeg}):
+            with self.assertRaises(ImportError):
+                create_image_encoder("jpeg", "turbojpeg")
+            self.assertIsInstance(create_image_encoder("jpeg", "auto"), OpenCVEncoder)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+import logging
+import tempfile
+import unittest
+from pathlib import Path
+
+import cv2
+import fitz  # PyMuPDF
+import numpy as np
+from PIL import Image
+
+from docs2dataset.data_managers import ImageManager
+from docs2dataset.utils.file_info import FileInfo
+
+
+def make_image_manager(color_mode: str, resampling: str = "lanczos", megapixel: int = 3) -> ImageManager:
+    return ImageManager(
+        image_processor=None,
+        save_processed_img=False,
+        output_path=Path("unused"),
+        target_pages=None,
+        dpi=100,
+        logging_level=logging.WARNING,
+        megapixel=megapixel,
+        size_threshold_mb=5,
+        color_mode=color_mode,
+        resampling=resampling
+    )
+
+
+class TestImageManager(unittest.TestCase):
+    def test_color_modes(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            page = np.full((300, 200, 3), 240, dtype=np.uint8)
+            cv2.rectangle(page, (50, 50), (150, 100), (0, 0, 200), -1)
+
+            paths = [Path(tmp_dir) / name for name in ("page.jpg", "page.png", "page.tif", "page.pdf")]
+            cv2.imwrite(str(paths[0]), page)
+            cv2.imwrite(str(paths[1]), page)
+            Image.fromarray(page).save(paths[2], save_all=True, append_images=[Image.fromarray(page)])
+            doc = fitz.open()
+            doc.new_page().insert_text((50, 60), "text", fontsize=12)
+            doc.save(paths[3])
+
+            for path in paths:
+                file_info = FileInfo(file_path=path, class_name="A")
+                bgr = make_image_manager("bgr").load_page(file_info, 0)
+                gray = make_image_manager("gray").load_page(file_info, 0)
+                binary = make_image_manager("binary").load_page(file_info, 0)
+
+                self.assertEqual(bgr.ndim, 3)
+                self.assertEqual(gray.shape, bgr.shape[:2])
+                self.assertEqual(binary.shape, bgr.shape[:2])
+                self.assertTrue(set(np.unique(binary)) <= {0, 255})
+
+    def test_reduced_decode_fits_budget(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            page = np.full((3000, 2000, 3), 240, dtype=np.uint8)
+            cv2.rectangle(page, (500, 500), (1500, 1000), (0, 0, 200), -1)
+            for name in ("page.jpg", "page.png"):
+                path = Path(tmp_dir) / name
+                cv2.imwrite(str(path), page)
+                for resampling in ("lanczos", "area", "linear"):
+                    image = make_image_manager("bgr", resampling, megapixel=1).load_page(
+                        FileInfo(file_path=path, class_name="A"), 0
+                    )
+                    self.assertLessEqual(image.shape[0] * image.shape[1], 1_000_000)
+                    self.assertGreater(image.shape[0] * image.shape[1], 990_000)
+                    # The red box is still where it was
+                    scale = image.shape[0] / page.shape[0]
+                    np.testing.assert_allclose(image[int(750 * scale), int(1000 * scale)], (0, 0, 200), atol=8)
+
+
+if __name__ == '__main__':
+    unittest.main()
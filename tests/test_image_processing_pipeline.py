@@ -0,0 +1,92 @@
+import unittest
+
+import cv2
+import numpy as np
+
+from docs2dataset.preprocessing import ImageProcessorInterface
+from docs2dataset.preprocessing.image_processing_pipeline import ImageProcessingPipeline, processor_fingerprint
+
+
+class Invert(ImageProcessorInterface, instance_name="test_invert"):
+    def process(self, image: np.ndarray) -> np.ndarray:
+        return 255 - image
+
+    def process_into(self, image: np.ndarray, out: np.ndarray | None) -> np.ndarray:
+        return np.subtract(255, image, out=out, dtype=image.dtype) if out is not None else self.process(image)
+
+
+class Threshold(ImageProcessorInterface, instance_name="test_threshold"):
+    def __init__(self, level: int = 128):
+        self.level = level
+
+    def process(self, image: np.ndarray) -> np.ndarray:
+        return cv2.threshold(image, self.level, 255, cv2.THRESH_BINARY)[1]
+
+    def fuse(self, next_processor: ImageProcessorInterface) -> ImageProcessorInterface | None:
+        if isinstance(next_processor, Threshold):
+            return Threshold(max(self.level, next_processor.level))
+        return None
+
+
+class Identity(ImageProcessorInterface, instance_name="test_identity"):
+    def process(self, image: np.ndarray) -> np.ndarray:
+        return image
+
+    def process_into(self, image: np.ndarray, out: np.ndarray | None) -> np.ndarray:
+        return image
+
+
+class WithKernel(Identity, instance_name="test_with_kernel"):
+    def __init__(self):
+        self.kernel = object()
+
+
+class Slotted:
+    """A processor without an attribute dict."""
+    __slots__ = ("level",)
+
+    def __init__(self):
+        self.level = 1
+
+    def process(self, image: np.ndarray) -> np.ndarray:
+        return image
+
+
+class TestImageProcessingPipeline(unittest.TestCase):
+    def test_results_match_and_are_not_reused(self):
+        pipeline = ImageProcessingPipeline([Invert(), Invert(), Invert(), Identity()])
+        images = [np.full((8, 8), value, dtype=np.uint8) for value in (10, 20)]
+
+        results = [pipeline.run(image) for image in images]
+
+        np.testing.assert_array_equal(results[0], 245)
+        np.testing.assert_array_equal(results[1], 235)
+        np.testing.assert_array_equal(images[0], 10)
+        self.assertFalse(np.shares_memory(results[0], results[1]))
+
+    def test_adjacent_processors_are_fused(self):
+        pipeline = ImageProcessingPipeline([Threshold(100), Threshold(150), Invert()])
+        image = np.array([[50, 120, 200]], dtype=np.uint8)
+
+        self.assertEqual(len(pipeline._stages), 2)
+        np.testing.assert_array_equal(pipeline.run(image), [[255, 255, 0]])
+        np.testing.assert_array_equal(pipeline.run_batch([image])[0], [[255, 255, 0]])
+
+    def test_fingerprint_is_none_for_unstable_reprs(self):
+        self.assertEqual(processor_fingerprint(Threshold(100)), processor_fingerprint(Threshold(100)))
+        self.assertNotEqual(processor_fingerprint(Threshold(100)), processor_fingerprint(Threshold(150)))
+
+        # The default repr of the kernel holds its address, which differs on every run
+        self.assertIsNone(processor_fingerprint(WithKernel()))
+        self.assertIsNone(processor_fingerprint(ImageProcessingPipeline([Invert(), WithKernel()])))
+        # Large arrays are summarized, kernels differing in the hidden elements would share a fingerprint
+        self.assertIsNone(processor_fingerprint(Threshold(np.arange(10_000))))
+        self.assertIsNotNone(processor_fingerprint(Threshold(np.arange(10))))
+        self.assertIsNone(processor_fingerprint(Slotted()))
+        self.assertIsNotNone(
+            processor_fingerprint(ImageProcessingPipeline([WithKernel()], config=[{"name": "test_with_kernel"}]))
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
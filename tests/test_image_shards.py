@@ -0,0 +1,74 @@
+import tarfile
+import tempfile
+import unittest
+from pathlib import Path
+
+from docs2dataset.data_managers.dataset_writer import DatasetWriter
+from docs2dataset.data_managers.image_shards import ImageShardWriter, read_image_ref, read_shard_index
+from docs2dataset.utils.file_info import FileInfo
+from docs2dataset.utils.page_task import PageResult, PageTask
+
+COLUMNS = ["SourceFilename", "Page", "PreprocessedFilename"]
+
+
+def make_result(page_num: int) -> PageResult:
+    page_task = PageTask(file_info=FileInfo(file_path=Path("docs/a.pdf"), class_name="A"), page_num=page_num)
+    return PageResult(
+        page_task=page_task,
+        row={"SourceFilename": "a.pdf", "Page": page_num, "PreprocessedFilename": ""},
+        image_data=bytes([page_num]) * (300_000 + page_num)
+    )
+
+
+def make_writer(output_path: Path) -> DatasetWriter:
+    shards = ImageShardWriter(output_path / "shards", shard_size_mb=1)
+    return DatasetWriter(output_path, "data.csv", COLUMNS, chunk_size=2, image_shards=shards)
+
+
+class TestImageShards(unittest.TestCase):
+    def test_refs_index_and_tar_members(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            output_path = Path(tmp_dir)
+            with make_writer(output_path) as writer:
+                for page_num in range(5):
+                    writer.write(make_result(page_num))
+                writer.mark_complete()
+                dataset = writer.read_dataset()
+
+            for page_num, image_ref in enumerate(dataset["PreprocessedFilename"]):
+                self.assertEqual(read_image_ref(image_ref), make_result(page_num).image_data)
+
+            index = list(read_shard_index(output_path / "shards"))
+            self.assertEqual([entry["page"] for entry in index], list(range(5)))
+            shard_names = sorted({entry["shard"] for entry in index})
+            self.assertEqual(len(shard_names), 2)  # 1 MB shards hold three images
+
+            with tarfile.open(output_path / "shards" / shard_names[0]) as tar:
+                self.assertEqual(tar.getnames(), ["000000000.jpg", "000000001.jpg", "000000002.jpg"])
+                self.assertEqual(tar.extractfile("000000001.jpg").read(), make_result(1).image_data)
+
+    def test_resume_discards_uncommitted_images(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            output_path = Path(tmp_dir)
+            writer = make_writer(output_path)
+            writer.open()
+            for page_num in range(3):
+                writer.write(make_result(page_num))
+            # Crash: the third image was appended but its row was never committed
+            writer.image_shards.sync()
+
+            with make_writer(output_path) as writer:
+                self.assertEqual(writer.completed_units, {("docs/a.pdf", 0), ("docs/a.pdf", 1)})
+                writer.write(make_result(2))
+                writer.mark_complete()
+                dataset = writer.read_dataset()
+
+            index = list(read_shard_index(output_path / "shards"))
+            self.assertEqual([entry["page"] for entry in index], [0, 1, 2])
+            self.assertEqual(read_image_ref(dataset["PreprocessedFilename"][2]), make_result(2).image_data)
+            with tarfile.open(output_path / "shards" / index[0]["shard"]) as tar:
+                self.assertEqual(len(tar.getnames()), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+from docs2dataset.distributed.lease_coordinator import LeaseCoordinator
+
+
+class TestLeaseCoordinator(unittest.TestCase):
+    def test_claim_expire_complete(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            db_path = Path(tmp_dir) / "leases.sqlite"
+            first = LeaseCoordinator(db_path, "first", lease_timeout_sec=0.2)
+            second = LeaseCoordinator(db_path, "second", lease_timeout_sec=60)
+
+            self.assertTrue(first.try_become_populator(seed=1))
+            self.assertFalse(second.try_become_populator(seed=2))
+            first.populate([("A/1.pdf", "A"), ("A/2.pdf", "A"), ("B/3.pdf", "B")])
+            self.assertEqual(second.seed(), 1)
+
+            self.assertEqual(first.claim(2), [("A/1.pdf", "A"), ("A/2.pdf", "A")])
+            self.assertEqual(second.claim(2), [("B/3.pdf", "B")])
+            first.complete(["A/1.pdf"])
+            second.complete(["B/3.pdf"])
+            self.assertFalse(second.all_done())
+
+            # The lease of the file left by the first node expires and is taken over
+            time.sleep(0.3)
+            self.assertEqual(second.claim(2), [("A/2.pdf", "A")])
+            second.complete(["A/2.pdf"])
+            self.assertTrue(first.all_done())
+
+    def test_populator_lease_is_taken_over(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            db_path = Path(tmp_dir) / "leases.sqlite"
+            first = LeaseCoordinator(db_path, "first", lease_timeout_sec=0.2)
+            second = LeaseCoordinator(db_path, "second", lease_timeout_sec=60)
+
+            self.assertTrue(first.try_become_populator(seed=1))
+            first._insert([("A/1.pdf", "A")], renew_populator=True)
+            self.assertFalse(second.try_become_populator(seed=2))
+
+            # The populator died before it was done, and does not come back under its node_id
+            time.sleep(0.3)
+            self.assertTrue(second.try_become_populator(seed=2))
+            self.assertFalse(first.try_become_populator(seed=1))
+            second.populate([("A/1.pdf", "A"), ("B/2.pdf", "B")])
+
+            self.assertEqual(second.seed(), 1)
+            self.assertEqual(second.progress()["total"], 2)
+            self.assertFalse(LeaseCoordinator(db_path, "third").try_become_populator(seed=3))
+
+
+if __name__ == '__main__':
+    unittest.main()
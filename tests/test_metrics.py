@@ -0,0 +1,30 @@
+import unittest
+
+from docs2dataset.utils.metrics import RunMetrics, StageMetrics
+
+
+class TestMetrics(unittest.TestCase):
+    def test_drain_and_aggregate(self):
+        stage_metrics = StageMetrics()
+        with stage_metrics.timed("decode"):
+            pass
+        stage_metrics.add_time("decode", 0.5)
+        stage_metrics.count("images", 2)
+
+        snapshot = stage_metrics.drain(pages=2)
+        self.assertEqual(snapshot["stages"]["decode"][0], 2)
+        self.assertEqual(stage_metrics.drain()["stages"], {})
+
+        run_metrics = RunMetrics()
+        run_metrics.add(snapshot)
+        run_metrics.add(snapshot)
+        result = run_metrics.to_dict()
+
+        self.assertEqual(result["stages"]["decode"]["count"], 4)
+        self.assertEqual(result["stages"]["decode"]["max_ms"], 500.0)
+        self.assertEqual(result["counters"], {"images": 4})
+        self.assertEqual(result["workers"][str(snapshot["pid"])]["pages"], 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,22 @@
+import unittest
+
+from docs2dataset.ocr.ocr_interface import Box, OCROutput, TxtItem, WordBoxes
+
+
+class TestOCROutput(unittest.TestCase):
+    def test_text_items_constructor(self):
+        text_items = [
+            TxtItem(bbox=Box(1, 2, 30, 12), text="Hello", confidence=95.0),
+            TxtItem(bbox=Box(35, 2, 60, 12), text="world", confidence=87.5)
+        ]
+        expected = OCROutput(word_boxes=WordBoxes.from_text_items(text_items))
+
+        for ocr_output in (OCROutput(text_items=text_items), OCROutput(text_items)):
+            self.assertEqual(ocr_output.text, "Hello world")
+            self.assertEqual(ocr_output.text_items, text_items)
+            self.assertEqual(ocr_output.word_boxes.boxes.tolist(), expected.word_boxes.boxes.tolist())
+        self.assertEqual(len(OCROutput(text_items=[]).word_boxes), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,138 @@
+import socket
+import struct
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+
+import numpy as np
+
+from docs2dataset.ocr.implementations import OCRServiceClient
+from docs2dataset.ocr.ocr_interface import Box, OCRInterface, OCROutput, TxtItem
+from docs2dataset.ocr.service.ocr_server import OCRServer
+from docs2dataset.ocr.service.protocol import MAX_PAYLOAD_BYTES, recv_message, send_message
+from docs2dataset.utils.shared_memory_ring import SharedImageRing
+
+
+class ShapeOCR(OCRInterface):
+    """Recognizes every image as its shape and mean value."""
+
+    def recognize(self, images):
+        return [
+            OCROutput(text_items=[
+                TxtItem(bbox=Box(0, 0, image.shape[1], image.shape[0]), text=f"{image.shape}:{image.mean():.0f}",
+                        confidence=100.0)
+            ])
+            for image in images
+        ]
+
+
+def make_images() -> list:
+    # The last page is larger than a shared memory slot of the tests
+    return [np.full((40, 30), 10, dtype=np.uint8), np.full((20, 20, 3), 200, dtype=np.uint8),
+            np.full((300, 300, 3), 7, dtype=np.uint8)]
+
+
+class TestOCRService(unittest.TestCase):
+    def setUp(self):
+        self._tmp_dir = tempfile.TemporaryDirectory()
+        self.socket_path = Path(self._tmp_dir.name) / "ocr.sock"
+        self.address = f"unix:{self.socket_path}"
+        self.server = OCRServer(ShapeOCR, self.address, num_engines=2, max_batch_size=4, logging_level=40)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        for _ in range(100):
+            if self.socket_path.exists():
+                break
+            time.sleep(0.02)
+
+    def tearDown(self):
+        self.server.shutdown()
+        self._tmp_dir.cleanup()
+
+    def connect(self) -> socket.socket:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(10)
+        sock.connect(str(self.socket_path))
+        return sock
+
+    def test_round_trip_over_socket_and_ring(self):
+        expected = [f"{image.shape}:{image.mean():.0f}" for image in make_images()]
+        for shm_slots in (0, 2):
+            client = OCRServiceClient(self.address, shm_slots=shm_slots, shm_slot_mb=0.1)
+            try:
+                self.assertEqual(client.engine_name, "ShapeOCR")
+                # Four pages for two slots: the ring fills up, and the large page never fits a slot
+                outputs = client.recognize(make_images() + make_images()[:1])
+                self.assertEqual([output.text for output in outputs], expected + expected[:1])
+                self.assertEqual(outputs[1].word_boxes.boxes.tolist(), [[0, 0, 20, 20]])
+                if shm_slots:
+                    self.assertTrue(client._pool.get_nowait().ring_attached)
+            finally:
+                client.close()
+
+    def test_bad_requests_get_error_responses(self):
+        with self.connect() as sock:
+            bad_requests = [
+                ({"type": "recognize", "id": 1, "shape": [10, 10], "dtype": "|u1"}, b"\0" * 99),
+                ({"type": "recognize", "id": 2, "shape": [1], "dtype": "|O"}, b"\0" * 8),
+                ({"type": "recognize", "id": 3, "dtype": "|u1"}, b"\0"),
+                ({"type": "recognize", "id": 4, "shape": [1], "dtype": "no-such-dtype"}, b"\0"),
+                ({"type": "recognize", "id": 5, "slot": 0, "shape": [1], "dtype": "|u1"}, b""),
+                ({"type": "attach_ring", "id": 6, "name": "/no-such-ring", "num_slots": 1, "slot_size": 1}, b""),
+                ({"type": "launch", "id": 7}, b""),
+            ]
+            for header, payload in bad_requests:
+                send_message(sock, header, payload)
+                response, _ = recv_message(sock)
+                self.assertEqual((response["id"], response["ok"]), (header["id"], False), response)
+
+            # A header that is not JSON is consumed along with its payload, the connection stays usable
+            sock.sendall(struct.pack("!IQ", 5, 3) + b"{oops" + b"abc")
+            response, _ = recv_message(sock)
+            self.assertEqual((response["id"], response["ok"]), (None, False))
+
+            send_message(sock, {"type": "recognize", "id": 8, "shape": [2, 2], "dtype": "|u1"}, bytes([4] * 4))
+            response, payload = recv_message(sock)
+            self.assertEqual((response["id"], response["ok"]), (8, True))
+
+        with self.connect() as sock:
+            # An oversized payload is refused before it is read, and the connection is closed
+            sock.sendall(struct.pack("!IQ", 2, MAX_PAYLOAD_BYTES + 1) + b"{}")
+            response, _ = recv_message(sock)
+            self.assertFalse(response["ok"])
+            self.assertIn("exceeds", response["error"])
+            with self.assertRaises(ConnectionError):
+                recv_message(sock)
+
+        with self.connect() as sock:
+            send_message(sock, {"type": "info", "id": 9})
+            response, _ = recv_message(sock)
+            self.assertEqual(response, {"id": 9, "ok": True, "engine_name": "ShapeOCR"})
+
+    def test_ring_requests_outside_their_slot(self):
+        ring = SharedImageRing(num_slots=2, slot_size=1024)
+        try:
+            with self.connect() as sock:
+                attach = {"type": "attach_ring", "id": 1, "name": ring.name, "num_slots": 2, "slot_size": 1024}
+                send_message(sock, dict(attach, num_slots=64))
+                self.assertFalse(recv_message(sock)[0]["ok"])
+                send_message(sock, attach)
+                self.assertTrue(recv_message(sock)[0]["ok"])
+
+                for request_id, slot, shape in ((2, 2, [8, 8]), (3, -1, [8, 8]), (4, 1, [64, 64]), (5, "0", [8])):
+                    send_message(sock, {"type": "recognize", "id": request_id, "slot": slot, "shape": shape,
+                                        "dtype": "|u1"})
+                    response, _ = recv_message(sock)
+                    self.assertEqual((response["id"], response["ok"]), (request_id, False), response)
+
+                header = ring.try_write(np.full((8, 8), 3, dtype=np.uint8))
+                send_message(sock, {"type": "recognize", "id": 6, **header})
+                response, payload = recv_message(sock)
+                self.assertEqual((response["id"], response["ok"]), (6, True))
+        finally:
+            ring.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,49 @@
+import unittest
+
+import cv2
+import numpy as np
+
+from docs2dataset.utils.page_filter import NearDuplicateIndex, average_hash, ink_ratio, to_gray_thumbnail
+
+
+def make_page(seed: int) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    page = np.full((1400, 1000, 3), 245, dtype=np.uint8)
+    for y in range(100, 1300, 40):
+        width = int(rng.integers(200, 800))
+        cv2.rectangle(page, (100, y), (100 + width, y + 12), (30, 30, 30), -1)
+    return page
+
+
+class TestPageFilter(unittest.TestCase):
+    def test_blank_page_has_no_ink(self):
+        blank = np.full((1400, 1000), 235, dtype=np.uint8)
+        blank += np.random.default_rng(0).integers(0, 15, blank.shape, dtype=np.uint8)
+        self.assertEqual(ink_ratio(to_gray_thumbnail(blank)), 0.0)
+        self.assertGreater(ink_ratio(to_gray_thumbnail(make_page(0))), 0.05)
+
+    def test_near_duplicates_are_found(self):
+        index = NearDuplicateIndex(max_distance=8)
+        index.add(average_hash(to_gray_thumbnail(make_page(0))), "page 0")
+
+        rescan = np.roll(make_page(0), (3, 2), axis=(0, 1))
+        self.assertEqual(index.find(average_hash(to_gray_thumbnail(rescan))), "page 0")
+        self.assertIsNone(index.find(average_hash(to_gray_thumbnail(make_page(1)))))
+
+    def test_oldest_entries_are_evicted(self):
+        index = NearDuplicateIndex(max_distance=2, max_entries=2)
+        for page_hash in (0b0, 0b1111 << 60, 0b1111 << 120):
+            index.add(page_hash, page_hash)
+        self.assertEqual(len(index), 2)
+        self.assertIsNone(index.find(0b0))
+
+        index = NearDuplicateIndex(max_distance=2, max_value_bytes=100)
+        for page_hash, size in ((0b0, 60), (0b1111 << 60, 30), (0b1111 << 120, 40)):
+            index.add(page_hash, page_hash, size=size)
+        self.assertEqual(len(index), 2)
+        self.assertIsNone(index.find(0b0))
+        self.assertEqual(index.find(0b1111 << 120), 0b1111 << 120)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,45 @@
+import unittest
+from collections import Counter
+from random import Random
+
+from docs2dataset.utils.sampling import allocate_evenly, reservoir_sample, stratified_sample
+
+
+class TestSampling(unittest.TestCase):
+    def test_reservoir_sample_is_reproducible(self):
+        sample = reservoir_sample(range(10000), 50, Random(1))
+        self.assertEqual(len(set(sample)), 50)
+        self.assertEqual(sample, reservoir_sample(range(10000), 50, Random(1)))
+        self.assertEqual(sorted(reservoir_sample(range(5), 50, Random(1))), list(range(5)))
+
+    def test_reservoir_sample_is_uniform(self):
+        rng = Random(0)
+        counts = Counter()
+        for _ in range(2000):
+            counts.update(reservoir_sample(range(100), 10, rng))
+        # Every item is expected 200 times
+        self.assertLess(max(counts.values()), 300)
+        self.assertGreater(min(counts.values()), 120)
+
+    def test_stratified_sample(self):
+        items = [(f"root{i}", "root") for i in range(3)] + [(f"a{i}", "a") for i in range(100)] + \
+            [(f"b{i}", "b") for i in range(100)]
+        sample = stratified_sample(items, 21, Random(0))
+
+        strata = Counter(item.rstrip("0123456789") for item in sample)
+        self.assertEqual(strata, {"root": 3, "a": 9, "b": 9})
+
+        # With counts, counted strata keep only their share; a stratum missing from the counts is still sampled
+        items = ((f"{stratum}{i}", stratum) for stratum in ("root", "a", "b", "c")
+                 for i in range(3 if stratum == "root" else 100))
+        sample = stratified_sample(items, 21, Random(0), counts={"root": 3, "a": 100, "b": 100})
+        strata = Counter(item.rstrip("0123456789") for item in sample)
+        self.assertEqual(strata, {"root": 3, "a": 6, "b": 6, "c": 6})
+
+    def test_allocate_evenly(self):
+        self.assertEqual(allocate_evenly({"a": 1, "b": 10, "c": 10}, 10), {"a": 1, "b": 5, "c": 4})
+        self.assertEqual(allocate_evenly({"a": 2, "b": 3}, 10), {"a": 2, "b": 3})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,38 @@
+import unittest
+
+import numpy as np
+
+from docs2dataset.utils.shared_memory_ring import SharedImageRing
+
+
+class TestSharedImageRing(unittest.TestCase):
+    def test_peer_sees_written_images(self):
+        ring = SharedImageRing(num_slots=2, slot_size=1024)
+        peer = SharedImageRing(ring.num_slots, ring.slot_size, name=ring.name)
+        try:
+            images = [np.full((16, 16), i, dtype=np.uint8) for i in range(3)]
+            headers = [ring.try_write(image) for image in images]
+            # Two slots only, and a page larger than a slot is not placed in the ring
+            self.assertIsNone(headers[2])
+            self.assertIsNone(ring.try_write(np.zeros((64, 64), dtype=np.uint8)))
+
+            for image, header in zip(images, headers[:2]):
+                view = peer.view(header["slot"], header["shape"], header["dtype"])
+                np.testing.assert_array_equal(view, image)
+                del view
+                ring.release(header["slot"])
+            self.assertIsNotNone(ring.try_write(images[2]))
+
+            # Headers pointing outside their slot are refused
+            for slot, shape in ((2, (16, 16)), (-1, (16, 16)), (0, (64, 64)), (1, (-4, 4))):
+                with self.assertRaises(ValueError):
+                    peer.view(slot, shape, "|u1")
+            with self.assertRaises(ValueError):
+                SharedImageRing(ring.num_slots + 1, ring.slot_size, name=ring.name)
+        finally:
+            peer.close()
+            ring.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,32 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from docs2dataset.cache.sqlite_cache import SQLiteCache
+
+
+class TestSQLiteCache(unittest.TestCase):
+    def test_get_put(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            cache = SQLiteCache(Path(tmp_dir) / "cache.sqlite", max_size_mb=1)
+            self.assertIsNone(cache.get("missing"))
+            cache.put("key", b"value")
+            self.assertEqual(cache.get("key"), b"value")
+
+    def test_evicts_least_recently_used(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            cache = SQLiteCache(Path(tmp_dir) / "cache.sqlite", max_size_mb=1)
+            value = b"x" * (300 * 1024)
+            for key in ["a", "b", "c"]:
+                cache.put(key, value)
+            cache.get("a")
+            cache.put("d", value)
+            cache.evict()
+
+            self.assertIsNotNone(cache.get("a"))
+            self.assertIsNone(cache.get("b"))
+            self.assertIsNotNone(cache.get("d"))
+
+
+if __name__ == '__main__':
+    unittest.main()
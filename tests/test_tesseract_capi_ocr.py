@@ -0,0 +1,111 @@
+import multiprocessing
+import os
+import pickle
+import shutil
+import threading
+import unittest
+from unittest import mock
+
+import fitz  # PyMuPDF
+import numpy as np
+
+from docs2dataset.ocr.implementations.tesseract_capi_ocr import TesseractCAPIOCR, _live_handles, _load_library
+
+WORDS = ["Invoice", "number", "12345"]
+
+
+def libtesseract_available() -> bool:
+    try:
+        _load_library()
+    except OSError:
+        return False
+    return True
+
+
+def render_text() -> np.ndarray:
+    doc = fitz.open()
+    doc.new_page(width=400, height=100).insert_text((20, 60), " ".join(WORDS), fontsize=24)
+    pixmap = doc[0].get_pixmap(dpi=200, colorspace=fitz.csGRAY)
+    return np.frombuffer(pixmap.samples, dtype=np.uint8).reshape(pixmap.height, pixmap.width).copy()
+
+
+def recognize_in_worker(engine: TesseractCAPIOCR, image: np.ndarray) -> list:
+    return engine.recognize([image])[0].word_boxes.words.tolist()
+
+
+@unittest.skipUnless(libtesseract_available(), "libtesseract is not installed")
+class TestTesseractCAPIOCR(unittest.TestCase):
+    def setUp(self):
+        self.engine = TesseractCAPIOCR(lang="eng", dpi=200)
+        self.image = render_text()
+        try:
+            self.output = self.engine.recognize([self.image])[0]
+        except RuntimeError as e:
+            self.skipTest(f"Tesseract can't be initialized: {e}")
+
+    def tearDown(self):
+        self.engine.close()
+
+    def test_recognizes_words_and_boxes(self):
+        word_boxes = self.output.word_boxes
+        self.assertEqual(word_boxes.words.tolist(), WORDS)
+        self.assertEqual(word_boxes.boxes.shape, (3, 4))
+        # Boxes are (left, top, right, bottom) inside the image, words left to right
+        height, width = self.image.shape
+        self.assertTrue(np.all(word_boxes.boxes[:, [0, 1]] < word_boxes.boxes[:, [2, 3]]))
+        self.assertTrue(np.all((word_boxes.boxes[:, [0, 2]] >= 0) & (word_boxes.boxes[:, [0, 2]] <= width)))
+        self.assertTrue(np.all((word_boxes.boxes[:, [1, 3]] >= 0) & (word_boxes.boxes[:, [1, 3]] <= height)))
+        self.assertTrue(np.all(np.diff(word_boxes.boxes[:, 0]) > 0))
+        self.assertTrue(np.all(word_boxes.confidences > 0))
+
+    @unittest.skipUnless(shutil.which("tesseract"), "the tesseract executable is not installed")
+    def test_matches_pytesseract(self):
+        from docs2dataset.ocr.implementations.pytesseract_ocr import PytesseractOCR
+
+        expected = PytesseractOCR(lang="eng").recognize([self.image])[0].word_boxes
+        self.assertEqual(self.output.word_boxes.words.tolist(), expected.words.tolist())
+        np.testing.assert_allclose(self.output.word_boxes.boxes, expected.boxes, atol=2)
+
+    def test_handles_are_per_thread(self):
+        main_handle = self.engine._local.handle
+        thread_handles = []
+
+        def recognize():
+            self.engine.recognize([self.image])
+            self.engine.recognize([self.image])
+            thread_handles.append(self.engine._local.handle)
+            self.engine.close()
+
+        thread = threading.Thread(target=recognize)
+        thread.start()
+        thread.join()
+
+        self.assertEqual(len(thread_handles), 1)
+        self.assertNotEqual(thread_handles[0], main_handle)
+        self.assertNotIn(thread_handles[0], _live_handles)
+        # The main thread kept its handle
+        self.engine.recognize([self.image])
+        self.assertEqual(self.engine._local.handle, main_handle)
+
+    def test_handles_are_recreated_in_workers(self):
+        main_handle = self.engine._local.handle
+
+        # A pickled engine starts without a handle
+        clone = pickle.loads(pickle.dumps(self.engine))
+        self.assertIsNone(getattr(clone._local, "handle", None))
+        self.assertEqual(clone.recognize([self.image])[0].word_boxes.words.tolist(), WORDS)
+        self.assertNotEqual(clone._local.handle, main_handle)
+        clone.close()
+
+        # A handle inherited by a forked process is not used there
+        with mock.patch("docs2dataset.ocr.implementations.tesseract_capi_ocr.os.getpid", return_value=os.getpid() + 1):
+            self.engine.recognize([self.image])
+            self.assertNotEqual(self.engine._local.handle, main_handle)
+        self.assertIn(main_handle, _live_handles)
+
+        with multiprocessing.Pool(1) as pool:
+            self.assertEqual(pool.apply(recognize_in_worker, (self.engine, self.image)), WORDS)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,31 @@
+from docs2dataset.utils.text_quality import text_layer_quality
+
+import unittest
+
+
+class TestTextLayerQuality(unittest.TestCase):
+    def test_readable_text_scores_high(self):
+        text = "The quick brown fox jumps over the lazy dog. Съешь же ещё этих мягких французских булок."
+        self.assertGreater(text_layer_quality(text), 0.8)
+
+    def test_short_text_scores_zero(self):
+        self.assertEqual(text_layer_quality("Page 1"), 0.0)
+
+    def test_invoice_text_scores_above_default_threshold(self):
+        invoice = (
+            "Счет на оплату № 123 от 12.03.2024 Поставщик: ООО Ромашка ИНН 7701234567 КПП 770101001 "
+            "Товар: бумага А4, 10 шт. Цена 250,00 Сумма 2 500,00 руб. НДС 20% 416,67 руб. "
+            "Итого к оплате: 2 500,00 руб."
+        )
+        self.assertGreater(text_layer_quality(invoice), 0.6)
+
+        table = "\n".join(f"{row:02d}.03.2024 {row * 1250:,} {row * 7.5:.2f} 20%" for row in range(1, 13))
+        self.assertGreater(text_layer_quality(table), 0.6)
+
+    def test_garbage_text_scores_low(self):
+        text = "x7 Qz 9f #k1 ¤¤ 0x3 zz1 q8w vv9 k2k2 f0f0 ####### %%% 1234 5678 bcd fgh"
+        self.assertLess(text_layer_quality(text), 0.3)
+
+
+if __name__ == '__main__':
+    unittest.main()
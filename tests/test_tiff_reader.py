@@ -0,0 +1,50 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+from docs2dataset.utils.tiff_reader import map_tiff_frame, open_tiff_frame, tiff_index
+
+
+def make_frames(mode: str, num_frames: int) -> list:
+    rng = np.random.default_rng(0)
+    return [
+        Image.fromarray(rng.integers(0, 256, (60, 45, 3), dtype=np.uint8)).convert(mode) for _ in range(num_frames)
+    ]
+
+
+class TestTiffReader(unittest.TestCase):
+    def test_frames_match_pillow(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            for mode, compression, mapped in (("L", None, True), ("RGB", None, True), ("1", None, True),
+                                              ("1", "group4", False), ("RGB", "tiff_lzw", False)):
+                frames = make_frames(mode, 4)
+                path = Path(tmp_dir) / f"{mode}_{compression}.tif"
+                params = {"compression": compression} if compression else {}
+                frames[0].save(path, save_all=True, append_images=frames[1:], **params)
+
+                index = tiff_index(path)
+                self.assertEqual(index.num_frames, 4)
+                for frame in (0, 3):
+                    expected = np.asarray(frames[frame].convert("RGB"))
+                    with open_tiff_frame(path, index, frame) as pil_img:
+                        np.testing.assert_array_equal(np.asarray(pil_img.convert("RGB")), expected)
+
+                    image_np = map_tiff_frame(path, index, frame)
+                    self.assertEqual(image_np is not None, mapped, (mode, compression))
+                    if image_np is not None:
+                        rgb = image_np if image_np.ndim == 3 else np.stack([image_np] * 3, axis=-1)
+                        np.testing.assert_array_equal(rgb, expected)
+
+    def test_not_a_tiff(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = Path(tmp_dir) / "scan.tif"
+            Image.new("RGB", (10, 10)).save(path, format="PNG")
+            with self.assertRaises(ValueError):
+                tiff_index(path)
+
+
+if __name__ == '__main__':
+    unittest.main()